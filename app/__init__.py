@@ -85,6 +85,10 @@ def create_app():
 
    # Initialize Flask-Mail
     mail.init_app(app)
+
+    # Queue outgoing email in the email_outbox table; sender threads deliver it
+    from .utils.email_outbox import init_email_outbox
+    init_email_outbox(app)
     
     # User loader function
     @login_manager.user_loader
@@ -118,4 +122,8 @@ def create_app():
     from .routes import register_routes
     register_routes(app)
 
+    # Register maintenance commands (flask <group> <command>)
+    from .cli import register_cli
+    register_cli(app)
+
     return app
@@ -0,0 +1,238 @@
+# app/cli.py
+"""
+Maintenance commands, run with `flask <group> <command>`.
+"""
+import click
+from flask.cli import AppGroup
+
+counters_cli = AppGroup("counters", help="Maintain denormalized dashboard counters.")
+
+
+@counters_cli.command("reconcile")
+def reconcile_counters():
+    """Recompute the firm-wide dashboard counters from scratch."""
+    from app.utils.firm_counters import get_firm_counters, reconcile_firm_counters
+
+    before = get_firm_counters()
+    after = reconcile_firm_counters()
+    for name in sorted(after):
+        old, new = before.get(name), after[name]
+        note = "" if old == new else f"  (was {old})"
+        click.echo(f"{name}: {new}{note}")
+
+
+task_stats_cli = AppGroup("task-stats", help="Maintain the per-user task status rollups.")
+
+
+@task_stats_cli.command("rebuild")
+@click.option("--user-id", "user_ids", type=int, multiple=True, help="Only rebuild these users.")
+def rebuild_task_stats_command(user_ids):
+    """Recompute user_task_stats and user_task_daily_stats from tasks."""
+    from app.utils.task_stats import rebuild_task_stats
+
+    rows = rebuild_task_stats(user_ids or None)
+    click.echo(f"Rebuilt task stats: {rows} user/status rows.")
+
+
+@task_stats_cli.command("check")
+@click.option("--user-id", "user_ids", type=int, multiple=True, help="Only check these users.")
+def check_task_stats_command(user_ids):
+    """Report rollup rows that disagree with tasks (exit 1 if any)."""
+    from app.utils.task_stats import check_task_stats
+
+    mismatches = check_task_stats(user_ids or None)
+    for table, key, stored, expected in sorted(mismatches, key=lambda m: (m[0], str(m[1]))):
+        click.echo(f"{table} {key}: stored {stored}, expected {expected}")
+    if mismatches:
+        click.echo(f"{len(mismatches)} mismatched rows; run `flask task-stats rebuild`.")
+        raise SystemExit(1)
+    click.echo("Task stats are consistent.")
+
+
+outbox_cli = AppGroup("outbox", help="Inspect and drain the email outbox.")
+
+
+@outbox_cli.command("status")
+def outbox_status():
+    """Print the email queue depth."""
+    from app.utils.email_outbox import get_queue_depth
+
+    depth = get_queue_depth()
+    oldest = depth["oldest_pending_at"]
+    click.echo(f"pending: {depth['pending']} ({depth['due']} due now)")
+    click.echo(f"sending: {depth['sending']}")
+    click.echo(f"failed: {depth['failed']}")
+    click.echo(f"oldest pending: {oldest.isoformat() if oldest else '-'}")
+
+
+@outbox_cli.command("run")
+@click.option("--once", is_flag=True, help="Send what is due now and exit.")
+def outbox_run(once):
+    """Deliver queued email (runs until interrupted unless --once)."""
+    from flask import current_app
+    from app.utils.email_outbox import drain_once, run_sender
+
+    app = current_app._get_current_object()
+    if once:
+        total = 0
+        while True:
+            claimed = drain_once(app)
+            total += claimed
+            if not claimed:
+                break
+        click.echo(f"Processed {total} queued emails.")
+        return
+    click.echo("Sending queued email; Ctrl+C to stop.")
+    run_sender(app)
+
+
+@outbox_cli.command("retry-failed")
+def outbox_retry_failed():
+    """Requeue emails that used up their retries."""
+    from app.utils.email_outbox import retry_failed
+
+    click.echo(f"Requeued {retry_failed()} failed emails.")
+
+
+notifications_cli = AppGroup("notifications", help="Maintain notification counters and history.")
+
+
+@notifications_cli.command("recount")
+@click.option("--user-id", "user_ids", type=int, multiple=True, help="Only recount these users.")
+def recount_notifications_command(user_ids):
+    """Recompute the per-user unread notification counters."""
+    from app.utils.notifications import rebuild_unread_counts
+
+    rows = rebuild_unread_counts(user_ids or None)
+    click.echo(f"Rebuilt unread counters for {rows} users.")
+
+
+@notifications_cli.command("purge")
+@click.option("--days", type=int, help="Keep this many days (default NOTIFICATION_RETENTION_DAYS).")
+@click.option("--mode", type=click.Choice(["archive", "delete"]), help="Default NOTIFICATION_RETENTION_MODE.")
+@click.option("--chunk-size", type=int, help="Rows per transaction (default NOTIFICATION_RETENTION_CHUNK_SIZE).")
+@click.option("--max-chunks", type=int, help="Stop after this many chunks.")
+@click.option("--pause", type=float, default=0, help="Seconds to sleep between chunks.")
+@click.option("--dry-run", is_flag=True, help="Only report how many rows would be removed.")
+def purge_notifications_command(days, mode, chunk_size, max_chunks, pause, dry_run):
+    """Archive or delete read notifications past the retention age."""
+    from flask import current_app
+    from app.utils.notification_retention import purge_notifications, count_expired_notifications
+
+    app = current_app._get_current_object()
+    if dry_run:
+        click.echo(f"{count_expired_notifications(app, days)} read notifications are past retention.")
+        return
+
+    report = purge_notifications(
+        app, days=days, mode=mode, chunk_size=chunk_size, max_chunks=max_chunks, pause=pause,
+        on_chunk=lambda number, rows: click.echo(f"chunk {number}: {rows} rows"),
+    )
+    verb = "Archived" if report["mode"] == "archive" else "Deleted"
+    click.echo(
+        f"{verb} {report['moved']} notifications read before "
+        f"{report['cutoff']:%Y-%m-%d %H:%M} in {report['chunks']} chunks."
+    )
+
+
+storage_cli = AppGroup("storage", help="Manage the object storage bucket.")
+
+
+@storage_cli.command("cors")
+@click.argument("origins", nargs=-1, required=True)
+def storage_cors_command(origins):
+    """Let browsers on ORIGINS upload straight to the bucket."""
+    from app.utils.storage_service import storage_service
+
+    storage_service.configure_cors(origins)
+    click.echo(f"Bucket CORS now allows: {', '.join(origins)}")
+
+
+@storage_cli.command("gc")
+@click.option("--dry-run", is_flag=True, help="Only report orphaned objects.")
+@click.option("--min-age-hours", type=float, default=24, show_default=True,
+              help="Leave objects younger than this alone.")
+@click.option("--batch-size", type=int, default=1000, show_default=True, help="Keys per delete request.")
+@click.option("--pause", type=float, default=0, help="Seconds between delete requests.")
+@click.option("--limit", type=int, help="Stop after this many orphans.")
+def storage_gc_command(dry_run, min_age_hours, batch_size, pause, limit):
+    """Delete bucket objects no longer referenced by the database."""
+    from datetime import timedelta
+    from app.utils.storage_gc import collect_garbage
+
+    report = collect_garbage(
+        min_age=timedelta(hours=min_age_hours), dry_run=dry_run,
+        batch_size=batch_size, pause=pause, limit=limit,
+        on_batch=lambda deleted, errors: click.echo(f"deleted {len(deleted)}, failed {len(errors)}"),
+    )
+    size_mb = report["bytes"] / (1024 * 1024)
+    click.echo(f"Orphaned objects: {report['orphans']} ({size_mb:.1f} MB)")
+    if dry_run:
+        return
+    click.echo(f"Deleted: {report['deleted']}")
+    for key, message in report["errors"]:
+        click.echo(f"failed {key}: {message}")
+    if report["errors"]:
+        raise SystemExit(1)
+
+
+clients_cli = AppGroup("clients", help="Bulk client maintenance.")
+
+
+@clients_cli.command("import")
+@click.argument("csv_file", type=click.File("rb"))
+@click.option("--batch-size", type=int, default=1000, show_default=True, help="Rows per insert/commit.")
+def import_clients_command(csv_file, batch_size):
+    """Import clients from CSV_FILE (name, contact_email, phone_number)."""
+    from app.services.clients.client_import_service import import_clients_csv
+
+    report = import_clients_csv(
+        csv_file, batch_size=batch_size,
+        on_progress=lambda r: click.echo(f"{r['rows']} rows read, {r['added']} added"),
+    )
+    click.echo(
+        f"Added {report['added']} clients from {report['rows']} rows; "
+        f"{report['skipped']} already existed, {len(report['errors'])} errors."
+    )
+    for line, message in report["errors"]:
+        click.echo(f"line {line}: {message}")
+
+
+tasks_cli = AppGroup("tasks", help="Scheduled task maintenance.")
+
+
+@tasks_cli.command("materialize")
+@click.option("--horizon-days", type=int, help="Create instances due this far ahead (default RECURRENCE_HORIZON_DAYS).")
+@click.option("--catch-up-days", type=int, help="Still create instances overdue by this much (default RECURRENCE_CATCH_UP_DAYS).")
+@click.option("--chunk-size", type=int, help="Series per transaction (default RECURRENCE_CHUNK_SIZE).")
+def materialize_tasks_command(horizon_days, catch_up_days, chunk_size):
+    """Create upcoming instances of recurring tasks."""
+    from flask import current_app
+    from app.utils.task_recurrence import materialize_recurring_tasks, RecurrenceLocked
+
+    try:
+        report = materialize_recurring_tasks(
+            current_app._get_current_object(), horizon_days=horizon_days,
+            catch_up_days=catch_up_days, chunk_size=chunk_size,
+            on_chunk=lambda number, tasks: click.echo(f"chunk {number}: {tasks} tasks"),
+        )
+    except RecurrenceLocked as e:
+        click.echo(str(e))
+        raise SystemExit(1)
+
+    click.echo(
+        f"Created {report['created']} tasks and {report['vat_forms']} VAT forms "
+        f"for {report['series']} recurring series in {report['chunks']} chunks."
+    )
+    if report["conflicts"]:
+        click.echo(f"{report['conflicts']} chunks hit a concurrent write; they are retried on the next run.")
+
+
+def register_cli(app):
+    app.cli.add_command(counters_cli)
+    app.cli.add_command(task_stats_cli)
+    app.cli.add_command(outbox_cli)
+    app.cli.add_command(notifications_cli)
+    app.cli.add_command(storage_cli)
+    app.cli.add_command(clients_cli)
+    app.cli.add_command(tasks_cli)
@@ -11,8 +11,17 @@ def str_to_bool(value, default=False):
 class Config:
 
     # Cache Configuration
-    CACHE_TYPE = os.getenv("CACHE_TYPE", "SimpleCache")
+    # With CACHE_REDIS_URL set, workers share a Redis-backed store fronted by
+    # a small per-process LRU; otherwise each process keeps its own SimpleCache.
+    CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+    CACHE_TYPE = os.getenv(
+        "CACHE_TYPE",
+        "app.utils.cache_backends.TwoTierCache" if CACHE_REDIS_URL else "SimpleCache"
+    )
     CACHE_DEFAULT_TIMEOUT = int(os.getenv("CACHE_DEFAULT_TIMEOUT", 300))
+    CACHE_KEY_PREFIX = os.getenv("CACHE_KEY_PREFIX", "rdms:")
+    CACHE_LOCAL_MAXSIZE = int(os.getenv("CACHE_LOCAL_MAXSIZE", 1024))
+    CACHE_LOCAL_TIMEOUT = int(os.getenv("CACHE_LOCAL_TIMEOUT", 30))
     
 
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key')
@@ -27,6 +36,35 @@ class Config:
     
     MAIL_USERNAME = os.getenv('MAIL_USERNAME')
     MAIL_PASSWORD = os.getenv('MAIL_PASSWORD')
+    MAIL_DEFAULT_SENDER = os.getenv('MAIL_DEFAULT_SENDER', 'administrator@3allp.com')
+
+    # Email outbox sender pool (see app/utils/email_outbox.py).
+    # Set EMAIL_OUTBOX_WORKERS=0 when a separate `flask outbox run` process sends mail.
+    EMAIL_OUTBOX_WORKERS = int(os.getenv('EMAIL_OUTBOX_WORKERS', 1))
+    EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv('EMAIL_OUTBOX_BATCH_SIZE', 50))
+    EMAIL_OUTBOX_POLL_SECONDS = int(os.getenv('EMAIL_OUTBOX_POLL_SECONDS', 5))
+    EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', 8))
+
+    # Notification retention (`flask notifications purge`, see
+    # app/utils/notification_retention.py). Mode is "archive" or "delete".
+    NOTIFICATION_RETENTION_DAYS = int(os.getenv('NOTIFICATION_RETENTION_DAYS', 90))
+    NOTIFICATION_RETENTION_MODE = os.getenv('NOTIFICATION_RETENTION_MODE', 'archive')
+    NOTIFICATION_RETENTION_CHUNK_SIZE = int(os.getenv('NOTIFICATION_RETENTION_CHUNK_SIZE', 1000))
+
+    # Recurring tasks (`flask tasks materialize`, see app/utils/task_recurrence.py):
+    # instances due within the horizon are created ahead of time; missed
+    # instances further back than the catch-up window are not backfilled.
+    RECURRENCE_HORIZON_DAYS = int(os.getenv('RECURRENCE_HORIZON_DAYS', 35))
+    RECURRENCE_CATCH_UP_DAYS = int(os.getenv('RECURRENCE_CATCH_UP_DAYS', 7))
+    RECURRENCE_CHUNK_SIZE = int(os.getenv('RECURRENCE_CHUNK_SIZE', 200))
+
+    # Real-time notifications (Flask-SocketIO)
+    # "gevent" needs run.py's monkey patching and `gunicorn -k gevent -w 1`;
+    # SOCKETIO_MESSAGE_QUEUE (e.g. redis://localhost:6379/1) lets several
+    # worker processes broadcast to each other's clients.
+    SOCKETIO_ASYNC_MODE = os.getenv('SOCKETIO_ASYNC_MODE', 'threading')
+    SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE')
+    SOCKETIO_CHANNEL = os.getenv('SOCKETIO_CHANNEL', 'rdms-socketio')
 
     # DigitalOcean Spaces Configuration (S3 Compatible)
     S3_BUCKET = os.getenv('S3_BUCKET')
@@ -34,6 +72,26 @@ class Config:
     S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL', f"https://{S3_REGION}.digitaloceanspaces.com")
     S3_ACCESS_KEY = os.getenv('S3_ACCESS_KEY')
     S3_SECRET_KEY = os.getenv('S3_SECRET_KEY')
+    # "path" for local S3 stand-ins such as MinIO (http://localhost:9000)
+    S3_ADDRESSING_STYLE = os.getenv('S3_ADDRESSING_STYLE', 'auto')
+
+    # Server-side uploads (storage_service.upload_files): files in flight at
+    # once, parts per multipart file, and the shared HTTP connection pool
+    # (keep it >= S3_UPLOAD_WORKERS * S3_MULTIPART_CONCURRENCY).
+    S3_UPLOAD_WORKERS = int(os.getenv('S3_UPLOAD_WORKERS', 4))
+    S3_MULTIPART_CONCURRENCY = int(os.getenv('S3_MULTIPART_CONCURRENCY', 4))
+    S3_MULTIPART_THRESHOLD = int(os.getenv('S3_MULTIPART_THRESHOLD', 8 * 1024 * 1024))
+    S3_MULTIPART_CHUNKSIZE = int(os.getenv('S3_MULTIPART_CHUNKSIZE', 8 * 1024 * 1024))
+    S3_MAX_POOL_CONNECTIONS = int(os.getenv('S3_MAX_POOL_CONNECTIONS', 20))
+
+    # Signed download URLs are reused for this many seconds (capped at half
+    # their lifetime) so browsers can cache avatars and documents.
+    S3_URL_CACHE_WINDOW = int(os.getenv('S3_URL_CACHE_WINDOW', 1800))
+
+    # Browser-to-bucket uploads (presigned POST). The bucket needs CORS for
+    # the app's origin: `flask storage cors https://your-app.example`.
+    DIRECT_UPLOAD_MAX_SIZE = int(os.getenv('DIRECT_UPLOAD_MAX_SIZE', 16 * 1024 * 1024))
+    DIRECT_UPLOAD_EXPIRES_SECONDS = int(os.getenv('DIRECT_UPLOAD_EXPIRES_SECONDS', 600))
     
     # Define Allowed Extensions
     ALLOWED_EXTENSIONS = {
@@ -7,7 +7,7 @@ from sqlalchemy.dialects.mysql import ENUM as MySQLEnum
 from sqlalchemy import desc, Enum as SQLAlchemyEnum, Enum as SqlEnum, JSON
 from calendar import month_abbr
 from decimal import Decimal
-from sqlalchemy.orm import class_mapper
+from sqlalchemy.orm import class_mapper, deferred
 
 class ApplicationStatus(Enum):
     DRAFT = "draft"
@@ -88,6 +88,12 @@ class DecisionEnum(Enum):
     APPROVED = 'approved'
     REDO = 'redo'
 
+class EmailStatusEnum(Enum):
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    FAILED = "failed"
+
 class RecurrenceEnum(Enum):
     NONE = "none"  
     
@@ -152,6 +158,8 @@ class User(db.Model, UserMixin):
     reset_token = db.Column(db.String(255), nullable=True)
     reset_token_expiry = db.Column(db.DateTime, nullable=True)
     secondary_roles = db.Column(JSON, nullable=True, default=list)
+    # Announcements made before this are not unread for the user
+    created_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow)
 
     def generate_reset_token(self):
         """Generate a secure password reset token."""
@@ -303,12 +311,20 @@ class Task(db.Model):
     __table_args__ = (
         # MOST IMPORTANT: Composite index for assigned tasks queries (from get_assigned_tasks)
         db.Index('idx_tasks_assigned_status_deleted', 'assigned_to_id', 'status', 'deleted_at'),
+
+        # Same prefix plus the sort key, so assigned-task tabs page by keyset
+        # ((deadline, id) / (updated_at, id)) straight off the index
+        db.Index('idx_tasks_assigned_status_deleted_deadline', 'assigned_to_id', 'status', 'deleted_at', 'deadline', 'id'),
+        db.Index('idx_tasks_assigned_status_deleted_updated', 'assigned_to_id', 'status', 'deleted_at', 'updated_at', 'id'),
         
         # Index for deadline-based queries (overdue tasks)
         db.Index('idx_tasks_deadline_status', 'deadline', 'status'),
         
         # Index for job-related queries
         db.Index('idx_tasks_job_deleted', 'job_id', 'deleted_at'),
+
+        # Recycle bin: one page of the newest deleted tasks
+        db.Index('idx_tasks_deleted', 'deleted_at'),
         
         # Index for creator queries
         db.Index('idx_tasks_creator_deleted', 'created_by_id', 'deleted_at'),
@@ -318,6 +334,10 @@ class Task(db.Model):
         
         # Index for template queries
         db.Index('idx_tasks_template', 'task_template_id'),
+
+        # One instance per engagement, template and deadline: guards the
+        # recurring-task materializer (app.utils.task_recurrence) against duplicates
+        db.UniqueConstraint('job_id', 'task_template_id', 'deadline', name='uq_tasks_job_template_deadline'),
         
         # Index for updated_at ordering (dashboard queries)
         db.Index('idx_tasks_updated_at', 'updated_at'),
@@ -390,6 +410,9 @@ class TaskLog(db.Model):
         
         # Composite index for task completion queries
         db.Index('idx_task_logs_task_status_time', 'task_id', 'status', 'start_time'),
+
+        # Composite index for a user's completed logs (profile graph / averages)
+        db.Index('idx_task_logs_user_status_start', 'user_id', 'status', 'start_time'),
     )
 
 class TaskApproval(db.Model):
@@ -508,6 +531,12 @@ class Job(db.Model):
     name = db.Column(db.String(200), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Maintained by app.utils.firm_counters: not deleted and has an ongoing task
+    is_ongoing = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+
+    # Shared by the jobs of one bulk INSERT (a rollout chunk), so their ids can be read back
+    batch_id = db.Column(db.String(32), nullable=True, index=True)
+
 
     # --- ADDED Soft Delete ---
     deleted_at = db.Column(db.DateTime, nullable=True)
@@ -574,6 +603,56 @@ class Job(db.Model):
         db.Index('idx_jobs_deleted', 'deleted_at'),
     )
 
+class FirmCounter(db.Model):
+    """
+    Firm-wide running totals read by the director / admin dashboards.
+    One row per counter; kept in step with writes by app.utils.firm_counters
+    and rebuilt from scratch by `flask counters reconcile`.
+    """
+    __tablename__ = 'firm_counters'
+
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<FirmCounter {self.name}={self.value}>"
+
+class UserTaskStat(db.Model):
+    """
+    Number of live (not soft-deleted) tasks assigned to a user, per status.
+    Maintained by app.utils.task_stats; rebuilt by `flask task-stats rebuild`.
+    """
+    __tablename__ = 'user_task_stats'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    status = db.Column(db.Enum(TaskStatusEnum), primary_key=True)
+    task_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<UserTaskStat user={self.user_id} {self.status.name}={self.task_count}>"
+
+class UserTaskDailyStat(db.Model):
+    """
+    Live tasks assigned to a user, per status, bucketed by the UTC day they
+    were last updated. Summing a day range answers "tasks now in <status>
+    that were touched between these dates" without scanning `tasks`.
+    """
+    __tablename__ = 'user_task_daily_stats'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.Enum(TaskStatusEnum), primary_key=True)
+    task_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Range sums across a team for one period
+        db.Index('idx_user_task_daily_day', 'day', 'user_id'),
+    )
+
+    def __repr__(self):
+        return f"<UserTaskDailyStat user={self.user_id} {self.day} {self.status.name}={self.task_count}>"
+
 class TaskDocument(db.Model):
     __tablename__ = 'task_documents'
     id = db.Column(db.Integer, primary_key=True)
@@ -672,8 +751,127 @@ class Notification(db.Model):
         
         # Index for created_at ordering
         db.Index('idx_notifications_created_at', 'created_at'),
+
+        # Full feed (read and unread): WHERE user_id = ? ORDER BY created_at, id
+        db.Index('idx_notifications_user_created', 'user_id', 'created_at'),
+    )
+
+class UserNotificationCounter(db.Model):
+    """
+    Number of unread notifications per user, read by the notification badge.
+    Maintained by app.utils.notifications, seeded on first use; rebuilt by
+    `flask notifications recount`.
+    """
+    __tablename__ = 'user_notification_counters'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    unread_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<UserNotificationCounter user={self.user_id} unread={self.unread_count}>"
+
+class NotificationArchive(db.Model):
+    """
+    Read notifications moved out of `notifications` by the retention job
+    (app.utils.notification_retention). Rows keep their original ids; no
+    foreign keys and a single index keep the archive cheap to write.
+    """
+    __tablename__ = 'notifications_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    actor_id = db.Column(db.Integer, nullable=True)
+    message = db.Column(db.String(255), nullable=False)
+    url = db.Column(db.String(255), nullable=True)
+    type = db.Column(db.String(50))
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # A user's archived history, oldest to newest
+        db.Index('idx_notifications_archive_user_created', 'user_id', 'created_at'),
     )
 
+class BroadcastNotification(db.Model):
+    """
+    One notification shared by everyone in a Socket.IO room (a role, a
+    department or a department's reviewers; see app.utils.notifications).
+    Stored once per announcement; who has read it lives in
+    BroadcastNotificationRead.
+    """
+    __tablename__ = 'broadcast_notifications'
+
+    id = db.Column(db.Integer, primary_key=True)
+    audience = db.Column(db.String(100), nullable=False)
+    actor_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    message = db.Column(db.String(255), nullable=False)
+    url = db.Column(db.String(255), nullable=True)
+    type = db.Column(db.String(50), default='info')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    actor = db.relationship('User', foreign_keys=[actor_id])
+
+    def to_dict(self, read=False):
+        return {
+            'id': self.id,
+            'broadcast': True,
+            'message': self.message,
+            'url': self.url,
+            'read': read,
+            'created_at': self.created_at.isoformat() + 'Z',
+            'type': self.type
+        }
+
+    __table_args__ = (
+        # A user's announcements: audience IN (their rooms), newest first
+        db.Index('idx_broadcast_notifications_audience_created', 'audience', 'created_at'),
+    )
+
+
+class BroadcastNotificationRead(db.Model):
+    """Per-user read state for a BroadcastNotification (no row = unread)."""
+    __tablename__ = 'broadcast_notification_reads'
+
+    broadcast_id = db.Column(db.Integer, db.ForeignKey('broadcast_notifications.id', ondelete='CASCADE'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    read_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('idx_broadcast_reads_user', 'user_id', 'broadcast_id'),
+    )
+
+class EmailOutbox(db.Model):
+    """
+    Outgoing email, written by the notification helpers and delivered by the
+    sender pool in app.utils.email_outbox. A row stays PENDING until a
+    worker claims it (SENDING), then ends up SENT, or FAILED once its
+    retries are used up.
+    """
+    __tablename__ = 'email_outbox'
+
+    id = db.Column(db.Integer, primary_key=True)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    recipients = db.Column(db.JSON, nullable=False)
+    sender = db.Column(db.String(255), nullable=False)
+
+    status = db.Column(SqlEnum(EmailStatusEnum), nullable=False, default=EmailStatusEnum.PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        # Workers claim due rows in next_attempt_at order
+        db.Index('idx_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+    def __repr__(self):
+        return f"<EmailOutbox {self.id} {self.status.value} {self.subject!r}>"
+
 class VatFilingMonth(db.Model):
     __tablename__ = 'vat_filing_months'
 
@@ -997,7 +1195,8 @@ class SheetVisibilityEnum(Enum):
 class Sheet(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
-    content = db.Column(db.JSON, default=[])
+    # Cell data is only loaded when a single sheet is opened, never in listings
+    content = deferred(db.Column(db.JSON, default=[]))
 
     created_by_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -1015,6 +1214,11 @@ class Sheet(db.Model):
     created_by = db.relationship('User', foreign_keys=[created_by_id], backref='created_sheets')
     task = db.relationship('Task', backref='sheets', foreign_keys=[task_id]) # Specify FK
 
+    __table_args__ = (
+        # Sheets home listing (newest first, keyset on created_at/id)
+        db.Index('idx_sheets_home_deleted_created', 'visible_on_sheets_home', 'deleted_at', 'created_at', 'id'),
+    )
+
     def is_task_only(self):
         return self.task_id is not None and not self.visible_on_sheets_home
 
@@ -1044,7 +1248,41 @@ class Sheet(db.Model):
             )
 
         return False  # default deny
-    
+
+    @classmethod
+    def visible_to(cls, user: "User"):
+        """
+        SQL predicate equivalent to `can_user_view(user)`, for filtering
+        listings in the database instead of per row in Python.
+        """
+        if user.role == 'ADMIN':
+            return db.true()
+
+        visible = [
+            cls.created_by_id == user.id,
+            cls.visibility == SheetVisibilityEnum.EVERYONE,
+        ]
+        if user.role == 'DIRECTOR':
+            visible.append(cls.visibility == SheetVisibilityEnum.CREATOR_AND_DIRECTORS)
+        if user.role in ['SUPERVISOR', 'DIRECTOR']:
+            visible.append(cls.visibility.in_([
+                SheetVisibilityEnum.CREATOR_SUPERVISORS_DIRECTORS,
+                SheetVisibilityEnum.DEPARTMENT_RESTRICTED,
+            ]))
+        else:
+            same_department = (
+                User.department_id.is_(None) if user.department_id is None
+                else User.department_id == user.department_id
+            )
+            visible.append(db.and_(
+                cls.visibility == SheetVisibilityEnum.DEPARTMENT_RESTRICTED,
+                cls.created_by.has(same_department),
+            ))
+        if user.role != 'INTERN':
+            visible.append(cls.visibility == SheetVisibilityEnum.CREATOR_ALL_EXCEPT_INTERNS)
+
+        return db.or_(*visible)
+
     def get_sheet_data(self):
         """
         Returns 2D array of sheet data (for view/edit).
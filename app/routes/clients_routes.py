@@ -2,11 +2,14 @@ from flask import Blueprint, request, jsonify, session, render_template, url_for
 from app.models import *
 from flask_login import login_required, current_user
 from app.utils.db import db
-import io, csv
 from .auth_routes import supervisors_admins_directors, directors_and_admins
+from app.services.clients.client_import_service import import_clients_csv, ClientImportError
 
 client_bp= Blueprint('client', __name__)
 
+# Row errors listed in the flash message after a CSV import
+IMPORT_ERRORS_SHOWN = 10
+
 @client_bp.route('/new/client', methods=['POST', 'GET'])
 @login_required
 @supervisors_admins_directors
@@ -118,62 +121,36 @@ def get_client_details(client_id):
 @client_bp.route('/upload_csv', methods=['POST'])
 @supervisors_admins_directors
 def upload_clients_csv():
-    clients = Client.query.all()
     if 'file' not in request.files:
         return jsonify({'error': 'No file part in the request'}), 400
     file = request.files['file']
     if file.filename == '':
         return jsonify({'error': 'No selected file'}), 400
 
-    try:
-        # Attempt to decode using UTF-8 first
-        file_content = file.stream.read().decode("utf-8")
-    except UnicodeDecodeError:
-        # If UTF-8 fails, try a more permissive encoding like latin-1
-        file.stream.seek(0)
-        file_content = file.stream.read().decode("latin-1")
-
-    stream = io.StringIO(file_content, newline=None)
-    reader = csv.DictReader(stream)
-
-    added = 0
-    skipped = 0
-    errors = []
-    for i, row in enumerate(reader, start=1):
-        name = row.get('name')
-        
-        # --- NEW CODE: CONVERT EMPTY STRINGS TO NONE ---
-        contact_email = row.get('contact_email')
-        if contact_email == '':
-            contact_email = None
-
-        phone_number = row.get('phone_number')
-        if phone_number == '':
-            phone_number = None
-        # ------------------------------------------------
-
-        if not name:
-            errors.append(f"Row {i}: missing 'name' field")
-            continue
-        if Client.query.filter_by(name=name).first():
-            skipped += 1
-            continue
-        
-        client = Client(
-            name=name,
-            contact_email=contact_email, # Use the new variable
-            phone_number=phone_number    # Use the new variable
+    def log_progress(report):
+        current_app.logger.info(
+            f"Client import: {report['rows']} rows read, {report['added']} added, "
+            f"{report['skipped']} already existed, {len(report['errors'])} errors"
         )
-        db.session.add(client)
-        added += 1
 
     try:
-        db.session.commit()
+        report = import_clients_csv(file.stream, on_progress=log_progress)
+    except ClientImportError as e:
+        flash(str(e), 'danger')
+        return redirect(url_for('client.create_client'))
     except Exception as e:
         db.session.rollback()
+        current_app.logger.error(f"Client import failed: {e}")
         return jsonify({'error': f'Database error: {str(e)}'}), 500
 
-    return render_template('/client/clientList.html', clients=clients)
+    flash(f"Imported {report['added']} clients; {report['skipped']} already existed.", 'success')
+    errors = report['errors']
+    if errors:
+        shown = '; '.join(f"line {line}: {message}" for line, message in errors[:IMPORT_ERRORS_SHOWN])
+        more = f" (and {len(errors) - IMPORT_ERRORS_SHOWN} more)" if len(errors) > IMPORT_ERRORS_SHOWN else ''
+        flash(f"Skipped rows with errors: {shown}{more}", 'warning')
+
+    return redirect(url_for('client.get_clients'))
 
 @client_bp.route('/<int:client_id>', methods=['GET'])
 def get_client(client_id):
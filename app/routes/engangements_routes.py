@@ -15,153 +15,208 @@ from  .engagement_service import update_historical_summaries, update_current_mon
 import pandas as pd
 import io
 import csv
-from app.utils.notification import run_async_in_background, send_new_engagement_notifications_async, send_review_partner_set_notification_async
+from app.utils.notification import run_async_in_background, send_new_engagement_notifications_async, send_review_partner_set_notification_async, send_engagement_rollout_notifications_async
+from app.utils.notifications import notify_users
 from sqlalchemy.orm import joinedload, subqueryload
 from sqlalchemy import or_
 
 from .auth_routes import supervisors_admins_directors
+from app.services.jobs.vat_import_service import import_vat_summaries, VatImportError
+from app.services.jobs.engagement_builder import create_engagement, roll_out_engagements, task_spec, ASSIGNMENT_RULES, ROLLOUT_MAX_CLIENTS
+from app.services.clients.client_query_service import get_clients_for_forms
+from app.services.users.user_service import get_users_for_assignment
+from app.services.services.service_query_servic import get_services_for_forms
+from app.services.templates.task_template_query_service import get_templates_for_forms
 
 job_bp= Blueprint('job', __name__)
 
+# Row errors listed in the flash message after a VAT summary import
+VAT_IMPORT_ERRORS_SHOWN = 10
+
+def _task_specs_from_form(form, default_assignee_id):
+    """One task_spec per ticked template, from its namespaced form fields."""
+    specs = []
+    for tpl_id in form.getlist('task_template_ids'):
+        assignee_id = default_assignee_id
+        task_assignee = form.get(f'assigned_to_task_{tpl_id}')
+        if task_assignee:
+            try:
+                assignee_id = int(task_assignee)
+            except ValueError:
+                pass
+        specs.append(task_spec(
+            tpl_id,
+            assignee_id,
+            deadline=form.get(f'deadline_{tpl_id}'),
+            description=form.get(f'description_{tpl_id}'),
+            estimated_value=form.get(f'estimated_value_{tpl_id}', 0),
+            estimated_unit=form.get(f'estimated_unit_{tpl_id}', 'minutes'),
+            priority=form.get(f'priority_{tpl_id}', 'Normal'),
+            recurrence=form.get(f'recurrence_{tpl_id}', 'NONE'),
+        ))
+    return specs
+
+def _serialized_form_lookups():
+    """Templates and users for the engagement forms, from the cached lookups."""
+    templates = [{
+        'id': tpl.id,
+        'service_id': tpl.service_id,
+        'title': tpl.title,
+        'description': tpl.description
+    } for tpl in get_templates_for_forms()]
+
+    users = sorted(get_users_for_assignment(), key=lambda user: user.last_name or '')
+    serialized_users = [{
+        'id': user.id,
+        'first_name': user.first_name,
+        'last_name': user.last_name
+    } for user in users]
+    return templates, serialized_users
+
 @job_bp.route('/jobs/create', methods=['GET', 'POST'])
 @login_required
 def create_job():
-    local_tz = pytz.timezone('Africa/Nairobi')
-
-    # for the GET form
-    users     = User.query.order_by(User.last_name).all()
-    clients   = Client.query.order_by(Client.name).all()
-    templates = TaskTemplate.query.all()
-    services  = Service.query.order_by(Service.name).all()
-
-    # --- FIX: The incorrect 'task = Task.query.all()' line has been removed ---
-
-    # now-local for timestamp display
-    now_local = datetime.utcnow().replace(tzinfo=pytz.utc).astimezone(local_tz)
-
     if request.method == 'POST':
         # 1) Basic job fields
         client_id = request.form.get('client_id')
         service_id = request.form.get('service_id')
         name       = request.form.get('name')
-        engagement_assigned_to_id = int(request.form.get('assigned_to', 0))
 
         if not client_id or not service_id:
             flash('Client and service are required.', 'danger')
             return redirect(request.url)
-        
-        # --- NEW LOGIC: Get the Service object to check its name ---
-        service = Service.query.get(service_id)
-        if not service:
-            flash('Invalid service selected.', 'danger')
-            return redirect(request.url)
 
-        # 2) Create the Job
-        job = Job(
-            client_id=int(client_id),
-            name=name,
-            created_by_id=current_user.id
-        )
-        # --- FIX: Save that single service as the first item in the NEW list ---
-        job.services = [service]
-
-        db.session.add(job)
-        db.session.flush()  # so job.id is available
-
-        first_vat_deadline = None
-
-        # 3) Loop over each selected template
-        for tpl_id_str in request.form.getlist('task_template_ids'):
-            tpl_id = int(tpl_id_str)
-            tpl   = TaskTemplate.query.get(tpl_id)
-
-            # permission check once per template
-            if not can_assign_task(engagement_assigned_to_id):
-                flash(f"You cannot assign tasks to user {engagement_assigned_to_id}.", 'danger')
-                return redirect(request.url)
-
-            # collect namespaced form fields
-            deadline_str     = request.form.get(f'deadline_{tpl_id}')
-            description      = request.form.get(f'description_{tpl.id}', tpl.description)
-            est_value        = request.form.get(f'estimated_value_{tpl_id}', 0)
-            est_unit         = request.form.get(f'estimated_unit_{tpl_id}', 'minutes')
-            priority_str     = request.form.get(f'priority_{tpl_id}', 'Normal')
-            recurrence_str = request.form.get(f'recurrence_{tpl_id}', 'NONE')
-            task_assigned_to_id_str = request.form.get(f'assigned_to_task_{tpl_id}')
-            
-            
-            final_task_assignee_id = engagement_assigned_to_id # Start with the default
-            if task_assigned_to_id_str:
-                try:
-                    final_task_assignee_id = int(task_assigned_to_id_str)
-                except ValueError:
-                    pass
-
-            # --- FIX: Assign the result of the helper to a new variable ---
-            newly_created_task = make_task_from_data(
-                title=tpl.title,
-                description=description,
-                assigned_to_id=final_task_assignee_id,
-                created_by_id=current_user.id,
-                client_id=int(client_id),
-                task_template_id=tpl_id,
-                job_id=job.id,
-                deadline_str=deadline_str,
-                estimated_value=est_value,
-                estimated_unit=est_unit,
-                priority_str=priority_str,
-                recurrence_str=recurrence_str
-            )
+        try:
+            specs = _task_specs_from_form(request.form, int(request.form.get('assigned_to', 0)))
+            # 2) Job, tasks and VAT filing month in one transaction
+            job = create_engagement(current_user, int(client_id), int(service_id), name, specs)
+        except ValueError as e:
+            # EngagementError, or an id that is not a number
+            flash(str(e), 'danger')
+            return redirect(request.url)
 
-            # --- FIX: Use the new variable to check the deadline ---
-            if service.name == 'Tax Services' and tpl.title == 'VAT Returns':
-                if newly_created_task and newly_created_task.deadline:
-                    first_vat_deadline = newly_created_task.deadline
-            
-        # --- NEW LOGIC: After creating all tasks, create the initial VatFilingMonth ---
-        if first_vat_deadline:
-            vat_month_date = first_vat_deadline - relativedelta(months=1)
-            month_str = vat_month_date.strftime('%b-%Y')
-            
-            existing_form = VatFilingMonth.query.filter_by(job_id=job.id, month=month_str).first()
-            if not existing_form:
-                new_vat_form = VatFilingMonth(
-                    job_id=job.id,
-                    month=month_str,
-                    nature_of_business=job.client.name 
-                )
-                db.session.add(new_vat_form)
-
-        # 4) commit everything
-        db.session.commit()
         flash('Engagement and its tasks created successfully!', 'success')
         run_async_in_background(send_new_engagement_notifications_async, job.id)
         return redirect(url_for('job.view_job', job_id=job.id))
 
-    # Serialize templates to plain dicts
-    serialized_templates = [{
-        'id': tpl.id,
-        'service_id': tpl.service_id,
-        'title': tpl.title,
-        'description': tpl.description
-    } for tpl in templates]
+    # GET: render the form from the cached lookups (clients are searched as you type)
+    templates, serialized_users = _serialized_form_lookups()
 
-    serialized_users = [{
-        'id': user.id,
-        'first_name': user.first_name,
-        'last_name': user.last_name
-    } for user in users]
-
-    # GET: render the form
     return render_template(
         'engagements/create_job.html',
         users=serialized_users,
-        clients=clients,
-        services=services,
-        templates=serialized_templates,
-        now_local=now_local
+        services=get_services_for_forms(),
+        templates=templates,
     )
 
+def _notify_rollout(report):
+    """One in-app notification and one email per assignee for the whole rollout."""
+    by_count = defaultdict(list)
+    for user_id, count in report['assignments'].items():
+        by_count[count].append(user_id)
+    for count, user_ids in by_count.items():
+        notify_users(
+            user_ids,
+            f"You have been assigned tasks on {count} new {report['service']} engagement(s).",
+            url_for('job.list_jobs'),
+            actor_id=current_user.id,
+        )
+    db.session.commit()
+    run_async_in_background(
+        send_engagement_rollout_notifications_async,
+        report['service'], report['created'], report['assignments'], current_user.id,
+    )
+
+def _run_rollout(service_id, client_ids, name, specs, rule, assignee_ids, skip_existing):
+    report = roll_out_engagements(
+        current_user, service_id, client_ids, name, specs,
+        rule=rule, assignee_ids=assignee_ids, skip_existing=skip_existing,
+    )
+    if report['created']:
+        _notify_rollout(report)
+    return report
+
+@job_bp.route('/jobs/rollout', methods=['GET', 'POST'])
+@login_required
+@supervisors_admins_directors
+def rollout_jobs():
+    """Create the same engagement for many clients at once."""
+    if request.method == 'POST':
+        try:
+            report = _run_rollout(
+                int(request.form.get('service_id', 0)),
+                request.form.getlist('client_ids'),
+                request.form.get('name'),
+                _task_specs_from_form(request.form, None),
+                request.form.get('rule', 'fixed'),
+                request.form.getlist('assignee_ids'),
+                skip_existing=bool(request.form.get('skip_existing')),
+            )
+        except ValueError as e:
+            # EngagementError, or an id that is not a number
+            flash(str(e), 'danger')
+            return redirect(request.url)
+
+        message = f"Created {report['created']} engagement(s)."
+        if report['skipped']:
+            message += f" Skipped {report['skipped']} client(s) that already have this engagement."
+        flash(message, 'success')
+        return redirect(url_for('job.list_jobs'))
+
+    templates, users = _serialized_form_lookups()
+    return render_template(
+        'engagements/rollout_jobs.html',
+        users=users,
+        clients=get_clients_for_forms(),
+        services=get_services_for_forms(),
+        templates=templates,
+        rules=ASSIGNMENT_RULES,
+        max_clients=ROLLOUT_MAX_CLIENTS,
+    )
+
+@job_bp.route('/api/jobs/rollout', methods=['POST'])
+@login_required
+@supervisors_admins_directors
+def rollout_jobs_api():
+    """
+    JSON version of the rollout form:
+    {"service_id", "client_ids": [...], "name", "rule", "assignee_ids": [...],
+     "skip_existing", "tasks": [{"template_id", "deadline", "description",
+     "estimated_value", "estimated_unit", "priority", "recurrence",
+     "assigned_to_id"}, ...]}
+    """
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({'status': 'error', 'message': 'No data received'}), 400
+
+    try:
+        specs = [
+            task_spec(
+                task['template_id'],
+                task.get('assigned_to_id'),
+                deadline=task.get('deadline'),
+                description=task.get('description'),
+                estimated_value=task.get('estimated_value', 0),
+                estimated_unit=task.get('estimated_unit', 'minutes'),
+                priority=task.get('priority', 'Medium'),
+                recurrence=task.get('recurrence', 'NONE'),
+            )
+            for task in data.get('tasks') or []
+        ]
+        report = _run_rollout(
+            int(data.get('service_id') or 0),
+            data.get('client_ids') or [],
+            data.get('name'),
+            specs,
+            data.get('rule', 'fixed'),
+            data.get('assignee_ids') or [],
+            skip_existing=bool(data.get('skip_existing', True)),
+        )
+    except (ValueError, KeyError, TypeError) as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    return jsonify({'status': 'success', **report}), 201
+
 @job_bp.route('/api/task_templates/<int:service_id>')
 @login_required
 def get_task_templates(service_id):
@@ -626,51 +681,30 @@ def import_vat_summary(job_id):
 
     if file and file.filename.endswith('.csv'):
         try:
-            # 2. Define the exact columns we expect from our template
-            required_columns = {
-                'Month', 'sales_zero_rated', 'sales_exempt', 'sales_vatable_16', 
-                'paid' # Add all other required columns from the template here
-            }
-
-            # 3. Read the CSV file using pandas
-            df = pd.read_csv(file)
-
-            # 4. VALIDATE: Check if all required columns are present
-            if not required_columns.issubset(df.columns):
-                flash('The uploaded file is missing required columns. Please use the template.', 'danger')
-                return redirect(url_for('job.view_job', job_id=job.id))
-
-            # 5. PROCESS: Loop through each row and save the data
-            for index, row in df.iterrows():
-                month = row['Month']
-                
-                # Find existing record or create a new one
-                summary = VatMonthlySummary.query.filter_by(job_id=job.id, month=month).first()
-                if not summary:
-                    summary = VatMonthlySummary(job_id=job.id, month=month)
-                    db.session.add(summary)
-
-                # Update fields from the CSV, converting to Decimal and handling potential errors
-                for col in df.columns:
-                    if hasattr(summary, col) and col != 'Month':
-                        try:
-                            # pd.to_numeric handles empty/NaN values gracefully
-                            value = pd.to_numeric(row[col], errors='coerce')
-                            if pd.notna(value):
-                                setattr(summary, col, Decimal(value))
-                        except (InvalidOperation, TypeError):
-                            # Skip columns that can't be converted
-                            pass
-            
-            # 6. COMMIT: Save all changes in a single transaction
-            db.session.commit()
-            flash(f'Successfully imported {len(df)} rows of VAT summary data!', 'success')
-
+            result = import_vat_summaries(file, job.id)
+        except VatImportError as e:
+            flash(f'{e}. Please use the template.', 'danger')
+            return redirect(url_for('job.view_job', job_id=job.id))
         except Exception as e:
             db.session.rollback()
             current_app.logger.error(f"CSV Import Error: {e}")
             flash('An error occurred during the import process. Please check the file format.', 'danger')
-            
+            return redirect(url_for('job.view_job', job_id=job.id))
+
+        imported = result['created'] + result['updated']
+        if imported:
+            flash(
+                f"Successfully imported {imported} rows of VAT summary data "
+                f"({result['created']} new, {result['updated']} updated).",
+                'success'
+            )
+
+        errors = result['errors']
+        if errors:
+            shown = '; '.join(f"line {line}: {message}" for line, message in errors[:VAT_IMPORT_ERRORS_SHOWN])
+            more = f" (and {len(errors) - VAT_IMPORT_ERRORS_SHOWN} more)" if len(errors) > VAT_IMPORT_ERRORS_SHOWN else ''
+            flash(f"Skipped rows with errors: {shown}{more}", 'warning')
+
         return redirect(url_for('job.view_job', job_id=job.id))
 
     else:
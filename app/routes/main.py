@@ -7,10 +7,14 @@ from sqlalchemy.orm import joinedload
 from datetime import date, datetime, time
 from app.services.users.user_service import get_user_for_dashboard
 from app.services.users.user_dashboard_factory import DASHBOARD_BUILDERS
+from app.utils.notifications import (
+    rooms_for_user, unread_broadcasts_query, mark_broadcasts_read,
+    mark_user_notifications_read, get_unread_count, get_notification_page, FEED_PAGE_SIZE
+)
 
 main_bp = Blueprint('main', __name__)
 
-PER_PAGE = 15
+ANNOUNCEMENTS_SHOWN = 10
 
 @main_bp.route('/')
 def home ():
@@ -45,64 +49,102 @@ def dashboard():
 @main_bp.route('/notifications/read', methods=['POST'])
 @login_required
 def mark_notifications_read():
-    Notification.query.filter_by(user_id=current_user.id, read=False).update({'read': True})
+    mark_user_notifications_read(current_user.id)
+    mark_broadcasts_read(current_user)
     db.session.commit()
     return jsonify({'status': 'success'})
 
+@main_bp.route('/notifications/unread-count')
+@login_required
+def get_unread_notification_count():
+    return jsonify({'count': get_unread_count(current_user)})
+
 @main_bp.route('/notifications')
 @login_required
 def get_notifications():
-    notifs = Notification.query.filter_by(user_id=current_user.id, read=False)\
-                               .order_by(Notification.created_at.desc())\
-                               .all()
-    return jsonify([n.to_dict() for n in notifs])
+    """
+    Unread notifications for the dropdown, newest first, one capped page at
+    a time (pass back `next_cursor` for more). Unread announcements lead
+    the first page.
+    """
+    cursor = request.args.get('cursor')
+    page = get_notification_page(
+        current_user.id,
+        cursor=cursor,
+        per_page=request.args.get('per_page', FEED_PAGE_SIZE, type=int),
+        unread_only=True,
+    )
+    items = [n.to_dict() for n in page.items]
+    if not cursor:
+        broadcasts = unread_broadcasts_query(current_user)\
+                                   .order_by(BroadcastNotification.created_at.desc())\
+                                   .limit(ANNOUNCEMENTS_SHOWN)\
+                                   .all()
+        items += [b.to_dict() for b in broadcasts]
+        items.sort(key=lambda item: item['created_at'], reverse=True)
+
+    return jsonify({
+        'notifications': items,
+        'unread_count': get_unread_count(current_user),
+        'next_cursor': page.next_cursor,
+    })
+
+@main_bp.route('/notifications/broadcast/read/<int:broadcast_id>', methods=['POST'])
+@login_required
+def mark_broadcast_read(broadcast_id):
+    mark_broadcasts_read(current_user, [broadcast_id])
+    db.session.commit()
+    return jsonify({'status': 'success'})
 
 @main_bp.route('/notifications/read/<int:notif_id>', methods=['POST'])
 @login_required
 def mark_single_notification_read(notif_id):
-    notif = Notification.query.filter_by(id=notif_id, user_id=current_user.id).first()
-    if notif and not notif.read:
-        notif.read = True
+    if mark_user_notifications_read(current_user.id, [notif_id]):
         db.session.commit()
     return jsonify({'status': 'success'})
 
 @main_bp.route('/notifications/all')
 @login_required
 def view_all_notifications():
-    """Renders the page with the first page of user's notifications, marking unread ones as read."""
-        
-    # 2. Paginate the full list of notifications (all are now 'read' for new viewers)
-    # The first page will contain the 15 most recent notifications, which includes all unread ones.
-    pagination = Notification.query.filter_by(user_id=current_user.id)\
-                                   .order_by(Notification.created_at.desc())\
-                                   .options(\
-                                       joinedload(Notification.actor) \
-                                   )\
-                                   .paginate(page=1, per_page=PER_PAGE, error_out=False)
+    """Renders the page with the first page of the user's notifications."""
+    page = get_notification_page(current_user.id)
+
+    # Latest announcements sent to the user's role / department rooms
+    rooms = rooms_for_user(current_user)
+    announcements = BroadcastNotification.query\
+                                   .filter(BroadcastNotification.audience.in_(rooms))\
+                                   .order_by(BroadcastNotification.created_at.desc())\
+                                   .limit(ANNOUNCEMENTS_SHOWN)\
+                                   .all()
+    read_ids = {
+        broadcast_id for (broadcast_id,) in db.session.query(BroadcastNotificationRead.broadcast_id)
+        .filter(
+            BroadcastNotificationRead.user_id == current_user.id,
+            BroadcastNotificationRead.broadcast_id.in_([a.id for a in announcements]),
+        )
+    } if announcements else set()
 
     return render_template('user/notifications.html', 
-                           pagination=pagination, # Pass the paginated object
+                           page=page,
+                           unread_count=get_unread_count(current_user),
+                           announcements=announcements,
+                           read_announcement_ids=read_ids,
                            title="All Notifications")
 
 @main_bp.route('/api/notifications', methods=['GET'])
 @login_required
 def api_get_notifications_page():
     """
-    AJAX endpoint to load subsequent pages of notifications.
-    This will be called by the 'Load more' button.
+    AJAX endpoint behind the 'Load more' button: the page after `cursor`.
     """
-    # Get the requested page number from query parameters, default to 1
-    page = request.args.get('page', 1, type=int)
-    
-    pagination = Notification.query.filter_by(user_id=current_user.id)\
-                                   .order_by(Notification.created_at.desc())\
-                                   .options(joinedload(Notification.actor))\
-                                   .paginate(page=page, per_page=PER_PAGE, error_out=False)
-
-    # Convert notification objects to a list of dictionaries for JSON response
-    # Assuming the Notification model has a .to_dict() method or a simple dict can be created.
+    page = get_notification_page(
+        current_user.id,
+        cursor=request.args.get('cursor'),
+        per_page=request.args.get('per_page', FEED_PAGE_SIZE, type=int),
+    )
+
     notifications_data = []
-    for notif in pagination.items:
+    for notif in page.items:
         notifications_data.append({
             'id': notif.id,
             'message': notif.message,
@@ -114,8 +156,7 @@ def api_get_notifications_page():
 
     return jsonify({
         'notifications': notifications_data,
-        'has_next': pagination.has_next,
-        'next_page': pagination.next_num,
-        'current_page': pagination.page
+        'has_next': page.has_next,
+        'next_cursor': page.next_cursor,
     })
 
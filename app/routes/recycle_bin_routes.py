@@ -1,11 +1,13 @@
 from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for
 from flask_login import login_required, current_user
-from sqlalchemy import or_, and_
-from datetime import datetime
 from app.models import (
     User, Task, Job, Department, Client, Service, TaskTemplate, Sheet,
     RoleEnum, db
 )
+from app.services.recycle_bin.recycle_bin_query_service import (
+    ALL_ITEM_TYPES, OWN_ITEM_TYPES, STATS_ITEM_TYPES,
+    get_deleted_counts, get_deleted_items_page, get_deleter_names
+)
 
 recycle_bin_bp = Blueprint('recycle_bin', __name__)
 
@@ -17,220 +19,34 @@ def get_soft_deletable_models():
 @recycle_bin_bp.route('/recycle-bin')
 @login_required
 def view_recycle_bin():
-    page = request.args.get('page', 1, type=int)
-    per_page = 10  # Changed to 10 per page as requested
+    cursor = request.args.get('cursor')
     model_type = request.args.get('type', 'all')
-    
-    # Calculate pagination indices
-    start_index = (page - 1) * per_page + 1
-    
-    # For regular users - only show their own deleted items
-    if current_user.role not in ['DIRECTOR', 'ADMIN']:
-        deleted_items = []
-        stats = {'tasks': 0, 'jobs': 0}
-        
-        if model_type in ['all', 'tasks']:
-            user_tasks = Task.query.filter(
-                Task.deleted_at.isnot(None),
-                Task.deleted_by_id == current_user.id
-            ).all()
-            stats['tasks'] = len(user_tasks)
-            for task in user_tasks:
-                deleted_items.append({
-                    'type': 'Task',
-                    'object': task,
-                    'deleted_at': task.deleted_at,
-                    'deleted_by': task.deleted_by
-                })
-        
-        if model_type in ['all', 'jobs']:
-            user_jobs = Job.query.filter(
-                Job.deleted_at.isnot(None),
-                Job.deleted_by_id == current_user.id
-            ).all()
-            stats['jobs'] = len(user_jobs)
-            for job in user_jobs:
-                deleted_items.append({
-                    'type': 'Engagement',
-                    'object': job,
-                    'deleted_at': job.deleted_at,
-                    'deleted_by': job.deleted_by
-                })
-        
-        # Sort by deletion date
-        deleted_items.sort(key=lambda x: x['deleted_at'], reverse=True)
-        
-        # Pagination
-        total_count = len(deleted_items)
-        total_pages = (total_count + per_page - 1) // per_page
-        start_idx = (page - 1) * per_page
-        end_idx = start_idx + per_page
-        paginated_items = deleted_items[start_idx:end_idx]
-        end_index = min(start_idx + len(paginated_items), total_count)
-        
-        return render_template('recycle_bin.html',
-                            deleted_items=paginated_items,
-                            page=page,
-                            per_page=per_page,
-                            total_count=total_count,
-                            total_pages=total_pages,
-                            start_index=start_index,
-                            end_index=end_index,
-                            model_type=model_type,
-                            stats=stats,
-                            is_director=False)
-    
-    else:  # Directors/Admins - see everything
-        stats = {
-            'tasks': Task.query.filter(Task.deleted_at.isnot(None)).count(),
-            'jobs': Job.query.filter(Job.deleted_at.isnot(None)).count(),
-            'users': User.query.filter(User.deleted_at.isnot(None)).count(),
-            'departments': Department.query.filter(Department.deleted_at.isnot(None)).count(),
-            'clients': Client.query.filter(Client.deleted_at.isnot(None)).count(),
-            'services': Service.query.filter(Service.deleted_at.isnot(None)).count(),
-        }
-        
-        if model_type == 'tasks':
-            query = Task.query.filter(Task.deleted_at.isnot(None))
-            total_count = query.count()
-            items = query.order_by(Task.deleted_at.desc()).paginate(
-                page=page, per_page=per_page, error_out=False
-            )
-            deleted_items = [{
-                'type': 'Task',
-                'object': item,
-                'deleted_at': item.deleted_at,
-                'deleted_by': item.deleted_by
-            } for item in items.items]
-            
-        elif model_type == 'jobs':
-            query = Job.query.filter(Job.deleted_at.isnot(None))
-            total_count = query.count()
-            items = query.order_by(Job.deleted_at.desc()).paginate(
-                page=page, per_page=per_page, error_out=False
-            )
-            deleted_items = [{
-                'type': 'Engagement',
-                'object': item,
-                'deleted_at': item.deleted_at,
-                'deleted_by': item.deleted_by
-            } for item in items.items]
-            
-        elif model_type == 'users':
-            query = User.query.filter(User.deleted_at.isnot(None))
-            total_count = query.count()
-            items = query.order_by(User.deleted_at.desc()).paginate(
-                page=page, per_page=per_page, error_out=False
-            )
-            deleted_items = [{
-                'type': 'User',
-                'object': item,
-                'deleted_at': item.deleted_at,
-                'deleted_by': item.deleted_by
-            } for item in items.items]
-            
-        elif model_type == 'departments':
-            query = Department.query.filter(Department.deleted_at.isnot(None))
-            total_count = query.count()
-            items = query.order_by(Department.deleted_at.desc()).paginate(
-                page=page, per_page=per_page, error_out=False
-            )
-            deleted_items = [{
-                'type': 'Department',
-                'object': item,
-                'deleted_at': item.deleted_at,
-                'deleted_by': item.deleted_by
-            } for item in items.items]
-            
-        elif model_type == 'clients':
-            query = Client.query.filter(Client.deleted_at.isnot(None))
-            total_count = query.count()
-            items = query.order_by(Client.deleted_at.desc()).paginate(
-                page=page, per_page=per_page, error_out=False
-            )
-            deleted_items = [{
-                'type': 'Client',
-                'object': item,
-                'deleted_at': item.deleted_at,
-                'deleted_by': item.deleted_by
-            } for item in items.items]
-            
-        elif model_type == 'services':
-            query = Service.query.filter(Service.deleted_at.isnot(None))
-            total_count = query.count()
-            items = query.order_by(Service.deleted_at.desc()).paginate(
-                page=page, per_page=per_page, error_out=False
-            )
-            deleted_items = [{
-                'type': 'Service',
-                'object': item,
-                'deleted_at': item.deleted_at,
-                'deleted_by': item.deleted_by
-            } for item in items.items]
-            
-        else:  # 'all' - show all deleted items
-            all_deleted = []
-            
-            # Get all deleted items from different models
-            models_to_query = [
-                (Task, 'Task'),
-                (Job, 'Engagement'),
-                (User, 'User'),
-                (Department, 'Department'),
-                (Client, 'Client'),
-                (Service, 'Service')
-            ]
-            
-            for model_class, item_type in models_to_query:
-                items = model_class.query.filter(model_class.deleted_at.isnot(None))\
-                                      .order_by(model_class.deleted_at.desc()).all()
-                for item in items:
-                    all_deleted.append({
-                        'type': item_type,
-                        'object': item,
-                        'deleted_at': item.deleted_at,
-                        'deleted_by': item.deleted_by
-                    })
-            
-            # Sort all by deletion date
-            all_deleted.sort(key=lambda x: x['deleted_at'], reverse=True)
-            
-            # Pagination
-            total_count = len(all_deleted)
-            total_pages = (total_count + per_page - 1) // per_page
-            start_idx = (page - 1) * per_page
-            end_idx = start_idx + per_page
-            deleted_items = all_deleted[start_idx:end_idx]
-            end_index = min(start_idx + len(deleted_items), total_count)
-            
-            return render_template('recycle_bin.html',
-                                deleted_items=deleted_items,
-                                page=page,
-                                per_page=per_page,
-                                total_count=total_count,
-                                total_pages=total_pages,
-                                start_index=start_index,
-                                end_index=end_index,
-                                model_type=model_type,
-                                stats=stats,
-                                is_director=True)
-        
-        # For single model type queries with SQLAlchemy pagination
-        total_pages = items.pages
-        end_index = min(start_index + len(deleted_items) - 1, total_count)
-        
-        return render_template('recycle_bin.html',
-                            deleted_items=deleted_items,
-                            page=page,
-                            per_page=per_page,
-                            total_count=total_count,
-                            total_pages=total_pages,
-                            start_index=start_index,
-                            end_index=end_index,
-                            model_type=model_type,
-                            stats=stats,
-                            is_director=True,
-                            pagination=items)
+
+    is_director = current_user.role in ['DIRECTOR', 'ADMIN']
+
+    # Regular users only see the tasks and engagements they deleted themselves
+    if is_director:
+        visible_types, deleted_by_id = ALL_ITEM_TYPES, None
+    else:
+        visible_types, deleted_by_id = OWN_ITEM_TYPES, current_user.id
+
+    if model_type not in visible_types:
+        model_type = 'all'
+    item_types = visible_types if model_type == 'all' else (model_type,)
+
+    stats = get_deleted_counts(visible_types, deleted_by_id)
+    total_count = sum(stats[key] for key in item_types)
+
+    pagination = get_deleted_items_page(item_types, deleted_by_id, cursor=cursor, total=total_count)
+
+    return render_template('recycle_bin.html',
+                        deleted_items=pagination.items,
+                        deleter_names=get_deleter_names(pagination.items),
+                        pagination=pagination,
+                        total_count=total_count,
+                        model_type=model_type,
+                        stats=stats,
+                        is_director=is_director)
 
 
 
@@ -312,27 +128,8 @@ def get_recycle_bin_stats():
     """Get statistics for the recycle bin (used for the dashboard card)"""
     if current_user.role not in ['DIRECTOR', 'ADMIN']:
         # Regular users - only count their own deleted items
-        user_deleted_count = (
-            Task.query.filter(
-                Task.deleted_at.isnot(None),
-                Task.deleted_by_id == current_user.id
-            ).count() +
-            Job.query.filter(
-                Job.deleted_at.isnot(None),
-                Job.deleted_by_id == current_user.id
-            ).count()
-        )
-        return jsonify({'count': user_deleted_count})
+        counts = get_deleted_counts(OWN_ITEM_TYPES, deleted_by_id=current_user.id)
     else:
         # Directors/Admins - count all deleted items
-        total_deleted = (
-            Task.query.filter(Task.deleted_at.isnot(None)).count() +
-            Job.query.filter(Job.deleted_at.isnot(None)).count() +
-            User.query.filter(User.deleted_at.isnot(None)).count() +
-            Department.query.filter(Department.deleted_at.isnot(None)).count() +
-            Client.query.filter(Client.deleted_at.isnot(None)).count() +
-            Service.query.filter(Service.deleted_at.isnot(None)).count() +
-            TaskTemplate.query.filter(TaskTemplate.deleted_at.isnot(None)).count() +
-            Sheet.query.filter(Sheet.deleted_at.isnot(None)).count()
-        )
-        return jsonify({'count': total_deleted})
\ No newline at end of file
+        counts = get_deleted_counts(STATS_ITEM_TYPES)
+    return jsonify({'count': sum(counts.values())})
@@ -4,20 +4,27 @@ from app.utils.db import db
 from flask_login import login_required, current_user
 import csv, io
 from flask import Response
+from app.utils.pagination import keyset_paginate
 
 
 sheet_bp = Blueprint('sheet', __name__)
 
+SHEETS_PER_PAGE = 20
+
 
 @sheet_bp.route('/sheets')
 @login_required
 def list_sheets():
-    sheets = Sheet.query.filter(
-    Sheet.visible_on_sheets_home == True,
-    Sheet.deleted_at.is_(None)
-    ).all()
-    visible_sheets = [s for s in sheets if s.can_user_view(current_user)]
-    return render_template('sheets/list.html', sheets=visible_sheets)
+    query = Sheet.query.filter(
+        Sheet.visible_on_sheets_home == True,
+        Sheet.deleted_at.is_(None),
+        Sheet.visible_to(current_user),
+    )
+    pagination = keyset_paginate(
+        query, Sheet.created_at, Sheet.id,
+        cursor=request.args.get('cursor'), per_page=SHEETS_PER_PAGE, descending=True,
+    )
+    return render_template('sheets/list.html', sheets=pagination.items, pagination=pagination)
 
 
 
@@ -4,11 +4,13 @@ from flask_login import login_required, current_user
 from app.utils.db import db
 import pytz
 from pytz import timezone
-from app.utils.notification import send_task_notification_async, run_async_in_background, send_task_review_decision_notification_async, send_task_submitted_notification_async
-from app.utils.notifications import create_and_emit_notification
+from app.utils.notification import queue_task_assignment_email
+from app.utils.notifications import notify_users, broadcast_notification, reviewers_room
 import os
 from werkzeug.utils import secure_filename
+from itsdangerous import URLSafeTimedSerializer, BadSignature
 from sqlalchemy import func, desc, case, distinct
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import aliased
 from app.utils.helpers import can_assign_task, get_employee_ids, can_delete_task, get_next_reviewer_info
 from datetime import datetime, timedelta
@@ -22,39 +24,27 @@ from app.services.tasks.task_factory import (
     get_task_form_data,
     make_task_from_data,
     add_service_to_job,
-    create_vat_form
-    
+    create_vat_form,
+    task_deadline_taken
 )
 
 from app.services.users.user_service import get_users_for_assignment
+from app.services.tasks.workload_query_service import get_user_workload, get_team_workload, period_start
+from app.services.tasks.task_query_service import get_assigned_task_counts
+from app.services.jobs.job_query_service import get_engagement_count
+from app.utils.pagination import keyset_paginate
 
 from app.services.clients.client_query_service  import search_clients_by_name
 
 task_bp= Blueprint('task', __name__)
 
+DEADLINE_TAKEN_MESSAGE = ("This engagement already has a task from that template due at that time "
+                          "(check the trash too). Please choose another deadline.")
+
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
 
-def get_date_range(period):
-    """Calculate date range based on period filter"""
-    now = datetime.utcnow()
-    
-    if period == 'today':
-        start_date = datetime.combine(now.date(), datetime.min.time())
-    elif period == 'week':
-        start_date = now - timedelta(days=now.weekday())  # Start of week (Monday)
-        start_date = datetime.combine(start_date.date(), datetime.min.time())
-    elif period == 'month':
-        start_date = now.replace(day=1)  # First day of current month
-        start_date = datetime.combine(start_date.date(), datetime.min.time())
-    elif period == '6months':
-        start_date = now - timedelta(days=30*6)  # Approximately 6 months back
-    else:
-        start_date = None  # No date filter
-    
-    return start_date
-
 @task_bp.context_processor
 def inject_task_helpers():
     """Injects helper functions into the template context."""
@@ -64,77 +54,14 @@ def inject_task_helpers():
 
 def _handle_task_completion(task, db_session):
     """
-    Handles post-completion logic for a task, including recurrence and VAT form creation.
-    Returns a dynamic success message for flashing to the user.
+    Returns the success message for a task that was just approved.
+    Upcoming instances of recurring tasks (and their VAT forms) are created
+    ahead of time by `flask tasks materialize` (app/utils/task_recurrence.py),
+    so approving a task does no recurrence work.
     """
-    # Default message if the task is not recurring
-    success_message = "Task has been marked as completed!"
-
-    if not task.recurrence or task.recurrence == RecurrenceEnum.NONE or not task.deadline:
-        return success_message
-
-    try:
-        next_deadline = None
-        if task.recurrence == RecurrenceEnum.DAILY:
-            next_deadline = task.deadline + relativedelta(days=1)
-        elif task.recurrence == RecurrenceEnum.WEEKLY:
-            next_deadline = task.deadline + relativedelta(weeks=1)
-        elif task.recurrence == RecurrenceEnum.MONTHLY:
-            next_deadline = task.deadline + relativedelta(months=1)
-        elif task.recurrence == RecurrenceEnum.YEARLY:
-            next_deadline = task.deadline + relativedelta(years=1)
-
-        if next_deadline:
-            # Check if the next task already exists to prevent duplicates
-            next_task_exists = Task.query.filter(
-                Task.job_id == task.job_id,
-                Task.task_template_id == task.task_template_id,
-                Task.deadline == next_deadline
-            ).first()
-
-            if not next_task_exists:
-                # Create the new recurring task
-                new_task = Task(
-                    title=task.title,
-                    description=task.description,
-                    assigned_to_id=task.assigned_to_id,
-                    created_by_id=task.created_by_id,
-                    client_id=task.client_id,
-                    task_template_id=task.task_template_id,
-                    job_id=task.job_id,
-                    deadline=next_deadline,
-                    estimated_minutes=task.estimated_minutes,
-                    priority=task.priority,
-                    status=TaskStatusEnum.ASSIGNED,
-                    recurrence=task.recurrence
-                )
-                db_session.add(new_task)
-                success_message = f"Task completed and recurring task scheduled for {next_deadline.strftime('%b-%d-%Y')}."
-
-                # --- VAT Form logic, now tied to the completion of a VAT task ---
-                if (task.task_template and task.task_template.service and task.task_template.service.name == 'Tax Services' and
-                        task.task_template and task.task_template.title == 'VAT Returns'):
-                    
-                    vat_month_date = next_deadline - relativedelta(months=1)
-                    vat_month_str = vat_month_date.strftime('%b-%Y')
-
-                    vat_form_exists = VatFilingMonth.query.filter_by(
-                        job_id=task.job_id, month=vat_month_str
-                    ).first()
-                    if not vat_form_exists:
-                        new_vat_form = VatFilingMonth(
-                            job_id=task.job_id,
-                            month=vat_month_str,
-                            nature_of_business=task.job.client.name
-                        )
-                        db_session.add(new_vat_form)
-                        flash(f"New VAT form for {vat_month_str} created.", "info")
-
-    except Exception as e:
-        current_app.logger.error(f"Error during recurrence logic for task {task.id}: {e}", exc_info=True)
-        flash("A server error occurred while creating the recurring task. Please notify an administrator.", "danger")
-
-    return success_message
+    if task.recurrence and task.recurrence != RecurrenceEnum.NONE:
+        return "Task has been marked as completed! Its next occurrence is scheduled automatically."
+    return "Task has been marked as completed!"
 
 @task_bp.route("/task/new", methods=["GET", "POST"])
 @login_required
@@ -184,6 +111,11 @@ def create_task():
             flash("You are not allowed to assign this task to the selected user.", "danger")
             return redirect(url_for("task.create_task"))
 
+        # An engagement holds one task per template and deadline
+        if deadline_str and task_deadline_taken(final_job_id, int(task_template_id) if task_template_id else None, utc_deadline):
+            flash(DEADLINE_TAKEN_MESSAGE, "danger")
+            return redirect(url_for("task.create_task", job_id=final_job_id))
+
         # --- 3) Create task ---
         task = make_task_from_data(
             title=title,
@@ -211,14 +143,21 @@ def create_task():
         if vat_msg:
             flash(vat_msg, "info")
 
-        # --- 6) Commit all changes ---
-        db.session.commit()
-
-        # --- 7) Notifications ---
+        # --- 6) In-app notification, committed with the task ---
+        db.session.flush()
         notif_msg = f"You've been assigned a new task: {task.title}"
         notif_url = url_for("task.get_task", task_id=task.id)
-        create_and_emit_notification(task.assigned_to_id, notif_msg, notif_url, actor_id=current_user.id)
-        run_async_in_background(send_task_notification_async, task.id)
+        notify_users([task.assigned_to_id], notif_msg, notif_url, actor_id=current_user.id)
+        queue_task_assignment_email(task)
+
+        # --- 7) Commit all changes ---
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another request took the same template and deadline meanwhile
+            db.session.rollback()
+            flash(DEADLINE_TAKEN_MESSAGE, "danger")
+            return redirect(url_for("task.create_task", job_id=final_job_id))
 
         flash("Task created successfully!", "success")
         return redirect(url_for("task.get_task", task_id=task.id))
@@ -277,6 +216,11 @@ def get_task(task_id):
     approvals = sorted(task.approvals, key=lambda x: x.id, reverse=True)
     job = task.job # Also "free"
 
+    # Sign every avatar on the page in one pass; the template's
+    # get_file_url calls are then URL-cache hits
+    people = [task.creator, task.assignee] + [n.user for n in task.notes] + [a.approver for a in approvals]
+    storage_service.get_file_urls(person.profile_image_file for person in people if person)
+
     # 4. The rest of your logic is unchanged
     #    These targeted queries are specific and efficient, so they are fine.
     local_tz = pytz.timezone('Africa/Nairobi')
@@ -344,9 +288,9 @@ def get_assigned_tasks(user_id):
         return redirect(url_for('main.dashboard')) # Or any other safe page
     # --- END PERMISSION CHECK --
     
-    # Get parameters from URL: /.../123?tab=in_progress&page=2
+    # Get parameters from URL: /.../123?tab=in_progress&cursor=<opaque>
     current_tab = request.args.get('tab', 'assigned') # Default to 'assigned' tab
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     
     # --- THIS IS THE NEW PART ---
     # Check if this is an async request from our JavaScript
@@ -357,7 +301,6 @@ def get_assigned_tasks(user_id):
     local_tz = pytz.timezone('Africa/Nairobi')
     now = datetime.utcnow()
 
-    # ... (Your entire query logic for 'base_task_query', 'if current_tab == ...', etc. stays EXACTLY THE SAME) ...
     # Base Task Query (applies to most tabs)
     base_task_query = Task.query.filter(
         Task.assigned_to_id == user_id,
@@ -369,27 +312,34 @@ def get_assigned_tasks(user_id):
         joinedload(Task.client),
         joinedload(Task.job)
     ]
-    
-    query = None # Initialize query
-    if current_tab == 'assigned':
-        query = base_task_query.filter(Task.status == TaskStatusEnum.ASSIGNED).options(*task_options).order_by(Task.deadline.asc())
-    elif current_tab == 'in_progress':
-        query = base_task_query.filter(Task.status == TaskStatusEnum.IN_PROGRESS).options(*task_options).order_by(Task.deadline.asc())
-    elif current_tab == 'paused':
-        query = base_task_query.filter(Task.status == TaskStatusEnum.PAUSED).options(*task_options).order_by(Task.deadline.asc())
-    elif current_tab == 'under_review':
-        query = base_task_query.filter(Task.status.in_([TaskStatusEnum.REVIEW, TaskStatusEnum.MANAGER_REVIEW, TaskStatusEnum.PARTNER_REVIEW])).options(*task_options).order_by(Task.updated_at.desc())
-    elif current_tab == 'rejected':
-        query = base_task_query.filter(Task.status == TaskStatusEnum.RE_ASSIGNED).options(*task_options).order_by(Task.updated_at.desc())
-    elif current_tab == 'overdue':
-        query = base_task_query.filter(Task.deadline < now, Task.status.notin_([TaskStatusEnum.COMPLETED, TaskStatusEnum.REVIEW, TaskStatusEnum.MANAGER_REVIEW, TaskStatusEnum.PARTNER_REVIEW])).options(*task_options).order_by(Task.deadline.asc())
-    elif current_tab == 'engagements':
-        query = Job.query.filter(Job.tasks.any(Task.assigned_to_id == user_id), Job.deleted_at == None).options(subqueryload(Job.tasks).joinedload(Task.assignee), joinedload(Job.client), joinedload(Job.creator), joinedload(Job.services)).order_by(Job.created_at.desc())
-    else: # Default case
-        query = base_task_query.filter(Task.status == TaskStatusEnum.ASSIGNED).options(*task_options).order_by(Task.deadline.asc())
-
-    # Paginate the selected query
-    pagination_data = query.paginate(page=page, per_page=15, error_out=False)
+
+    # Exact tab totals come from the cached per-user counts, not a COUNT per page
+    counts = get_assigned_task_counts(user_id)
+
+    # tab -> (status filter, sort column, newest first?, total)
+    task_tabs = {
+        'assigned': (Task.status == TaskStatusEnum.ASSIGNED, Task.deadline, False, counts['assigned_tasks_count']),
+        'in_progress': (Task.status == TaskStatusEnum.IN_PROGRESS, Task.deadline, False, counts['in_progress_tasks_count']),
+        'paused': (Task.status == TaskStatusEnum.PAUSED, Task.deadline, False, counts['paused_tasks_count']),
+        'under_review': (Task.status.in_([TaskStatusEnum.REVIEW, TaskStatusEnum.MANAGER_REVIEW, TaskStatusEnum.PARTNER_REVIEW]), Task.updated_at, True, counts['under_review_tasks_count']),
+        'rejected': (Task.status == TaskStatusEnum.RE_ASSIGNED, Task.updated_at, True, counts['rejected_tasks_count']),
+        'overdue': ((Task.deadline < now) & Task.status.notin_([TaskStatusEnum.COMPLETED, TaskStatusEnum.REVIEW, TaskStatusEnum.MANAGER_REVIEW, TaskStatusEnum.PARTNER_REVIEW]) & ~Task.approvals.any(TaskApproval.decision == DecisionEnum.APPROVED), Task.deadline, False, counts['overdue_tasks_count']),
+    }
+
+    # Keyset-paginate the selected tab
+    if current_tab == 'engagements':
+        query = Job.query.filter(Job.tasks.any(Task.assigned_to_id == user_id), Job.deleted_at == None).options(subqueryload(Job.tasks).joinedload(Task.assignee), joinedload(Job.client), joinedload(Job.creator), joinedload(Job.services))
+        pagination_data = keyset_paginate(
+            query, Job.created_at, Job.id, cursor=cursor, per_page=15,
+            descending=True, total=get_engagement_count(user_id)
+        )
+    else:
+        status_filter, sort_column, descending, total = task_tabs.get(current_tab, task_tabs['assigned'])
+        query = base_task_query.filter(status_filter).options(*task_options)
+        pagination_data = keyset_paginate(
+            query, sort_column, Task.id, cursor=cursor, per_page=15,
+            descending=descending, total=total
+        )
 
     # --- THIS IS THE NEW PART ---
     # Prepare the context dictionary
@@ -508,14 +458,14 @@ def update_task_progress(task_id, action):
                 notif_url = url_for('task.get_task', task_id=task.id)
                 
                 if department and department.reviewers:
-                    for reviewer in department.reviewers:
-                        create_and_emit_notification(reviewer.id, notif_msg, notif_url, actor_id=current_user.id)
+                    # One shared row and one emit for the whole reviewer group
+                    broadcast_notification(reviewers_room(department.id), notif_msg, notif_url, actor_id=current_user.id)
             else:
                 task.status = TaskStatusEnum.REVIEW
                 message = "Task submitted for review."
                 notif_msg = f"{current_user.first_name} has submitted task '{task.title}' for your review."
                 notif_url = url_for('task.get_task', task_id=task.id)
-                create_and_emit_notification(task.created_by_id, notif_msg, notif_url, actor_id=current_user.id)
+                notify_users([task.created_by_id], notif_msg, notif_url, actor_id=current_user.id)
             
             # 5. Commit and return a single, clean response
             db.session.commit()
@@ -552,6 +502,7 @@ def upload_document(task_id):
 
     successful_uploads = 0
 
+    allowed = []
     for file in files:
         if file and file.filename:
             filename = secure_filename(file.filename)
@@ -559,27 +510,26 @@ def upload_document(task_id):
             if not allowed_file(filename):
                 flash(f"File type for '{filename}' is not allowed.", "danger")
                 continue
-
-            try:
-                # Upload to DigitalOcean Spaces
-                from app.utils.storage_service import storage_service
-                upload_result = storage_service.upload_file(file, folder='task_documents')
-                
-                # Store file info in database
-                document = TaskDocument(
-                    task_id=task.id,
-                    uploaded_by_id=current_user.id,
-                    file_name=upload_result['original_filename'],
-                    file_path=upload_result['key'],
-                    file_mime_type=upload_result['mimetype']
-                )
-                
-                db.session.add(document)
-                successful_uploads += 1
-
-            except Exception as e:
-                print(f"❌ ERROR in upload_document: {type(e).__name__}: {e}")
-                flash(f"Error uploading '{filename}': {str(e)}", "danger")
+            allowed.append(file)
+
+    # Upload to DigitalOcean Spaces concurrently, then record what landed
+    for upload_result in storage_service.upload_files(allowed, folder='task_documents'):
+        if not upload_result['ok']:
+            print(f"❌ ERROR in upload_document: {upload_result['error']}")
+            flash(f"Error uploading '{upload_result['original_filename']}': {upload_result['error']}", "danger")
+            continue
+
+        # Store file info in database
+        document = TaskDocument(
+            task_id=task.id,
+            uploaded_by_id=current_user.id,
+            file_name=upload_result['original_filename'],
+            file_path=upload_result['key'],
+            file_mime_type=upload_result['mimetype']
+        )
+        
+        db.session.add(document)
+        successful_uploads += 1
 
     if successful_uploads > 0:
         try:
@@ -592,6 +542,115 @@ def upload_document(task_id):
 
     return redirect(url_for('task.get_task', task_id=task.id))
 
+# --- DIRECT (BROWSER-TO-STORAGE) UPLOADS ---
+# The browser asks for a presigned POST per file, uploads straight to the
+# bucket, then confirms; only the confirm step touches the database.
+_UPLOAD_TOKEN_SALT = 'task-document-upload'
+
+
+def _upload_serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt=_UPLOAD_TOKEN_SALT)
+
+
+@task_bp.route('/task/<int:task_id>/upload/presign', methods=['POST'])
+@login_required
+def presign_document_uploads(task_id):
+    """
+    Body: {"files": [{"name", "type"}]}. Returns one signed upload per
+    allowed file, each with a token that `confirm_document_uploads` accepts.
+    """
+    task = Task.query.get_or_404(task_id)
+    files = (request.get_json(silent=True) or {}).get('files') or []
+    max_size = current_app.config['DIRECT_UPLOAD_MAX_SIZE']
+    expires_in = current_app.config['DIRECT_UPLOAD_EXPIRES_SECONDS']
+
+    uploads, rejected = [], []
+    for entry in files:
+        filename = secure_filename(str(entry.get('name') or ''))
+        if not filename or not allowed_file(filename):
+            rejected.append({'name': entry.get('name'), 'error': 'File type is not allowed.'})
+            continue
+
+        post = storage_service.create_presigned_post(
+            filename,
+            folder='task_documents',
+            content_type=entry.get('type') or None,
+            max_size=max_size,
+            expires_in=expires_in,
+        )
+        token = _upload_serializer().dumps({
+            'task_id': task.id,
+            'user_id': current_user.id,
+            'key': post['key'],
+            'name': post['original_filename'],
+            'mimetype': post['mimetype'],
+        })
+        uploads.append({
+            'name': entry.get('name'),
+            'url': post['url'],
+            'fields': post['fields'],
+            'token': token,
+        })
+
+    return jsonify({'uploads': uploads, 'rejected': rejected})
+
+
+@task_bp.route('/task/<int:task_id>/upload/confirm', methods=['POST'])
+@login_required
+def confirm_document_uploads(task_id):
+    """
+    Body: {"tokens": [...]}. Checks each uploaded object with a HEAD request
+    and records a TaskDocument for the ones that arrived intact. The page
+    reports the outcome from the returned `documents` / `failed` lists.
+    """
+    task = Task.query.get_or_404(task_id)
+    tokens = (request.get_json(silent=True) or {}).get('tokens') or []
+    # Allow for the upload itself finishing right at the policy's expiry
+    max_age = current_app.config['DIRECT_UPLOAD_EXPIRES_SECONDS'] * 2
+    max_size = current_app.config['DIRECT_UPLOAD_MAX_SIZE']
+
+    documents, failed = [], []
+    for token in tokens:
+        try:
+            upload = _upload_serializer().loads(token, max_age=max_age)
+        except BadSignature:
+            failed.append({'error': 'Upload token is invalid or expired.'})
+            continue
+        if upload['task_id'] != task.id or upload['user_id'] != current_user.id:
+            failed.append({'name': upload['name'], 'error': 'Upload does not belong to this task.'})
+            continue
+
+        stored = storage_service.head_file(upload['key'])
+        if not stored:
+            failed.append({'name': upload['name'], 'error': 'File was not found in storage.'})
+            continue
+        if stored['size'] > max_size:
+            storage_service.delete_file(upload['key'])
+            failed.append({'name': upload['name'], 'error': 'File is too large.'})
+            continue
+
+        # A retried confirm must not record the same object twice
+        if TaskDocument.query.filter_by(file_path=upload['key']).first():
+            continue
+
+        document = TaskDocument(
+            task_id=task.id,
+            uploaded_by_id=current_user.id,
+            file_name=upload['name'],
+            file_path=upload['key'],
+            file_mime_type=stored['mimetype'] or upload['mimetype'],
+        )
+        db.session.add(document)
+        documents.append(document)
+
+    if documents:
+        db.session.commit()
+
+    return jsonify({
+        'documents': [{'id': d.id, 'name': d.file_name} for d in documents],
+        'failed': failed,
+    })
+
 # --- DELETE DOCUMENT ROUTE ---
 @task_bp.route('/task/<int:task_id>/document/<int:doc_id>/delete', methods=['POST'])
 @login_required
@@ -699,9 +758,10 @@ def add_task_note(task_id):
     if task.created_by_id != current_user.id and task.created_by_id != task.assigned_to_id:
         recipients.add(task.created_by_id)
 
-    # 3. Emit the notification to all recipients
-    for user_id in recipients:
-        create_and_emit_notification(user_id, notif_msg, actor_id=current_user.id)
+    # 3. Notify all recipients in one insert; the emits go out on commit
+    if recipients:
+        notify_users(recipients, notif_msg, actor_id=current_user.id)
+        db.session.commit()
     
     flash("Note added.", "success")
     return redirect(url_for('task.get_task', task_id=task_id))
@@ -783,13 +843,13 @@ def review_task(task_id):
             if task.job and task.job.review_partner:
                 notif_msg = f"VAT Task '{task.title}' is ready for your final review."
                 notif_url = url_for('task.get_task', task_id=task.id)
-                create_and_emit_notification(task.job.review_partner.id, notif_msg, notif_url, actor_id=current_user.id)
+                notify_users([task.job.review_partner.id], notif_msg, notif_url, actor_id=current_user.id)
         else: # REJECT
             task.status = TaskStatusEnum.RE_ASSIGNED
             flash("Task sent back to the assignee for revision.", "warning")
             notif_msg = f"Your task '{task.title}' requires revision based on the manager's feedback."
             notif_url = url_for('task.get_task', task_id=task.id)
-            create_and_emit_notification(task.assigned_to_id, notif_msg, notif_url, actor_id=current_user.id)
+            notify_users([task.assigned_to_id], notif_msg, notif_url, actor_id=current_user.id)
 
     # --- Workflow for tasks waiting on a Partner/Director ---
     elif task.status == TaskStatusEnum.PARTNER_REVIEW:
@@ -808,14 +868,14 @@ def review_task(task_id):
             flash(success_message, "success")
             notif_msg = f"Your task '{task.title}' is now complete."
             notif_url = url_for('task.get_task', task_id=task.id)
-            create_and_emit_notification(task.assigned_to_id, notif_msg, notif_url, actor_id=current_user.id)
+            notify_users([task.assigned_to_id], notif_msg, notif_url, actor_id=current_user.id)
         
         else: # REJECT
             task.status = TaskStatusEnum.RE_ASSIGNED
             flash("Task sent back to the assignee with Partner feedback.", "warning")
             notif_msg = f"Your task '{task.title}' requires revision based on the Partner's feedback."
             notif_url = url_for('task.get_task', task_id=task.id)
-            create_and_emit_notification(task.assigned_to_id, notif_msg, notif_url, actor_id=current_user.id)
+            notify_users([task.assigned_to_id], notif_msg, notif_url, actor_id=current_user.id)
 
     # --- Workflow for other standard tasks ---
     elif task.status == TaskStatusEnum.REVIEW:
@@ -851,14 +911,14 @@ def review_task(task_id):
             review_result = "approved and completed"
             notif_msg = f"Your task '{task.title}' was reviewed and {review_result}."
             notif_url = url_for('task.get_task', task_id=task.id)
-            create_and_emit_notification(task.assigned_to_id, notif_msg, notif_url, actor_id=current_user.id)
+            notify_users([task.assigned_to_id], notif_msg, notif_url, actor_id=current_user.id)
         else: # REJECT
             task.status = TaskStatusEnum.RE_ASSIGNED
             flash("Task sent back for revision.", "warning")
             review_result = "sent back for revision"
             notif_msg = f"Your task '{task.title}' was reviewed and {review_result}."
             notif_url = url_for('task.get_task', task_id=task.id)
-            create_and_emit_notification(task.assigned_to_id, notif_msg, notif_url, actor_id=current_user.id)
+            notify_users([task.assigned_to_id], notif_msg, notif_url, actor_id=current_user.id)
         
     else:
         flash("This task is not currently in a reviewable state.", "warning")
@@ -952,135 +1012,40 @@ def task_dashboard():
 def get_user_workload_stats(user_id):
     """Get workload stats for a specific user and time period"""
     period = request.args.get('period', 'today')
-    
-    # Calculate the date range based on period
-    start_date = get_date_range(period)
-    
-    # Build the query with dynamic date filtering
-    stats_query = db.session.query(
-        # Count tasks with date filtering
-        func.count(distinct(case((
-            (Task.status == TaskStatusEnum.IN_PROGRESS) & 
-            (Task.updated_at >= start_date if start_date else True), 
-            Task.id
-        )))).label('in_progress'),
-        
-        func.count(distinct(case((
-            (Task.status == TaskStatusEnum.PAUSED) & 
-            (Task.updated_at >= start_date if start_date else True), 
-            Task.id
-        )))).label('paused'),
-        
-        func.count(distinct(case((
-            (Task.status.in_([TaskStatusEnum.REVIEW, TaskStatusEnum.MANAGER_REVIEW, TaskStatusEnum.PARTNER_REVIEW])) & 
-            (Task.updated_at >= start_date if start_date else True), 
-            Task.id
-        )))).label('under_review'),
-        
-        func.count(distinct(case((
-            (Task.status == TaskStatusEnum.RE_ASSIGNED) & 
-            (Task.updated_at >= start_date if start_date else True), 
-            Task.id
-        )))).label('redo'),
-        
-        func.count(distinct(case((
-            (Task.status == TaskStatusEnum.COMPLETED) & 
-            (Task.updated_at >= start_date if start_date else True), 
-            Task.id
-        )))).label('completed')
-    ).filter(
-        Task.assigned_to_id == user_id,
-        Task.deleted_at == None
-    )
-    
-    result = stats_query.first()
-    
-    if result:
-        stats = {
-            'in_progress': result.in_progress or 0,
-            'paused': result.paused or 0,
-            'under_review': result.under_review or 0,
-            'redo': result.redo or 0,
-            'completed': result.completed or 0
-        }
-        
-        return jsonify({
-            'success': True,
-            'stats': stats
-        })
-    else:
-        return jsonify({
-            'success': False,
-            'error': 'User not found or no tasks'
-        })
+
+    # Range sum over the daily rollup instead of scanning the user's tasks
+    stats = get_user_workload(user_id, start_day=period_start(period))
+
+    return jsonify({
+        'success': True,
+        'stats': stats
+    })
 
 @task_bp.route('/tasks/dashboard/team-workload', methods=['GET'])
 @login_required
 def task_dashboard_workload():
-    # Use the helper function to get today's start
-    start_date = get_date_range('today')
-
     # 1. Determine the scope of the filter
-    dept_filter = []
-
-    # Check roles and build filter list
     if current_user.has_role(RoleEnum.DIRECTOR) or current_user.has_role(RoleEnum.ADMIN):
-        # Directors and Admins see everything (leave filter empty or logic-free)
-        is_restricted = False
-    elif current_user.has_role(RoleEnum.SUPERVISOR):
-        # Supervisors only see their own department
-        is_restricted = True
-        # Use current_user.department_id directly or from your helper
-        supervised_dept_ids = [current_user.department_id] if current_user.department_id else []
+        # Directors and Admins see everything
+        supervised_dept_ids = None
     else:
-        # Regular users only see their own department (or you can restrict this route entirely)
-        is_restricted = True
+        # Supervisors and regular users only see their own department
         supervised_dept_ids = [current_user.department_id] if current_user.department_id else []
 
-    # 2. Build the Base Query
-    stats_query = db.session.query(
-        User.id.label('user_id'),
-        User.first_name,
-        User.last_name,
-        User.role,
-        Department.name.label('department_name'),
-        
-        func.count(distinct(case(((Task.status == TaskStatusEnum.IN_PROGRESS) & (Task.updated_at >= start_date), Task.id)))).label('in_progress'),
-        func.count(distinct(case(((Task.status == TaskStatusEnum.PAUSED) & (Task.updated_at >= start_date), Task.id)))).label('paused'),
-        func.count(distinct(case(((Task.status.in_([TaskStatusEnum.REVIEW, TaskStatusEnum.MANAGER_REVIEW, TaskStatusEnum.PARTNER_REVIEW])) & (Task.updated_at >= start_date), Task.id)))).label('under_review'),
-        func.count(distinct(case(((Task.status == TaskStatusEnum.RE_ASSIGNED) & (Task.updated_at >= start_date), Task.id)))).label('redo'),
-        func.count(distinct(case(((Task.status == TaskStatusEnum.COMPLETED) & (Task.updated_at >= start_date), Task.id)))).label('completed')
-    )\
-    .join(Department, User.department_id == Department.id)\
-    .outerjoin(Task, (Task.assigned_to_id == User.id) & (Task.deleted_at == None))\
-    .filter(Department.name != 'Partners', User.deleted_at == None)
-
-    # 3. Apply Department Restriction
-    if is_restricted:
-        stats_query = stats_query.filter(User.department_id.in_(supervised_dept_ids))
-
-    # 4. Finalize Query
-    team_workload_results = stats_query.group_by(
-        User.id, User.first_name, User.last_name, User.role, Department.name
-    ).order_by(Department.name, User.first_name).all()
-
-    # 5. Prepare Data for Template
+    # 2. Today's figures: one range sum over the daily rollup per team
+    team_rows = get_team_workload(supervised_dept_ids, start_day=period_start('today'))
+
+    # 3. Prepare Data for Template
     team_workload_data = []
-    for row in team_workload_results:
+    for row, stats in team_rows:
         team_workload_data.append({
             'user': {
                 'full_name': f"{row.first_name} {row.last_name}", 
                 'role': {'value': row.role}, 
-                'id': row.user_id
+                'id': row.id
             },
             'department': row.department_name,
-            'stats': {
-                'in_progress': row.in_progress or 0,
-                'paused': row.paused or 0,
-                'under_review': row.under_review or 0,
-                'redo': row.redo or 0,
-                'completed': row.completed or 0
-            }
+            'stats': stats
         })
 
     # Group the data by department for the template view
@@ -1173,53 +1138,18 @@ def get_user_workload_data(user_id):
         timeframe = request.args.get('period', 'today')
         specific_date_str = request.args.get('date') # Format: YYYY-MM-DD
         
-        today = datetime.utcnow().date()
-        end_datetime = None # Default: No upper bound (all tasks since start_date)
+        end_day = None # Default: No upper bound (all tasks since start_day)
 
         if specific_date_str:
-            # Logic for a single specific day
-            selected_date = datetime.strptime(specific_date_str, '%Y-%m-%d').date()
-            start_datetime = datetime.combine(selected_date, datetime.min.time())
-            # Set end_datetime to the very end of that specific day
-            end_datetime = datetime.combine(selected_date, datetime.max.time())
+            # A single specific day
+            start_day = end_day = datetime.strptime(specific_date_str, '%Y-%m-%d').date()
         else:
-            # Logic for your existing timeframes
-            start_date = today
-            if timeframe == 'week':
-                start_date = today - timedelta(days=today.weekday())
-            elif timeframe == 'month':
-                start_date = today.replace(day=1)
-            elif timeframe == '6months':
-                start_date = today - timedelta(days=180)
-            
-            start_datetime = datetime.combine(start_date, datetime.min.time())
-
-        # --- UPDATED QUERY ---
-        # We add a filter for end_datetime if a specific date was chosen
-        filters = [
-            Task.assigned_to_id == user_id,
-            Task.deleted_at == None,
-            Task.updated_at >= start_datetime
-        ]
-        
-        if end_datetime:
-            filters.append(Task.updated_at <= end_datetime)
-
-        stats = db.session.query(
-            func.count(case(((Task.status == TaskStatusEnum.IN_PROGRESS), 1))).label('in_progress'),
-            func.count(case(((Task.status == TaskStatusEnum.PAUSED), 1))).label('paused'),
-            func.count(case(((Task.status.in_([TaskStatusEnum.REVIEW, TaskStatusEnum.MANAGER_REVIEW, TaskStatusEnum.PARTNER_REVIEW])), 1))).label('under_review'),
-            func.count(case(((Task.status == TaskStatusEnum.COMPLETED), 1))).label('completed'),
-            func.count(case(((Task.status == TaskStatusEnum.RE_ASSIGNED), 1))).label('redo')
-        ).filter(*filters).one()
-
-        return jsonify(success=True, stats={
-            'in_progress': stats.in_progress,
-            'paused': stats.paused,
-            'under_review': stats.under_review,
-            'completed': stats.completed,
-            'redo': stats.redo,
-        })
+            start_day = period_start(timeframe) or period_start('today')
+
+        # Range sum over the daily rollup
+        stats = get_user_workload(user_id, start_day=start_day, end_day=end_day)
+
+        return jsonify(success=True, stats=stats)
 
     except Exception as e:
         current_app.logger.error(f"Error fetching user workload data for user {user_id}: {e}")
@@ -18,11 +18,20 @@ from .auth_routes import supervisors_admins_directors
 from app.utils.notification import send_password_reset_email_async, run_async_in_background
 from app.utils.storage_service import storage_service
 from app.services.users.user_service import get_users_with_stats, group_users_by_department
+from app.services.users.profile_query_service import (
+    get_profile_counts, get_profile_tab_page, get_average_completion_seconds,
+    get_completion_graph_data, get_clients_worked_for, get_most_frequent
+)
 
 users_bp = Blueprint('user', __name__)
 
 PER_PAGE = 5
 
+PROFILE_TABS = (
+    'assigned', 'not_started', 'in_progress', 'paused',
+    'under_review', 'completed', 'created', 'redo',
+)
+
 def save_picture(form_picture):
     """Saves uploaded profile picture to DigitalOcean Spaces, resizes it..."""
     
@@ -144,181 +153,48 @@ def profile(user_id):
         flash("You do not have permission to view this profile.", "danger")
         return redirect(url_for('main.dashboard'))
 
-    all_assigned_tasks = Task.query.filter_by(assigned_to_id=user.id).all()
-    for task in all_assigned_tasks:
-        task.display_status = get_enum_value(task.status)
-        task.display_priority = get_enum_value(task.priority)
-
-    all_in_progress_tasks = [t for t in all_assigned_tasks if t.status == TaskStatusEnum.IN_PROGRESS]
-    not_started_tasks = [t for t in all_assigned_tasks if t.status == TaskStatusEnum.ASSIGNED]
-    all_paused_tasks = [t for t in all_assigned_tasks if t.status == TaskStatusEnum.PAUSED]
-    all_under_review_tasks = [t for t in all_assigned_tasks if t.status == TaskStatusEnum.REVIEW]
-    all_completed_tasks = [t for t in all_assigned_tasks if t.status == TaskStatusEnum.COMPLETED]
-
-    redo_task_ids = {
-        approval.task_id for approval in TaskApproval.query
-        .filter(TaskApproval.decision == DecisionEnum.REDO)
-        .filter(TaskApproval.task.has(Task.assigned_to_id == user.id))
-        .all()
-    }
-
-    redo_tasks = [task for task in all_assigned_tasks if task.id in redo_task_ids]
-
-    all_created_tasks = Task.query.filter_by(created_by_id=user.id).all()
-    for task in all_created_tasks:
-        task.display_status = get_enum_value(task.status)
-        task.display_priority = get_enum_value(task.priority)
-
-    def get_paginated_list(full_list, page_param_name):
-        page = request.args.get(page_param_name, 1, type=int)
-        start = (page - 1) * PER_PAGE
-        end = start + PER_PAGE
-        paginated_items = full_list[start:end]
-        total_pages = math.ceil(len(full_list) / PER_PAGE)
-        return paginated_items, page, total_pages, len(full_list)
-
-    paginated_assigned_tasks, current_page_assigned, total_pages_assigned, total_assigned_count = get_paginated_list(all_assigned_tasks, 'page_assigned')
-    paginated_in_progress_tasks, current_page_in_progress, total_pages_in_progress, total_in_progress_count = get_paginated_list(all_in_progress_tasks, 'page_in_progress')
-    paginated_paused_tasks, current_page_paused, total_pages_paused, total_paused_count = get_paginated_list(all_paused_tasks, 'page_paused')
-    paginated_under_review_tasks, current_page_under_review, total_pages_under_review, total_under_review_count = get_paginated_list(all_under_review_tasks, 'page_under_review')
-    paginated_completed_tasks, current_page_completed, total_pages_completed, total_completed_count = get_paginated_list(all_completed_tasks, 'page_completed')
-    paginated_created_tasks, current_page_created, total_pages_created, total_created_count = get_paginated_list(all_created_tasks, 'page_created')
-    paginated_redo_tasks, current_page_redo, total_pages_redo, total_redo_count = get_paginated_list(redo_tasks, 'page_redo')
-    paginated_not_started_tasks, current_page_not_started, total_pages_not_started, total_not_started_count = get_paginated_list(not_started_tasks, 'page_not_started')
+    counts = get_profile_counts(user.id)
+
+    tab_context = {}
+    for tab in PROFILE_TABS:
+        page = request.args.get(f'page_{tab}', 1, type=int)
+        items, page, total_pages = get_profile_tab_page(user.id, tab, page, counts[tab])
+        for task in items:
+            task.display_status = get_enum_value(task.status)
+            task.display_priority = get_enum_value(task.priority)
+        tab_context.update({
+            f'{tab}_tasks': items,
+            f'current_page_{tab}': page,
+            f'total_pages_{tab}': total_pages,
+            f'total_{tab}_count': counts[tab],
+        })
 
     months = request.args.get('months', 6, type=int)
     service_id = request.args.get('service_id', None, type=int)
     start_date = datetime.utcnow() - relativedelta(months=months)
 
-    filtered_task_logs = TaskLog.query.join(Task).filter(
-        TaskLog.user_id == user.id,
-        TaskLog.status == LogStatusEnum.COMPLETED,
-        TaskLog.end_time.isnot(None),
-        TaskLog.start_time >= start_date,
-    )
-
-    if service_id:
-        filtered_task_logs = filtered_task_logs.filter(Task.task_template_id == TaskTemplate.id, TaskTemplate.service_id == service_id)
-
-    filtered_task_logs = filtered_task_logs.all()
-
-    # ✅ FIX: initialize before use
-    graph_data = []
-    graph_total_completion_seconds = 0
-    graph_completed_task_count = 0
-
-    for log in filtered_task_logs:
-        active_duration = timedelta()
-
-        if log.status == LogStatusEnum.COMPLETED and log.start_time and log.end_time:
-            active_duration += (log.end_time - log.start_time)
-
-        if active_duration.total_seconds() > 0:
-            graph_total_completion_seconds += active_duration.total_seconds()
-            graph_completed_task_count += 1
-
-            duration_minutes = (log.end_time - log.start_time).total_seconds() / 60
-            graph_data.append({
-                'task_title': log.task.title,
-                'end_time': log.end_time.strftime("%Y-%m-%d"),
-                'duration_minutes': round(duration_minutes, 2)
-            })
-
-    # --- Average completion time calculation (separate logic) ---
-    total_completion_seconds = 0
-    completed_task_count = 0
-
-    user_completed_task_logs = TaskLog.query.filter(
-        TaskLog.user_id == user.id,
-        TaskLog.status == LogStatusEnum.COMPLETED,
-        TaskLog.end_time.isnot(None)
-    ).all()
-
-    for log in user_completed_task_logs:
-        if log.start_time and log.end_time:
-            duration = log.end_time - log.start_time
-            total_completion_seconds += duration.total_seconds()
-            completed_task_count += 1
+    graph_data = get_completion_graph_data(user.id, start_date, service_id)
 
     avg_completion_time = None
-    if completed_task_count > 0:
-        avg_completion_seconds = total_completion_seconds / completed_task_count
+    avg_completion_seconds = get_average_completion_seconds(user.id)
+    if avg_completion_seconds is not None:
         hours, remainder = divmod(avg_completion_seconds, 3600)
         minutes, seconds = divmod(remainder, 60)
         avg_completion_time = f"{int(hours)}h {int(minutes)}m {int(seconds)}s"
 
-    clients_worked_for = {}
-    for task in all_completed_tasks:
-        if task.client:
-            if task.client.name not in clients_worked_for:
-                clients_worked_for[task.client.name] = []
-            clients_worked_for[task.client.name].append(task)
-
-    task_titles = [task.title for task in all_assigned_tasks]
-    service_names = [
-        task.template.service.name
-        for task in all_assigned_tasks
-        if task.template and task.template.service
-    ]
-    template_titles = [
-        task.template.title
-        for task in all_assigned_tasks
-        if task.template
-    ]
-
-    most_frequent_tasks = Counter(task_titles).most_common(5)
-    most_frequent_services = Counter(service_names).most_common(5)
-    most_frequent_templates = Counter(template_titles).most_common(5)
+    most_frequent = get_most_frequent(user.id)
 
     return render_template(
         '/user/user_detail.html',
         user=user,
 
-        assigned_tasks=paginated_assigned_tasks,
-        current_page_assigned=current_page_assigned,
-        total_pages_assigned=total_pages_assigned,
-        total_assigned_count=total_assigned_count,
-
-        in_progress_tasks=paginated_in_progress_tasks,
-        current_page_in_progress=current_page_in_progress,
-        total_pages_in_progress=total_pages_in_progress,
-        total_in_progress_count=total_in_progress_count,
-
-        paused_tasks=paginated_paused_tasks,
-        current_page_paused=current_page_paused,
-        total_pages_paused=total_pages_paused,
-        total_paused_count=total_paused_count,
-
-        under_review_tasks=paginated_under_review_tasks,
-        current_page_under_review=current_page_under_review,
-        total_pages_under_review=total_pages_under_review,
-        total_under_review_count=total_under_review_count,
-
-        completed_tasks=paginated_completed_tasks,
-        current_page_completed=current_page_completed,
-        total_pages_completed=total_pages_completed,
-        total_completed_count=total_completed_count,
-
-        created_tasks=paginated_created_tasks,
-        current_page_created=current_page_created,
-        total_pages_created=total_pages_created,
-        total_created_count=total_created_count,
-
-        redo_tasks=paginated_redo_tasks,
-        current_page_redo=current_page_redo,
-        total_pages_redo=total_pages_redo,
-        total_redo_count=total_redo_count,
-
-        not_started_tasks=paginated_not_started_tasks,
-        current_page_not_started=current_page_not_started,
-        total_pages_not_started=total_pages_not_started,
-        total_not_started_count=total_not_started_count,
+        **tab_context,
 
         avg_completion_time=avg_completion_time,
-        clients_worked_for=clients_worked_for,
-        most_frequent_tasks=most_frequent_tasks,
-        most_frequent_services=most_frequent_services,
-        most_frequent_templates=most_frequent_templates,
+        clients_worked_for=get_clients_worked_for(user.id),
+        most_frequent_tasks=most_frequent['tasks'],
+        most_frequent_services=most_frequent['services'],
+        most_frequent_templates=most_frequent['templates'],
 
         graph_data=graph_data,
         services=Service.query.all(),
@@ -0,0 +1,160 @@
+import codecs
+import csv
+import io
+
+from sqlalchemy import insert
+
+from app.models import Client
+from app.utils.cache_invalidation import mark_namespaces_dirty, FIRM_NAMESPACE, LOOKUPS_NAMESPACE
+from app.utils.db import db
+from app.utils.firm_counters import apply_counter_deltas, ACTIVE_CLIENTS
+
+# Rows per duplicate lookup / INSERT / commit
+BATCH_SIZE = 1000
+
+_MAX_LENGTHS = {
+    'name': Client.__table__.c.name.type.length,
+    'contact_email': Client.__table__.c.contact_email.type.length,
+    'phone_number': Client.__table__.c.phone_number.type.length,
+}
+
+
+def _latin1_fallback(error):
+    # Bytes that are not valid UTF-8 are read as Latin-1, one at a time
+    bad = error.object[error.start:error.end]
+    return bad.decode('latin-1'), error.end
+
+
+codecs.register_error('client_import_latin1', _latin1_fallback)
+
+
+class ClientImportError(ValueError):
+    """The file as a whole cannot be imported."""
+
+
+def _normalize(name):
+    # Clients are unique by name regardless of case or surrounding spaces
+    return name.strip().casefold()
+
+
+def _clean(value):
+    value = (value or '').strip()
+    return value or None
+
+
+# -----------------------------
+# Batches
+# -----------------------------
+def _existing(batch):
+    """
+    (normalized names, lower-cased emails) already stored for this batch,
+    in one query.
+    """
+    names = [row['name'] for row in batch]
+    emails = [row['contact_email'] for row in batch if row['contact_email']]
+    condition = Client.name.in_(names)
+    if emails:
+        condition = condition | Client.contact_email.in_(emails)
+
+    taken_names, taken_emails = set(), set()
+    for name, email in db.session.query(Client.name, Client.contact_email).filter(condition):
+        taken_names.add(_normalize(name))
+        if email:
+            taken_emails.add(email.lower())
+    return taken_names, taken_emails
+
+
+def _write_batch(batch, report):
+    taken_names, taken_emails = _existing(batch)
+    rows = []
+    for row in batch:
+        if _normalize(row['name']) in taken_names:
+            report['skipped'] += 1
+        elif row['contact_email'] and row['contact_email'].lower() in taken_emails:
+            report['errors'].append(
+                (row['line'], f"contact_email '{row['contact_email']}' belongs to another client")
+            )
+        else:
+            rows.append({key: row[key] for key in ('name', 'contact_email', 'phone_number')})
+
+    if rows:
+        # IGNORE: a client created concurrently since the lookup is skipped, not fatal
+        # One multi-row statement, so rowcount is exactly the rows inserted
+        stmt = insert(Client.__table__).prefix_with('IGNORE', dialect='mysql').values(rows)
+        added = db.session.execute(stmt).rowcount
+        report['added'] += added
+        report['skipped'] += len(rows) - added
+
+        # Bulk inserts bypass the flush hooks that keep these in step
+        apply_counter_deltas(db.session, {ACTIVE_CLIENTS: added})
+        mark_namespaces_dirty(db.session, FIRM_NAMESPACE, LOOKUPS_NAMESPACE)
+    db.session.commit()
+
+
+# -----------------------------
+# Import
+# -----------------------------
+def import_clients_csv(stream, batch_size=BATCH_SIZE, on_progress=None):
+    """
+    Import clients from a CSV byte stream (columns `name`, optional
+    `contact_email` and `phone_number`) without loading it whole.
+
+    Rows are read incrementally, checked against the database one batch at
+    a time (case-insensitive names), and inserted and committed per batch.
+    `on_progress(report)` is called after each batch.
+
+    Returns {'rows', 'added', 'skipped', 'errors': [(line, message), ...]};
+    `skipped` counts clients that already existed.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='client_import_latin1', newline='')
+    reader = csv.DictReader(text)
+    if not reader.fieldnames or 'name' not in [f.strip() for f in reader.fieldnames]:
+        raise ClientImportError("The CSV file must have a 'name' column")
+    reader.fieldnames = [f.strip() for f in reader.fieldnames]
+
+    report = {'rows': 0, 'added': 0, 'skipped': 0, 'errors': []}
+    seen_names, seen_emails = set(), set()
+    batch = []
+
+    for row in reader:
+        report['rows'] += 1
+        # Physical line number, so rows with quoted newlines still point right
+        line = reader.line_num
+        values = {key: _clean(row.get(key)) for key in _MAX_LENGTHS}
+
+        if not values['name']:
+            report['errors'].append((line, "missing 'name' field"))
+            continue
+        too_long = [key for key, limit in _MAX_LENGTHS.items() if values[key] and len(values[key]) > limit]
+        if too_long:
+            report['errors'].append((line, f"{', '.join(too_long)} too long"))
+            continue
+
+        name_key = _normalize(values['name'])
+        if name_key in seen_names:
+            report['skipped'] += 1
+            continue
+        email_key = values['contact_email'].lower() if values['contact_email'] else None
+        if email_key and email_key in seen_emails:
+            report['errors'].append((line, f"contact_email '{values['contact_email']}' appears earlier in the file"))
+            continue
+
+        seen_names.add(name_key)
+        if email_key:
+            seen_emails.add(email_key)
+        batch.append({'line': line, **values})
+
+        if len(batch) >= batch_size:
+            _write_batch(batch, report)
+            batch = []
+            if on_progress:
+                on_progress(report)
+
+    if batch:
+        _write_batch(batch, report)
+        if on_progress:
+            on_progress(report)
+
+    # The upload stream belongs to the request; leave it open
+    text.detach()
+    return report
@@ -1,25 +1,30 @@
 from app.models import Client
+from app.services.dtos import ClientOption
 from app.utils.cache import cache  
+from app.utils.cache_invalidation import versioned_key, LOOKUPS_NAMESPACE
 from app.utils.db import db  
 
-CACHE_TTL = 300  # 5 minutes
+# Invalidated on commit via the lookups namespace
+CACHE_TTL = 6 * 60 * 60
 
 def get_clients_for_forms():
     """
     Fetch active clients for dropdowns / forms
     Excludes soft-deleted clients
+    Returns ClientOption DTOs
     """
-    cache_key = "clients:for_forms"
+    cache_key = versioned_key("clients:for_forms", LOOKUPS_NAMESPACE)
     cached = cache.get(cache_key)
     if cached:
         return cached
 
-    clients = (
-        Client.query
+    rows = (
+        db.session.query(Client.id, Client.name)
         .filter(Client.deleted_at.is_(None))
         .order_by(Client.name)
         .all()
     )
+    clients = [ClientOption(*row) for row in rows]
 
     cache.set(cache_key, clients, timeout=CACHE_TTL)
     return clients
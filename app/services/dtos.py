@@ -0,0 +1,115 @@
+# app/services/dtos.py
+"""
+Compact, read-only snapshots of query results that get cached.
+
+Services cache these instead of SQLAlchemy instances so that a cached
+payload is a flat tuple of primitives: it carries no session or identity-map
+state, pickles to a fraction of the size and can never trigger a lazy load
+when a template touches a "relationship" that was not loaded.
+
+Every DTO declares its fields in `__slots__` and reduces to
+`(cls, (field, ...))`, so the cache serializer writes one small tuple per
+object rather than an attribute dict.
+"""
+
+
+class CachedDTO:
+    __slots__ = ()
+
+    def __init__(self, *args, **kwargs):
+        values = dict(zip(self.__slots__, args))
+        values.update(kwargs)
+        for field in self.__slots__:
+            object.__setattr__(self, field, values.get(field))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __reduce__(self):
+        return (type(self), tuple(getattr(self, f) for f in self.__slots__))
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.__reduce__() == other.__reduce__()
+
+    def __hash__(self):
+        return hash(self.__reduce__()[1])
+
+    def __repr__(self):
+        fields = ", ".join(f"{f}={getattr(self, f)!r}" for f in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+# -----------------------------
+# Lookups (dropdowns / forms)
+# -----------------------------
+class UserOption(CachedDTO):
+    __slots__ = ("id", "first_name", "middle_name", "last_name", "role",
+                 "department_id", "department_name")
+
+    @classmethod
+    def from_model(cls, user):
+        department = user.department
+        return cls(
+            user.id, user.first_name, user.middle_name, user.last_name, user.role,
+            user.department_id, department.name if department else None,
+        )
+
+    @property
+    def full_name(self):
+        # Same format as User.full_name
+        return f"{self.first_name} {self.last_name} {self.middle_name}"
+
+
+class ClientOption(CachedDTO):
+    __slots__ = ("id", "name")
+
+    @classmethod
+    def from_model(cls, client):
+        return cls(client.id, client.name)
+
+
+class ServiceOption(CachedDTO):
+    __slots__ = ("id", "name")
+
+    @classmethod
+    def from_model(cls, service):
+        return cls(service.id, service.name)
+
+
+class TemplateOption(CachedDTO):
+    __slots__ = ("id", "title", "description", "service_id", "service_name")
+
+    @classmethod
+    def from_model(cls, template):
+        service = template.service
+        return cls(
+            template.id, template.title, template.description,
+            template.service_id, service.name if service else None,
+        )
+
+
+class JobOption(CachedDTO):
+    __slots__ = ("id", "name", "client_id", "service_ids")
+
+    @classmethod
+    def from_model(cls, job):
+        return cls(job.id, job.name, job.client_id, tuple(s.id for s in job.services))
+
+
+# -----------------------------
+# Dashboards / lists
+# -----------------------------
+class ReviewTaskItem(CachedDTO):
+    __slots__ = ("id", "title", "updated_at", "priority", "assignee_name")
+
+    @classmethod
+    def from_model(cls, task):
+        assignee = task.assignee
+        return cls(
+            task.id, task.title, task.updated_at, task.priority,
+            assignee.full_name if assignee else None,
+        )
+
+
+class UserStatsRow(CachedDTO):
+    __slots__ = ("user", "assigned", "completed", "review", "redo")
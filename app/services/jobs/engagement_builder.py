@@ -0,0 +1,430 @@
+import heapq
+import itertools
+import uuid
+from collections import Counter
+from datetime import datetime
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import insert, func
+
+from app.models import (
+    Client, Service, Job, Task, TaskTemplate, User, UserTaskStat, VatFilingMonth,
+    TaskStatusEnum, job_services,
+)
+from app.utils.cache_invalidation import (
+    mark_namespaces_dirty, user_namespace, department_namespace, FIRM_NAMESPACE,
+    LOOKUPS_NAMESPACE,
+)
+from app.utils.db import db
+from app.utils.firm_counters import (
+    apply_counter_deltas, sync_ongoing_jobs, ONGOING_ENGAGEMENTS, ONGOING_STATUSES,
+)
+from app.utils.helpers import (
+    parse_local_deadline, estimated_minutes, priority_from_value, recurrence_from_name,
+    role_can_assign,
+)
+from app.utils.task_stats import apply_task_stat_deltas
+
+# The first deadline of this template opens the engagement's VAT filing month
+VAT_SERVICE_NAME = 'Tax Services'
+VAT_TEMPLATE_TITLE = 'VAT Returns'
+
+# Rollouts: clients per transaction (one INSERT per table each) and per request
+ROLLOUT_CHUNK_SIZE = 100
+ROLLOUT_MAX_CLIENTS = 2000
+# `{client}` in a rollout's engagement name becomes the client's name
+CLIENT_PLACEHOLDER = '{client}'
+
+ASSIGNMENT_RULES = ('fixed', 'round_robin', 'least_loaded')
+
+
+class EngagementError(ValueError):
+    """The engagement cannot be created as requested; nothing was written."""
+
+
+# -----------------------------
+# Task specs
+# -----------------------------
+def task_spec(template_id, assigned_to_id, deadline=None, description=None,
+              estimated_value=0, estimated_unit='minutes', priority='Medium',
+              recurrence='NONE'):
+    """
+    One task to create from a template, as posted by the engagement forms
+    (`deadline` is a local '%Y-%m-%dT%H:%M' string, `description` None for
+    the template's own).
+    """
+    return {
+        'template_id': int(template_id),
+        # None: decided per engagement by a rollout's assignment rule
+        'assigned_to_id': int(assigned_to_id) if assigned_to_id not in (None, '') else None,
+        'deadline': deadline,
+        'description': description,
+        'estimated_value': estimated_value or 0,
+        'estimated_unit': estimated_unit,
+        'priority': priority,
+        'recurrence': recurrence,
+    }
+
+
+# -----------------------------
+# Checks (one query each)
+# -----------------------------
+def load_templates(template_ids):
+    """{id: (id, title, description)} for `template_ids`; raises if any is missing."""
+    template_ids = set(template_ids)
+    if not template_ids:
+        return {}
+    rows = (
+        db.session.query(TaskTemplate.id, TaskTemplate.title, TaskTemplate.description)
+        .filter(TaskTemplate.id.in_(template_ids))
+    )
+    templates = {row.id: row for row in rows}
+    missing = template_ids - set(templates)
+    if missing:
+        raise EngagementError(f"Unknown task template(s): {', '.join(map(str, sorted(missing)))}")
+    return templates
+
+
+def check_assignees(actor, user_ids):
+    """
+    Raise unless `actor` may assign tasks to every user in `user_ids`
+    (same rules as `can_assign_task`).
+    """
+    user_ids = set(user_ids)
+    roles = dict(
+        db.session.query(User.id, User.role)
+        .filter(User.id.in_(user_ids), User.deleted_at.is_(None))
+    ) if user_ids else {}
+    refused = sorted(
+        uid for uid in user_ids
+        if uid not in roles or not role_can_assign(actor.role, roles[uid])
+    )
+    if refused:
+        raise EngagementError(f"You cannot assign tasks to user(s) {', '.join(map(str, refused))}.")
+
+
+def is_vat_template(service_name, template):
+    return service_name == VAT_SERVICE_NAME and template.title == VAT_TEMPLATE_TITLE
+
+
+def vat_month_for(deadline):
+    """Filing month a VAT Returns task due on `deadline` is for ('%b-%Y')."""
+    return (deadline - relativedelta(months=1)).strftime('%b-%Y')
+
+
+# -----------------------------
+# Rows
+# -----------------------------
+def prepare_task_rows(specs, templates, created_by_id, now):
+    """
+    Parse each spec once (same rules as make_task_from_data) into a `tasks`
+    row still missing its job and client. Raises ValueError when a template
+    is listed twice with the same deadline, which the tasks table rejects.
+    """
+    rows = []
+    slots = set()
+    for spec in specs:
+        template = templates[spec['template_id']]
+        deadline = parse_local_deadline(spec['deadline'])
+        if deadline is not None:
+            if (template.id, deadline) in slots:
+                raise ValueError(f"'{template.title}' is listed twice with the same deadline.")
+            slots.add((template.id, deadline))
+        rows.append({
+            'title': template.title,
+            'description': spec['description'] if spec['description'] is not None else template.description,
+            'status': TaskStatusEnum.ASSIGNED,
+            'recurrence': recurrence_from_name(spec['recurrence']),
+            # Stored as naive UTC, like the ORM path
+            'deadline': deadline.replace(tzinfo=None) if deadline else None,
+            'estimated_minutes': estimated_minutes(spec['estimated_value'], spec['estimated_unit']),
+            'priority': priority_from_value(spec['priority']),
+            'created_at': now,
+            'updated_at': now,
+            'assigned_to_id': spec['assigned_to_id'],
+            'created_by_id': created_by_id,
+            'client_id': None,
+            'task_template_id': template.id,
+            'job_id': None,
+            'requires_vat_form': False,
+        })
+    return rows
+
+
+def rows_for_job(prepared, job_id, client_id, assigned_to_id=None):
+    """Copies of `prepared` rows for one job; `assigned_to_id` fills rows without an assignee."""
+    rows = []
+    for row in prepared:
+        row = dict(row, job_id=job_id, client_id=client_id)
+        if row['assigned_to_id'] is None:
+            row['assigned_to_id'] = assigned_to_id
+        rows.append(row)
+    return rows
+
+
+def vat_deadline(service_name, templates, rows):
+    """Deadline of the first VAT Returns task in `rows`, if the service files VAT."""
+    return next(
+        (
+            row['deadline'] for row in rows
+            if row['deadline'] and is_vat_template(service_name, templates[row['task_template_id']])
+        ),
+        None,
+    )
+
+
+def insert_tasks(session, rows):
+    """
+    Insert `rows` with one multi-row INSERT and do the bookkeeping the task
+    flush hooks would have done (status rollups, ongoing engagements, cache).
+    """
+    if not rows:
+        return
+    session.execute(insert(Task.__table__).values(rows))
+
+    buckets = Counter(
+        (row['assigned_to_id'], row['updated_at'].date(), row['status']) for row in rows
+    )
+    apply_task_stat_deltas(session, buckets)
+    apply_counter_deltas(session, {
+        ONGOING_ENGAGEMENTS: sync_ongoing_jobs(session, {row['job_id'] for row in rows}),
+    })
+
+    creator_ids = {row['created_by_id'] for row in rows}
+    namespaces = {FIRM_NAMESPACE}
+    namespaces.update(user_namespace(uid) for uid in creator_ids)
+    namespaces.update(user_namespace(row['assigned_to_id']) for row in rows)
+    # Supervisor review queues are keyed by the creator's department
+    namespaces.update(
+        department_namespace(dept_id)
+        for (dept_id,) in session.query(User.department_id).filter(
+            User.id.in_(creator_ids), User.department_id.isnot(None)
+        )
+    )
+    mark_namespaces_dirty(session, *namespaces)
+
+
+def insert_vat_months(session, rows):
+    """One multi-row INSERT of {'job_id', 'month', 'nature_of_business'} rows."""
+    if rows:
+        session.execute(insert(VatFilingMonth.__table__).values(rows))
+
+
+# -----------------------------
+# Engagements
+# -----------------------------
+def create_engagement(actor, client_id, service_id, name, specs):
+    """
+    Create a Job for `client_id` under `service_id` with one task per spec
+    (see `task_spec`) and, for VAT engagements, its first VatFilingMonth.
+
+    Templates and assignees are checked up front in one query each, then
+    the tasks and the filing month are written with one INSERT per table
+    and committed. Returns the job. Raises EngagementError before writing
+    anything when the input is invalid.
+    """
+    service = Service.query.get(service_id)
+    if not service:
+        raise EngagementError('Invalid service selected.')
+    client_name = (
+        db.session.query(Client.name)
+        .filter(Client.id == client_id, Client.deleted_at.is_(None))
+        .scalar()
+    )
+    if client_name is None:
+        raise EngagementError('Invalid client selected.')
+
+    if any(spec['assigned_to_id'] is None for spec in specs):
+        raise EngagementError('Every task needs an assignee.')
+    templates = load_templates(spec['template_id'] for spec in specs)
+    check_assignees(actor, {spec['assigned_to_id'] for spec in specs})
+    try:
+        prepared = prepare_task_rows(specs, templates, actor.id, datetime.utcnow())
+    except ValueError as e:
+        raise EngagementError(f"Invalid task details: {e}") from e
+
+    job = Job(client_id=client_id, name=name, created_by_id=actor.id)
+    job.services = [service]
+    db.session.add(job)
+    db.session.flush()  # so job.id is available
+
+    task_rows = rows_for_job(prepared, job.id, client_id)
+    insert_tasks(db.session, task_rows)
+
+    deadline = vat_deadline(service.name, templates, task_rows)
+    if deadline:
+        insert_vat_months(db.session, [{
+            'job_id': job.id,
+            'month': vat_month_for(deadline),
+            'nature_of_business': client_name,
+        }])
+
+    db.session.commit()
+    return job
+
+
+# -----------------------------
+# Rollouts (one service, many clients)
+# -----------------------------
+def _assigner(rule, assignee_ids, tasks_per_job):
+    """
+    A callable returning the engagement assignee for the next client:
+    `fixed` always the first user, `round_robin` each user in turn,
+    `least_loaded` whoever has the fewest open tasks, counting this rollout.
+    """
+    if rule == 'fixed':
+        return lambda: assignee_ids[0]
+    if rule == 'round_robin':
+        turn = itertools.cycle(assignee_ids)
+        return lambda: next(turn)
+
+    open_tasks = dict(
+        db.session.query(UserTaskStat.user_id, func.sum(UserTaskStat.task_count))
+        .filter(UserTaskStat.user_id.in_(assignee_ids), UserTaskStat.status.in_(ONGOING_STATUSES))
+        .group_by(UserTaskStat.user_id)
+    )
+    # (load, position in the list, user id): ties go to the earlier user
+    heap = [(int(open_tasks.get(uid) or 0), i, uid) for i, uid in enumerate(assignee_ids)]
+    heapq.heapify(heap)
+
+    def next_assignee():
+        load, position, user_id = heapq.heappop(heap)
+        heapq.heappush(heap, (load + tasks_per_job, position, user_id))
+        return user_id
+    return next_assignee
+
+
+def _insert_jobs(session, actor, service_id, names, now):
+    """
+    Insert one job per {client_id: name} with a single INSERT and link it to
+    the service. Returns {client_id: job_id}.
+    """
+    batch_id = uuid.uuid4().hex
+    session.execute(insert(Job.__table__).values([
+        {'client_id': client_id, 'name': name, 'created_by_id': actor.id,
+         'created_at': now, 'is_ongoing': False, 'batch_id': batch_id}
+        for client_id, name in names.items()
+    ]))
+    # Multi-row inserts do not return every id, so read them back by the
+    # batch (a client appears once per chunk)
+    rows = session.query(Job.id, Job.client_id).filter(Job.batch_id == batch_id)
+    job_ids = {row.client_id: row.id for row in rows}
+
+    session.execute(insert(job_services).values([
+        {'job_id': job_id, 'service_id': service_id} for job_id in job_ids.values()
+    ]))
+    # Jobs bypass the flush hooks too
+    mark_namespaces_dirty(session, FIRM_NAMESPACE, LOOKUPS_NAMESPACE)
+    return job_ids
+
+
+def _existing_engagements(service_id, names):
+    """Clients in {client_id: name} that already have a live job with that name for the service."""
+    rows = (
+        db.session.query(Job.client_id, Job.name)
+        .join(job_services, job_services.c.job_id == Job.id)
+        .filter(
+            job_services.c.service_id == service_id,
+            Job.client_id.in_(list(names)),
+            Job.deleted_at.is_(None),
+        )
+    )
+    return {row.client_id for row in rows if names.get(row.client_id) == row.name}
+
+
+def roll_out_engagements(actor, service_id, client_ids, name, specs, rule='fixed',
+                         assignee_ids=(), skip_existing=True, chunk_size=ROLLOUT_CHUNK_SIZE,
+                         on_chunk=None):
+    """
+    Create the same engagement (service, task specs) for every client in
+    `client_ids`, `ROLLOUT_CHUNK_SIZE` clients per transaction with one
+    INSERT per table per chunk. `name` may contain `{client}`.
+
+    Tasks whose spec has no assignee go to the engagement assignee chosen
+    by `rule` (see ASSIGNMENT_RULES) from `assignee_ids`. With
+    `skip_existing`, clients that already have a live engagement of the
+    same name for the service are left alone, so a rollout can be re-run.
+    `on_chunk(report)` is called after each commit.
+
+    Everything is validated before the first write; EngagementError means
+    nothing was created. Returns {'service' (name), 'created', 'skipped',
+    'chunks', 'job_ids', 'assignments': {user_id: engagements}}.
+    """
+    client_ids = list(dict.fromkeys(int(cid) for cid in client_ids))
+    assignee_ids = list(dict.fromkeys(int(uid) for uid in assignee_ids))
+    if not client_ids:
+        raise EngagementError('Select at least one client.')
+    if len(client_ids) > ROLLOUT_MAX_CLIENTS:
+        raise EngagementError(f'A rollout is limited to {ROLLOUT_MAX_CLIENTS} clients.')
+    if not specs:
+        raise EngagementError('Select at least one task template.')
+    if rule not in ASSIGNMENT_RULES:
+        raise EngagementError(f'Unknown assignment rule: {rule}')
+    if any(spec['assigned_to_id'] is None for spec in specs) and not assignee_ids:
+        raise EngagementError('Choose who the engagements are assigned to.')
+
+    service = Service.query.get(service_id)
+    if not service:
+        raise EngagementError('Invalid service selected.')
+    clients = dict(
+        db.session.query(Client.id, Client.name)
+        .filter(Client.id.in_(client_ids), Client.deleted_at.is_(None))
+    )
+    missing = [cid for cid in client_ids if cid not in clients]
+    if missing:
+        raise EngagementError(f"Unknown client(s): {', '.join(map(str, missing))}")
+
+    templates = load_templates(spec['template_id'] for spec in specs)
+    check_assignees(actor, {spec['assigned_to_id'] for spec in specs if spec['assigned_to_id']} | set(assignee_ids))
+    now = datetime.utcnow()
+    try:
+        prepared = prepare_task_rows(specs, templates, actor.id, now)
+    except ValueError as e:
+        raise EngagementError(f"Invalid task details: {e}") from e
+
+    unassigned = sum(1 for row in prepared if row['assigned_to_id'] is None)
+    next_assignee = _assigner(rule, assignee_ids, unassigned) if unassigned else None
+    report = {
+        'service': service.name, 'created': 0, 'skipped': 0, 'chunks': 0,
+        'job_ids': [], 'assignments': Counter(),
+    }
+
+    for start in range(0, len(client_ids), chunk_size):
+        names = {
+            cid: (name or service.name).replace(CLIENT_PLACEHOLDER, clients[cid])[:200]
+            for cid in client_ids[start:start + chunk_size]
+        }
+        if skip_existing:
+            for cid in _existing_engagements(service.id, names):
+                del names[cid]
+                report['skipped'] += 1
+        if not names:
+            continue
+
+        job_ids = _insert_jobs(db.session, actor, service.id, names, now)
+        task_rows, vat_rows = [], []
+        for client_id, job_id in job_ids.items():
+            rows = rows_for_job(prepared, job_id, client_id, next_assignee() if next_assignee else None)
+            task_rows.extend(rows)
+            report['assignments'].update({row['assigned_to_id'] for row in rows})
+
+            deadline = vat_deadline(service.name, templates, rows)
+            if deadline:
+                vat_rows.append({
+                    'job_id': job_id,
+                    'month': vat_month_for(deadline),
+                    'nature_of_business': clients[client_id],
+                })
+
+        insert_tasks(db.session, task_rows)
+        insert_vat_months(db.session, vat_rows)
+        db.session.commit()
+
+        report['created'] += len(job_ids)
+        report['job_ids'].extend(job_ids.values())
+        report['chunks'] += 1
+        if on_chunk:
+            on_chunk(report)
+
+    report['assignments'] = dict(report['assignments'])
+    return report
@@ -1,16 +1,20 @@
-from app.models import Job
+from app.models import Job, Task
+from app.services.dtos import JobOption
 from app.utils.cache import cache  
+from app.utils.cache_invalidation import versioned_key, user_namespace, LOOKUPS_NAMESPACE
 from app.utils.db import db  
 from sqlalchemy.orm import selectinload
 
-CACHE_TTL = 300
+# Invalidated on commit via the lookups namespace
+CACHE_TTL = 6 * 60 * 60
 
 def get_jobs_for_forms():
     """
     Fetch jobs for dropdowns / task creation forms
     Includes services to avoid N+1 when accessing job.services
+    Returns JobOption DTOs carrying the attached service ids
     """
-    cache_key = "jobs:for_forms"
+    cache_key = versioned_key("jobs:for_forms", LOOKUPS_NAMESPACE)
     cached = cache.get(cache_key)
     if cached:
         return cached
@@ -23,6 +27,29 @@ def get_jobs_for_forms():
         .order_by(Job.name)
         .all()
     )
+    jobs = [JobOption.from_model(job) for job in jobs]
 
     cache.set(cache_key, jobs, timeout=CACHE_TTL)
     return jobs
+
+
+def get_engagement_count(user_id: int):
+    """
+    Number of live jobs with at least one task assigned to `user_id`
+    Cached until the user's tasks or any job change
+    """
+    cache_key = versioned_key(
+        f"jobs:engagement_count:{user_id}", user_namespace(user_id), LOOKUPS_NAMESPACE
+    )
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    count = (
+        Job.query
+        .filter(Job.tasks.any(Task.assigned_to_id == user_id), Job.deleted_at.is_(None))
+        .count()
+    )
+
+    cache.set(cache_key, count, timeout=CACHE_TTL)
+    return count
@@ -0,0 +1,222 @@
+from decimal import Decimal
+
+import pandas as pd
+from sqlalchemy import insert, update, bindparam
+
+from app.models import Job, VatMonthlySummary
+from app.utils.db import db
+
+# Columns of the import template (see job.download_vat_template)
+MONTH_COLUMN = 'Month'
+# Optional; lets one file carry several engagements
+JOB_COLUMN = 'job_id'
+AMOUNT_COLUMNS = (
+    'sales_zero_rated', 'sales_exempt', 'sales_vatable_16', 'sales_vatable_8',
+    'output_vat_16', 'output_vat_8',
+    'purchases_zero_rated', 'purchases_exempt', 'purchases_vatable_16', 'purchases_vatable_8',
+    'input_vat_16', 'input_vat_8',
+    'withheld_vat', 'balance_bf', 'paid',
+)
+REQUIRED_COLUMNS = {MONTH_COLUMN, 'sales_zero_rated', 'sales_exempt', 'sales_vatable_16', 'paid'}
+# Numeric(20, 2)
+MAX_AMOUNT = 10 ** 18
+
+# Rows per INSERT ... ON DUPLICATE KEY UPDATE statement
+BATCH_SIZE = 500
+
+# The header is line 1 of the file
+_FIRST_DATA_LINE = 2
+
+
+class VatImportError(ValueError):
+    """The file as a whole cannot be imported (unreadable, wrong columns)."""
+
+
+# -----------------------------
+# Parse / validate
+# -----------------------------
+def _read(file):
+    try:
+        # Everything as text: coercion and error reporting happen below
+        df = pd.read_csv(file, dtype=str, keep_default_na=False)
+    except (ValueError, pd.errors.ParserError) as e:
+        raise VatImportError(f"Could not read the CSV file: {e}") from e
+
+    df.columns = [str(col).strip() for col in df.columns]
+    missing = REQUIRED_COLUMNS - set(df.columns)
+    if missing:
+        raise VatImportError(f"Missing required columns: {', '.join(sorted(missing))}")
+    return df
+
+
+def _coerce(df, default_job_id):
+    """
+    Validate and convert whole columns at once.
+
+    Returns (frame of valid rows with `line`, `job_id`, `month` and
+    Decimal/None amount columns, {line: [error, ...]}).
+    """
+    errors = {}
+    lines = pd.Series(df.index + _FIRST_DATA_LINE, index=df.index)
+
+    def flag(mask, message):
+        messages = message if isinstance(message, pd.Series) else pd.Series(message, index=df.index)
+        for line, text in zip(lines[mask], messages[mask]):
+            errors.setdefault(int(line), []).append(text)
+
+    out = pd.DataFrame({'line': lines})
+
+    month = df[MONTH_COLUMN].str.strip()
+    flag(month.eq(''), 'Month is empty')
+    out['month'] = month
+
+    if JOB_COLUMN in df.columns:
+        # A blank job_id means the engagement the file was uploaded to
+        raw_job = df[JOB_COLUMN].str.strip().replace('', str(default_job_id))
+        is_id = raw_job.str.fullmatch(r'\d+')
+        flag(~is_id, "job_id is not a number: '" + raw_job + "'")
+        out['job_id'] = pd.to_numeric(raw_job.where(is_id), errors='coerce').astype('Int64')
+    else:
+        out['job_id'] = pd.Series(default_job_id, index=df.index, dtype='Int64')
+
+    for col in AMOUNT_COLUMNS:
+        if col not in df.columns:
+            out[col] = None
+            continue
+        raw = df[col].str.strip().str.replace(',', '', regex=False)
+        number = pd.to_numeric(raw, errors='coerce')
+        # NaN compares False, so this also rejects text, inf and overflow
+        ok = number.abs() < MAX_AMOUNT
+        flag(raw.ne('') & ~ok, f"{col} is not a valid amount: '" + df[col] + "'")
+        # Blank cells are None (keep the stored value / default to 0)
+        out[col] = raw.where(raw.ne('') & ok).map(
+            lambda value: Decimal(value).quantize(Decimal('0.01')) if isinstance(value, str) else None
+        )
+
+    # Only the first row per (job, month) is used
+    key = out['job_id'].astype(str) + '\x00' + out['month']
+    duplicated = key.duplicated(keep='first') & out['month'].ne('')
+    first_line = lines.groupby(key).transform('first')
+    flag(duplicated, 'Duplicate of line ' + first_line.astype(str) + ' for the same engagement and month')
+
+    valid = ~out['line'].isin(list(errors))
+    return out[valid], errors
+
+
+def _check_jobs(rows, errors, client_id):
+    """
+    Drop rows whose job does not exist (or is deleted) or belongs to another
+    client than `client_id`, in one query.
+    """
+    job_ids = [int(job_id) for job_id in rows['job_id'].unique()]
+    clients = dict(
+        db.session.query(Job.id, Job.client_id)
+        .filter(Job.id.in_(job_ids), Job.deleted_at.is_(None))
+    )
+    unknown = ~rows['job_id'].isin(list(clients))
+    for line, job_id in zip(rows.loc[unknown, 'line'], rows.loc[unknown, 'job_id']):
+        errors.setdefault(int(line), []).append(f"Engagement {job_id} does not exist")
+
+    # Uploading to one engagement only gives access to its client's other engagements
+    foreign = ~unknown & (rows['job_id'].map(lambda job_id: clients.get(int(job_id))) != client_id)
+    for line, job_id in zip(rows.loc[foreign, 'line'], rows.loc[foreign, 'job_id']):
+        errors.setdefault(int(line), []).append(
+            f"Engagement {job_id} belongs to another client than this engagement"
+        )
+    return rows[~unknown & ~foreign]
+
+
+# -----------------------------
+# Write
+# -----------------------------
+def _existing_summaries(rows):
+    """{(job_id, month): {column: value}} for every row already stored, in one query."""
+    job_ids = [int(job_id) for job_id in rows['job_id'].unique()]
+    months = list(rows['month'].unique())
+    table = VatMonthlySummary.__table__
+    query = (
+        db.session.query(table)
+        .filter(table.c.job_id.in_(job_ids), table.c.month.in_(months))
+        .order_by(table.c.id)
+    )
+    existing = {}
+    for row in query:
+        # Keep the oldest row if a (job, month) was ever stored twice
+        existing.setdefault((row.job_id, row.month), row._asdict())
+    return existing
+
+
+def _upsert(records):
+    """
+    Write one batch: a multi-row INSERT in which stored rows carry their id,
+    so MySQL turns them into updates (ON DUPLICATE KEY UPDATE).
+    """
+    table = VatMonthlySummary.__table__
+    connection = db.session.connection()
+    if connection.dialect.name == 'mysql':
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+        stmt = mysql_insert(table).values(records)
+        connection.execute(stmt.on_duplicate_key_update(
+            {col: stmt.inserted[col] for col in AMOUNT_COLUMNS}
+        ))
+        return
+
+    new = [r for r in records if r['id'] is None]
+    stored = [r for r in records if r['id'] is not None]
+    if new:
+        connection.execute(insert(table), [{k: v for k, v in r.items() if k != 'id'} for r in new])
+    if stored:
+        # Bind names must differ from the column names in an UPDATE
+        connection.execute(
+            update(table).where(table.c.id == bindparam('row_id'))
+            .values({col: bindparam(f'new_{col}') for col in AMOUNT_COLUMNS}),
+            [
+                {'row_id': r['id'], **{f'new_{col}': r[col] for col in AMOUNT_COLUMNS}}
+                for r in stored
+            ],
+        )
+
+
+def import_vat_summaries(file, default_job_id, batch_size=BATCH_SIZE):
+    """
+    Import a VAT summary CSV for `default_job_id` (rows may name other
+    engagements of the same client in a `job_id` column). Blank cells keep
+    the stored value.
+    Rows with any error are skipped; the rest are upserted on
+    (job_id, month) in batches and committed.
+
+    Returns {'created', 'updated', 'errors': [(line, message), ...]}.
+    Raises VatImportError when the file itself is unusable.
+    """
+    df = _read(file)
+    rows, errors = _coerce(df, default_job_id)
+    if not rows.empty:
+        client_id = db.session.query(Job.client_id).filter(Job.id == default_job_id).scalar()
+        rows = _check_jobs(rows, errors, client_id)
+
+    created = updated = 0
+    if not rows.empty:
+        existing = _existing_summaries(rows)
+        records = []
+        for row in rows.itertuples(index=False):
+            key = (int(row.job_id), row.month)
+            stored = existing.get(key)
+            record = {'id': stored['id'] if stored else None, 'job_id': key[0], 'month': row.month}
+            for col in AMOUNT_COLUMNS:
+                value = getattr(row, col)
+                if value is None:
+                    value = stored[col] if stored else Decimal('0')
+                record[col] = value
+            records.append(record)
+            if stored:
+                updated += 1
+            else:
+                created += 1
+
+        for start in range(0, len(records), batch_size):
+            _upsert(records[start:start + batch_size])
+        db.session.commit()
+
+    report = sorted((line, message) for line, messages in errors.items() for message in messages)
+    return {'created': created, 'updated': updated, 'errors': report}
@@ -0,0 +1,137 @@
+from sqlalchemy import select, union_all, literal, func, null
+from app.models import User, Task, Job, Department, Client, Service, TaskTemplate, Sheet
+from app.utils.db import db
+from app.utils.pagination import keyset_paginate, keyset_window
+
+PER_PAGE = 10
+
+# Recycle-bin type -> (filter key, model, label column, detail column)
+# The position in this tuple is folded into `row_key` so ids from different
+# tables never tie during keyset pagination.
+_SOURCES = (
+    ('Task', 'tasks', Task, Task.title, func.substr(Task.description, 1, 120)),
+    ('Engagement', 'jobs', Job, Job.name, null()),
+    ('User', 'users', User,
+     func.concat_ws(' ', User.first_name, User.last_name, User.middle_name), User.email),
+    ('Department', 'departments', Department, Department.name, null()),
+    ('Client', 'clients', Client, Client.name, Client.contact_email),
+    ('Service', 'services', Service, Service.name, null()),
+    ('Template', 'templates', TaskTemplate, TaskTemplate.title, null()),
+    ('Sheet', 'sheets', Sheet, Sheet.title, null()),
+)
+_TYPE_SLOTS = 8
+
+# What each audience can browse; directors/admins see everything but
+# templates and sheets, which have their own screens.
+OWN_ITEM_TYPES = ('tasks', 'jobs')
+ALL_ITEM_TYPES = ('tasks', 'jobs', 'users', 'departments', 'clients', 'services')
+STATS_ITEM_TYPES = ALL_ITEM_TYPES + ('templates', 'sheets')
+
+
+def _sources(item_types):
+    return [
+        (slot, source) for slot, source in enumerate(_SOURCES)
+        if source[1] in item_types
+    ]
+
+
+def _branch_filters(model, deleted_by_id):
+    filters = [model.deleted_at.isnot(None)]
+    if deleted_by_id is not None:
+        filters.append(model.deleted_by_id == deleted_by_id)
+    return filters
+
+
+def _union(selects):
+    if len(selects) == 1:
+        return selects[0].subquery('recycle_bin')
+    return union_all(*selects).subquery('recycle_bin')
+
+
+# -----------------------------
+# Counts
+# -----------------------------
+def get_deleted_counts(item_types, deleted_by_id=None):
+    """
+    {filter key: count} of soft-deleted rows per type in one grouped query
+    over a UNION ALL of the per-table `deleted_at` index scans.
+    Restricted to rows deleted by `deleted_by_id` when given.
+    """
+    sources = _sources(item_types)
+    if not sources:
+        return {}
+
+    counted = _union([
+        select(literal(key).label('item_type'))
+        .select_from(model)
+        .where(*_branch_filters(model, deleted_by_id))
+        for _slot, (_type, key, model, _label, _detail) in sources
+    ])
+    rows = (
+        db.session.query(counted.c.item_type, func.count())
+        .group_by(counted.c.item_type)
+        .all()
+    )
+    counts = {key: 0 for _slot, (_type, key, *_rest) in sources}
+    counts.update(rows)
+    return counts
+
+
+# -----------------------------
+# Feed
+# -----------------------------
+def get_deleted_items_page(item_types, deleted_by_id=None, cursor=None, total=None):
+    """
+    One keyset page of soft-deleted rows across `item_types`, newest first.
+
+    The cursor predicate, order and LIMIT page+1 are applied inside every
+    UNION ALL branch as well as to the union, so each table only reads one
+    page off its `deleted_at` index instead of its whole trash.
+
+    Rows carry `type`, `id`, `label`, `detail`, `deleted_at` and
+    `deleted_by_id` only; deleter names come from `get_deleter_names`.
+    """
+    branches = []
+    for slot, (item_type, _key, model, label, detail) in _sources(item_types):
+        row_key = model.id * _TYPE_SLOTS + slot
+        branch = keyset_window(
+            select(
+                literal(item_type).label('type'),
+                model.id.label('id'),
+                row_key.label('row_key'),
+                label.label('label'),
+                detail.label('detail'),
+                model.deleted_at.label('deleted_at'),
+                model.deleted_by_id.label('deleted_by_id'),
+            ).where(*_branch_filters(model, deleted_by_id)),
+            model.deleted_at, row_key,
+            cursor=cursor, per_page=PER_PAGE, descending=True,
+            # row_key orders like the primary key, which the deleted_at index ends with
+            order_id_column=model.id,
+        )
+        # Wrapped so the branch keeps its ORDER BY / LIMIT inside the union
+        branches.append(select(branch.subquery()))
+
+    feed = _union(branches)
+    return keyset_paginate(
+        db.session.query(feed), feed.c.deleted_at, feed.c.row_key,
+        cursor=cursor, per_page=PER_PAGE, descending=True, total=total,
+    )
+
+
+def get_deleter_names(items):
+    """
+    {user_id: full name} for the `deleted_by_id`s on one page, in one query.
+    """
+    user_ids = {item.deleted_by_id for item in items if item.deleted_by_id}
+    if not user_ids:
+        return {}
+    rows = (
+        db.session.query(
+            User.id,
+            func.concat_ws(' ', User.first_name, User.last_name, User.middle_name),
+        )
+        .filter(User.id.in_(user_ids))
+        .all()
+    )
+    return dict(rows)
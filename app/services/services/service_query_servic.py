@@ -1,19 +1,24 @@
 from app.models import Service
+from app.services.dtos import ServiceOption
 from app.utils.cache import cache  
+from app.utils.cache_invalidation import versioned_key, LOOKUPS_NAMESPACE
 from app.utils.db import db  
 
-CACHE_TTL = 300
+# Invalidated on commit via the lookups namespace
+CACHE_TTL = 6 * 60 * 60
 
 def get_services_for_forms():
     """
     Fetch all active services for dropdowns
+    Returns ServiceOption DTOs
     """
-    cache_key = "services:for_forms"
+    cache_key = versioned_key("services:for_forms", LOOKUPS_NAMESPACE)
     cached = cache.get(cache_key)
     if cached:
         return cached
 
-    services = Service.query.order_by(Service.name).all()
+    rows = db.session.query(Service.id, Service.name).order_by(Service.name).all()
+    services = [ServiceOption(*row) for row in rows]
 
     cache.set(cache_key, services, timeout=CACHE_TTL)
     return services
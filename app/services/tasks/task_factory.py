@@ -1,5 +1,6 @@
 # --- task_factory.py ---
-from app.utils.cache import cache  
+from app.utils.cache import cache, get_or_compute
+from app.utils.cache_invalidation import versioned_key, LOOKUPS_NAMESPACE
 from app.utils.db import db  
 from app.models import User, Client, TaskTemplate, Service, Job, VatFilingMonth, Task, PriorityEnum, RecurrenceEnum, TaskStatusEnum
 from datetime import datetime
@@ -10,19 +11,26 @@ from app.services.clients.client_query_service import get_clients_for_forms
 from app.services.services.service_query_servic import get_services_for_forms
 from app.services.jobs.job_query_service import get_jobs_for_forms
 from app.services.templates.task_template_query_service import get_templates_for_forms
+FORM_DATA_CACHE_TTL = 6 * 60 * 60
+
 # -----------------------------
 # 1) Form data service with caching
 # -----------------------------
 def get_task_form_data():
     """
     Fetch all data needed to render the create task form
-    Cached for 5 minutes
+    Cached until a user, client, job, service or template write commits.
+    Rebuilt by one worker at a time; the others serve the previous copy.
     """
-    cache_key = "task_form_data"
-    cached = cache.get(cache_key)
-    if cached:
-        return cached
+    cache_key = versioned_key("task_form_data", LOOKUPS_NAMESPACE)
+    return get_or_compute(
+        cache_key,
+        _build_task_form_data,
+        timeout=FORM_DATA_CACHE_TTL,
+        stale_key="task_form_data:stale",
+    )
 
+def _build_task_form_data():
     # Users for assignment
     users = get_users_for_assignment()
 
@@ -35,14 +43,12 @@ def get_task_form_data():
     # Jobs + eager load services to avoid n+1
     jobs = get_jobs_for_forms()
 
-    data = {
+    return {
         "users": users,
         "templates": templates,
         "services": services,
         "jobs": jobs
     }
-    cache.set(cache_key, data, timeout=300)
-    return data
 
 # -----------------------------
 # 2) Add service to job helper
@@ -97,6 +103,21 @@ def create_vat_form(task: Task):
     db.session.add(new_vat_form)
     return f"VAT form for {filing_month_str} created."
 
+def task_deadline_taken(job_id, task_template_id, deadline):
+    """
+    True if the engagement already has a task from this template due at
+    `deadline` (trashed tasks included); the tasks table allows only one.
+    """
+    if job_id is None or task_template_id is None or deadline is None:
+        return False
+    if deadline.tzinfo is not None:
+        deadline = deadline.astimezone(pytz.utc).replace(tzinfo=None)
+    return db.session.query(
+        db.session.query(Task.id)
+        .filter(Task.job_id == job_id, Task.task_template_id == task_template_id, Task.deadline == deadline)
+        .exists()
+    ).scalar()
+
 def make_task_from_data(
     title: str,
     description: str,
@@ -2,58 +2,76 @@ from datetime import datetime
 from sqlalchemy import func, case
 from sqlalchemy.orm import joinedload
 from app.utils.cache import cache
+from app.utils.cache_invalidation import (
+    versioned_key, user_namespace, department_namespace, FIRM_NAMESPACE
+)
 from app.models import Task, TaskApproval, TaskStatusEnum, DecisionEnum, User
+from app.services.dtos import ReviewTaskItem
 from app.utils.db import db
+from app.utils.task_stats import get_status_counts
 
-CACHE_TTL = 120
+# Entries are invalidated on commit, so the TTL only bounds memory use
+CACHE_TTL = 6 * 60 * 60
 
 def get_assigned_task_counts(user_id: int):
-    cache_key = f"dashboard:task_counts:{user_id}"
+    cache_key = versioned_key(f"dashboard:task_counts:{user_id}", user_namespace(user_id))
     cached = cache.get(cache_key)
     if cached:
         return cached
 
     now = datetime.utcnow()
 
+    open_statuses = Task.status.notin_([
+        TaskStatusEnum.COMPLETED,
+        TaskStatusEnum.REVIEW,
+        TaskStatusEnum.MANAGER_REVIEW,
+        TaskStatusEnum.PARTNER_REVIEW
+    ])
+    not_approved = ~Task.approvals.any(TaskApproval.decision == DecisionEnum.APPROVED)
+
+    # Overdue depends on the clock, so it is the one figure still counted
+    # from tasks; it only looks at the user's open, past-deadline rows.
     counts = db.session.query(
         func.count(case((
-            (Task.deadline < now) &
-            (Task.status.notin_([
-                TaskStatusEnum.COMPLETED,
-                TaskStatusEnum.REVIEW,
-                TaskStatusEnum.MANAGER_REVIEW,
-                TaskStatusEnum.PARTNER_REVIEW
-            ])) &
-            (~Task.approvals.any(TaskApproval.decision == DecisionEnum.APPROVED)),
+            (Task.deadline < now) & open_statuses & not_approved,
             1
         ))).label('overdue'),
 
-        func.count(case((Task.status == TaskStatusEnum.ASSIGNED, 1))).label('assigned'),
-        func.count(case((Task.status == TaskStatusEnum.RE_ASSIGNED, 1))).label('rejected'),
-        func.count(case((Task.status == TaskStatusEnum.IN_PROGRESS, 1))).label('in_progress'),
-        func.count(case((Task.status == TaskStatusEnum.PAUSED, 1))).label('paused'),
-        func.count(case((Task.status.in_([
-            TaskStatusEnum.REVIEW,
-            TaskStatusEnum.MANAGER_REVIEW,
-            TaskStatusEnum.PARTNER_REVIEW
-        ]), 1))).label('under_review'),
-        func.count(case((Task.status == TaskStatusEnum.COMPLETED, 1))).label('completed'),
+        # Earliest deadline still ahead of us: the overdue count changes then
+        func.min(case((
+            (Task.deadline >= now) & open_statuses & not_approved,
+            Task.deadline
+        ))).label('next_deadline'),
     ).filter(
         Task.assigned_to_id == user_id,
-        Task.deleted_at.is_(None)
+        Task.deleted_at.is_(None),
+        open_statuses
     ).one()
 
+    # Everything else comes from the maintained per-status rollup
+    by_status = get_status_counts([user_id])[user_id]
+
     result = {
         'overdue_tasks_count': counts.overdue,
-        'assigned_tasks_count': counts.assigned,
-        'rejected_tasks_count': counts.rejected,
-        'in_progress_tasks_count': counts.in_progress,
-        'paused_tasks_count': counts.paused,
-        'under_review_tasks_count': counts.under_review,
-        'completed_tasks_count': counts.completed,
+        'assigned_tasks_count': by_status[TaskStatusEnum.ASSIGNED],
+        'rejected_tasks_count': by_status[TaskStatusEnum.RE_ASSIGNED],
+        'in_progress_tasks_count': by_status[TaskStatusEnum.IN_PROGRESS],
+        'paused_tasks_count': by_status[TaskStatusEnum.PAUSED],
+        'under_review_tasks_count': (
+            by_status[TaskStatusEnum.REVIEW]
+            + by_status[TaskStatusEnum.MANAGER_REVIEW]
+            + by_status[TaskStatusEnum.PARTNER_REVIEW]
+        ),
+        'completed_tasks_count': by_status[TaskStatusEnum.COMPLETED],
     }
 
-    cache.set(cache_key, result, CACHE_TTL)
+    # No write happens when a deadline passes, so expire the entry then
+    timeout = CACHE_TTL
+    if counts.next_deadline:
+        seconds_left = int((counts.next_deadline - now).total_seconds()) + 1
+        timeout = max(1, min(timeout, seconds_left))
+
+    cache.set(cache_key, result, timeout)
     return result
 
 def _cache_key(user):
@@ -61,16 +79,26 @@ def _cache_key(user):
     Generate a safe cache key based on role & user.
     """
     if user.role == "DIRECTOR":
-        return "dashboard:review_tasks:director"
+        return versioned_key("dashboard:review_tasks:director", FIRM_NAMESPACE)
 
     if user.role == "SUPERVISOR":
-        dept_ids = sorted(d.id for d in user.reviewing_departments)
-        return f"dashboard:review_tasks:supervisor:{user.id}:{'-'.join(map(str, dept_ids))}"
+        dept_ids = {d.id for d in user.reviewing_departments}
+        if user.department_id:
+            dept_ids.add(user.department_id)
+        dept_ids = sorted(dept_ids)
+        return versioned_key(
+            f"dashboard:review_tasks:supervisor:{user.id}:{'-'.join(map(str, dept_ids))}",
+            user_namespace(user.id),
+            *(department_namespace(d) for d in dept_ids)
+        )
 
-    return f"dashboard:review_tasks:user:{user.id}"
+    return versioned_key(f"dashboard:review_tasks:user:{user.id}", user_namespace(user.id))
 
 
 def get_tasks_waiting_for_review_by_user(user):
+    """
+    Tasks in REVIEW visible to `user`, as ReviewTaskItem DTOs.
+    """
     cache_key = _cache_key(user)
     cached = cache.get(cache_key)
     if cached:
@@ -79,10 +107,7 @@ def get_tasks_waiting_for_review_by_user(user):
     base_query = (
         Task.query
         .filter(Task.status == TaskStatusEnum.REVIEW)
-        .options(
-            joinedload(Task.creator),
-            joinedload(Task.job)
-        )
+        .options(joinedload(Task.assignee))
     )
 
     # -------------------------
@@ -116,5 +141,6 @@ def get_tasks_waiting_for_review_by_user(user):
             .all()
         )
 
+    tasks = [ReviewTaskItem.from_model(task) for task in tasks]
     cache.set(cache_key, tasks, CACHE_TTL)
-    return tasks
\ No newline at end of file
+    return tasks
@@ -0,0 +1,110 @@
+from collections import Counter
+from datetime import date, datetime, timedelta
+from sqlalchemy import func
+from app.models import User, Department, TaskStatusEnum, UserTaskDailyStat
+from app.utils.db import db
+from app.utils.task_stats import get_status_counts
+
+# Workload figure -> statuses it adds up
+WORKLOAD_STATUSES = {
+    'in_progress': (TaskStatusEnum.IN_PROGRESS,),
+    'paused': (TaskStatusEnum.PAUSED,),
+    'under_review': (
+        TaskStatusEnum.REVIEW,
+        TaskStatusEnum.MANAGER_REVIEW,
+        TaskStatusEnum.PARTNER_REVIEW,
+    ),
+    'redo': (TaskStatusEnum.RE_ASSIGNED,),
+    'completed': (TaskStatusEnum.COMPLETED,),
+}
+
+
+def period_start(period: str, today: date = None):
+    """
+    First day covered by a dashboard period ('today', 'week', 'month',
+    '6months'); None for anything else, meaning "all time".
+    """
+    today = today or datetime.utcnow().date()
+    if period == 'today':
+        return today
+    if period == 'week':
+        return today - timedelta(days=today.weekday())
+    if period == 'month':
+        return today.replace(day=1)
+    if period == '6months':
+        return today - timedelta(days=30 * 6)
+    return None
+
+
+def _workload(by_status):
+    return {
+        key: sum(by_status[s] for s in statuses)
+        for key, statuses in WORKLOAD_STATUSES.items()
+    }
+
+
+# -----------------------------
+# Range sums over the daily rollup
+# -----------------------------
+def get_workload_for_users(user_ids, start_day: date = None, end_day: date = None):
+    """
+    {user_id: {'in_progress', 'paused', 'under_review', 'redo', 'completed'}}
+    for tasks currently in each status whose last update fell in
+    [start_day, end_day]. Open bounds mean "no limit on that side".
+
+    Reads user_task_daily_stats (or user_task_stats when unbounded), so the
+    cost follows the number of users and days, not the size of `tasks`.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+
+    if start_day is None and end_day is None:
+        by_user = get_status_counts(user_ids)
+    else:
+        query = (
+            db.session.query(
+                UserTaskDailyStat.user_id,
+                UserTaskDailyStat.status,
+                func.sum(UserTaskDailyStat.task_count),
+            )
+            .filter(UserTaskDailyStat.user_id.in_(user_ids))
+            .group_by(UserTaskDailyStat.user_id, UserTaskDailyStat.status)
+        )
+        if start_day is not None:
+            query = query.filter(UserTaskDailyStat.day >= start_day)
+        if end_day is not None:
+            query = query.filter(UserTaskDailyStat.day <= end_day)
+
+        by_user = {user_id: Counter() for user_id in user_ids}
+        for user_id, status, count in query:
+            by_user[user_id][status] += int(count or 0)
+
+    return {user_id: _workload(counts) for user_id, counts in by_user.items()}
+
+
+def get_user_workload(user_id: int, start_day: date = None, end_day: date = None):
+    return get_workload_for_users([user_id], start_day, end_day)[user_id]
+
+
+def get_team_workload(department_ids=None, start_day: date = None, end_day: date = None):
+    """
+    Live users (Partners excluded) with their workload for the range,
+    ordered by department then first name. Restricted to `department_ids`
+    when given.
+    """
+    query = (
+        db.session.query(
+            User.id, User.first_name, User.last_name, User.role,
+            Department.name.label('department_name'),
+        )
+        .join(Department, User.department_id == Department.id)
+        .filter(Department.name != 'Partners', User.deleted_at.is_(None))
+    )
+    if department_ids is not None:
+        query = query.filter(User.department_id.in_(department_ids))
+
+    users = query.order_by(Department.name, User.first_name).all()
+    stats = get_workload_for_users([u.id for u in users], start_day, end_day)
+
+    return [(user, stats[user.id]) for user in users]
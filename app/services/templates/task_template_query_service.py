@@ -1,15 +1,19 @@
 from app.models import TaskTemplate
+from app.services.dtos import TemplateOption
 from app.utils.cache import cache  
+from app.utils.cache_invalidation import versioned_key, LOOKUPS_NAMESPACE
 from app.utils.db import db  
 
-CACHE_TTL = 300
+# Invalidated on commit via the lookups namespace
+CACHE_TTL = 6 * 60 * 60
 
 def get_templates_for_forms():
     """
     Fetch all task templates
     Cached for forms like task creation, job creation
+    Returns TemplateOption DTOs
     """
-    cache_key = "task_templates:for_forms"
+    cache_key = versioned_key("task_templates:for_forms", LOOKUPS_NAMESPACE)
     cached = cache.get(cache_key)
     if cached:
         return cached
@@ -17,6 +21,7 @@ def get_templates_for_forms():
     templates = TaskTemplate.query.options(
         db.joinedload(TaskTemplate.service)  # load related service to avoid N+1
     ).all()
+    templates = [TemplateOption.from_model(t) for t in templates]
 
     cache.set(cache_key, templates, timeout=CACHE_TTL)
     return templates
@@ -0,0 +1,212 @@
+import math
+from sqlalchemy import func, literal_column, desc
+from sqlalchemy.orm import joinedload
+from app.models import (
+    Task, TaskLog, TaskApproval, TaskTemplate, Service, Client,
+    TaskStatusEnum, LogStatusEnum, DecisionEnum
+)
+from app.utils.db import db
+
+PER_PAGE = 5
+
+
+# -----------------------------
+# Counts
+# -----------------------------
+def _redo_filter():
+    # Tasks that were sent back at least once
+    return Task.approvals.any(TaskApproval.decision == DecisionEnum.REDO)
+
+
+def get_profile_counts(user_id: int):
+    """
+    Totals for every profile tab: one grouped aggregate over the user's
+    assigned tasks plus single counts for created and redo tasks.
+    """
+    by_status = dict(
+        db.session.query(Task.status, func.count(Task.id))
+        .filter(Task.assigned_to_id == user_id, Task.deleted_at.is_(None))
+        .group_by(Task.status)
+        .all()
+    )
+
+    created = (
+        db.session.query(func.count(Task.id))
+        .filter(Task.created_by_id == user_id, Task.deleted_at.is_(None))
+        .scalar()
+    )
+    redo = (
+        db.session.query(func.count(Task.id))
+        .filter(Task.assigned_to_id == user_id, Task.deleted_at.is_(None), _redo_filter())
+        .scalar()
+    )
+
+    return {
+        "assigned": sum(by_status.values()),
+        "not_started": by_status.get(TaskStatusEnum.ASSIGNED, 0),
+        "in_progress": by_status.get(TaskStatusEnum.IN_PROGRESS, 0),
+        "paused": by_status.get(TaskStatusEnum.PAUSED, 0),
+        "under_review": by_status.get(TaskStatusEnum.REVIEW, 0),
+        "completed": by_status.get(TaskStatusEnum.COMPLETED, 0),
+        "created": created,
+        "redo": redo,
+    }
+
+
+# -----------------------------
+# Tabs
+# -----------------------------
+def _tab_query(user_id, tab):
+    """
+    (query, order_by) for a profile tab; each filters on an indexed prefix
+    of tasks (assigned_to_id/created_by_id, status, deleted_at).
+    """
+    assigned = Task.query.filter(Task.assigned_to_id == user_id, Task.deleted_at.is_(None))
+
+    if tab == "assigned":
+        return assigned, (Task.id.desc(),)
+    if tab == "not_started":
+        return assigned.filter(Task.status == TaskStatusEnum.ASSIGNED), (Task.deadline.asc(), Task.id)
+    if tab == "in_progress":
+        return assigned.filter(Task.status == TaskStatusEnum.IN_PROGRESS), (Task.deadline.asc(), Task.id)
+    if tab == "paused":
+        return assigned.filter(Task.status == TaskStatusEnum.PAUSED), (Task.deadline.asc(), Task.id)
+    if tab == "under_review":
+        return assigned.filter(Task.status == TaskStatusEnum.REVIEW), (Task.updated_at.desc(), Task.id.desc())
+    if tab == "completed":
+        return assigned.filter(Task.status == TaskStatusEnum.COMPLETED), (Task.updated_at.desc(), Task.id.desc())
+    if tab == "redo":
+        return assigned.filter(_redo_filter()), (Task.updated_at.desc(), Task.id.desc())
+    if tab == "created":
+        created = (
+            Task.query
+            .filter(Task.created_by_id == user_id, Task.deleted_at.is_(None))
+            .options(joinedload(Task.assignee))
+        )
+        return created, (Task.id.desc(),)
+    raise ValueError(f"Unknown profile tab: {tab}")
+
+
+def get_profile_tab_page(user_id: int, tab: str, page: int, total: int):
+    """
+    One page of a profile tab. `total` comes from get_profile_counts, so no
+    COUNT(*) is issued here. Returns (items, page, total_pages).
+    """
+    total_pages = math.ceil(total / PER_PAGE)
+    page = max(1, min(page, total_pages or 1))
+    if not total:
+        return [], page, total_pages
+
+    query, order_by = _tab_query(user_id, tab)
+    items = (
+        query.order_by(*order_by)
+        .limit(PER_PAGE)
+        .offset((page - 1) * PER_PAGE)
+        .all()
+    )
+    return items, page, total_pages
+
+
+# -----------------------------
+# Completion time
+# -----------------------------
+def _duration_seconds():
+    return func.timestampdiff(literal_column("SECOND"), TaskLog.start_time, TaskLog.end_time)
+
+
+def _completed_logs(user_id):
+    return (
+        db.session.query(TaskLog)
+        .filter(
+            TaskLog.user_id == user_id,
+            TaskLog.status == LogStatusEnum.COMPLETED,
+            TaskLog.end_time.isnot(None),
+        )
+    )
+
+
+def get_average_completion_seconds(user_id: int):
+    """
+    Mean duration of the user's completed task logs, or None if there are none.
+    """
+    avg = _completed_logs(user_id).with_entities(func.avg(_duration_seconds())).scalar()
+    return float(avg) if avg is not None else None
+
+
+def get_completion_graph_data(user_id: int, start_date, service_id: int = None):
+    """
+    [{'task_title', 'end_time', 'duration_minutes'}] for completed logs
+    started since `start_date`, optionally limited to one service.
+    """
+    duration = _duration_seconds()
+    query = (
+        _completed_logs(user_id)
+        .join(Task, Task.id == TaskLog.task_id)
+        .filter(TaskLog.start_time >= start_date, duration > 0)
+        .with_entities(Task.title, TaskLog.end_time, duration.label("seconds"))
+        .order_by(TaskLog.end_time)
+    )
+    if service_id:
+        query = query.join(TaskTemplate, TaskTemplate.id == Task.task_template_id) \
+                     .filter(TaskTemplate.service_id == service_id)
+
+    return [
+        {
+            'task_title': title,
+            'end_time': end_time.strftime("%Y-%m-%d"),
+            'duration_minutes': round(seconds / 60, 2),
+        }
+        for title, end_time, seconds in query
+    ]
+
+
+# -----------------------------
+# Summaries
+# -----------------------------
+def get_clients_worked_for(user_id: int):
+    """
+    {client_name: [(task_title, times_completed), ...]} for completed tasks.
+    """
+    rows = (
+        db.session.query(Client.name, Task.title, func.count(Task.id))
+        .join(Client, Client.id == Task.client_id)
+        .filter(
+            Task.assigned_to_id == user_id,
+            Task.deleted_at.is_(None),
+            Task.status == TaskStatusEnum.COMPLETED,
+        )
+        .group_by(Client.name, Task.title)
+        .order_by(Client.name, Task.title)
+        .all()
+    )
+    clients = {}
+    for client_name, title, count in rows:
+        clients.setdefault(client_name, []).append((title, count))
+    return clients
+
+
+def _most_frequent(user_id, label, *joins, limit=5):
+    query = db.session.query(label, func.count(Task.id).label("n"))
+    for target, condition in joins:
+        query = query.join(target, condition)
+    return (
+        query.filter(Task.assigned_to_id == user_id, Task.deleted_at.is_(None))
+        .group_by(label)
+        .order_by(desc("n"))
+        .limit(limit)
+        .all()
+    )
+
+
+def get_most_frequent(user_id: int):
+    """
+    Top five task titles, services and templates among the user's tasks.
+    """
+    template_join = (TaskTemplate, TaskTemplate.id == Task.task_template_id)
+    return {
+        "tasks": _most_frequent(user_id, Task.title),
+        "services": _most_frequent(
+            user_id, Service.name, template_join, (Service, Service.id == TaskTemplate.service_id)
+        ),
+        "templates": _most_frequent(user_id, TaskTemplate.title, template_join),
+    }
@@ -1,15 +1,17 @@
 # app/services/user_service.py
 
 from collections import defaultdict
-from sqlalchemy import func, case
 from sqlalchemy.sql import exists
 from sqlalchemy.orm import joinedload, subqueryload
-from app.utils.cache import cache  
+from app.utils.cache import cache, get_or_compute
+from app.utils.cache_invalidation import versioned_key, FIRM_NAMESPACE, LOOKUPS_NAMESPACE
 from app.utils.db import db        
 from app.models import (
     User, Task, TaskTemplate,
     RoleEnum, TaskStatusEnum
 )
+from app.services.dtos import UserOption, UserStatsRow
+from app.utils.task_stats import get_status_counts
 
 # Task statuses considered “active” for filtering
 ACTIVE_STATUSES = (
@@ -19,7 +21,7 @@ ACTIVE_STATUSES = (
     TaskStatusEnum.RE_ASSIGNED,
 )
 
-CACHE_TTL = 300  # cache results for 5 minutes
+CACHE_TTL = 6 * 60 * 60  # invalidated on commit, TTL only bounds memory
 
 
 def _cache_key(filters: dict) -> str:
@@ -31,7 +33,7 @@ def _cache_key(filters: dict) -> str:
         for k in sorted(filters)
         if filters.get(k) is not None
     ]
-    return "users:list:" + "|".join(parts)
+    return versioned_key("users:list:" + "|".join(parts), FIRM_NAMESPACE)
 
 
 def get_users_with_stats(filters: dict):
@@ -42,21 +44,24 @@ def get_users_with_stats(filters: dict):
     - review: tasks in review
     - redo: tasks re-assigned
 
-    Returns a flat list of dicts:
+    Returns a flat list of UserStatsRow DTOs:
     [
-        {"user": User, "assigned": int, "completed": int, "review": int, "redo": int},
+        UserStatsRow(user=UserOption, assigned=int, completed=int, review=int, redo=int),
         ...
     ]
     """
 
     # ---------------------
-    # Check cache first
+    # Cached; one worker rebuilds at a time
     # ---------------------
-    cache_key = _cache_key(filters)
-    cached = cache.get(cache_key)
-    if cached:
-        return cached
+    return get_or_compute(
+        _cache_key(filters),
+        lambda: _build_users_with_stats(filters),
+        timeout=CACHE_TTL,
+    )
+
 
+def _build_users_with_stats(filters: dict):
     # ---------------------
     # Base user query
     # ---------------------
@@ -111,26 +116,12 @@ def get_users_with_stats(filters: dict):
     # ---------------------
     user_ids = [u.id for u in user_query.all()]
     if not user_ids:
-        cache.set(cache_key, [], CACHE_TTL)
         return []
 
     # ---------------------
-    # Aggregate task stats in SQL
+    # Task stats from the maintained per-status rollup
     # ---------------------
-    stats = (
-        db.session.query(
-            Task.assigned_to_id.label("user_id"),
-            func.count(Task.id).label("assigned"),
-            func.sum(case((Task.status == TaskStatusEnum.COMPLETED, 1), else_=0)).label("completed"),
-            func.sum(case((Task.status == TaskStatusEnum.REVIEW, 1), else_=0)).label("review"),
-            func.sum(case((Task.status == TaskStatusEnum.RE_ASSIGNED, 1), else_=0)).label("redo"),
-        )
-        .filter(Task.assigned_to_id.in_(user_ids))
-        .group_by(Task.assigned_to_id)
-        .all()
-    )
-
-    stats_map = {s.user_id: s for s in stats}
+    stats_map = get_status_counts(user_ids)
 
     # ---------------------
     # Fetch full user objects with department joined
@@ -143,23 +134,19 @@ def get_users_with_stats(filters: dict):
     )
 
     # ---------------------
-    # Combine user objects with stats
+    # Combine user snapshots with stats
     # ---------------------
     result = []
     for user in users:
-        s = stats_map.get(user.id)
-        result.append({
-            "user": user,
-            "assigned": s.assigned if s else 0,
-            "completed": s.completed if s else 0,
-            "review": s.review if s else 0,
-            "redo": s.redo if s else 0,
-        })
+        s = stats_map[user.id]
+        result.append(UserStatsRow(
+            user=UserOption.from_model(user),
+            assigned=sum(s.values()),
+            completed=s[TaskStatusEnum.COMPLETED],
+            review=s[TaskStatusEnum.REVIEW],
+            redo=s[TaskStatusEnum.RE_ASSIGNED],
+        ))
 
-    # ---------------------
-    # Cache results
-    # ---------------------
-    cache.set(cache_key, result, CACHE_TTL)
     return result
 
 
@@ -170,12 +157,12 @@ def group_users_by_department(users_data):
     """
     grouped = defaultdict(list)
     for row in users_data:
-        dept_name = row["user"].department.name if row["user"].department else "No Department"
+        dept_name = row.user.department_name or "No Department"
         grouped[dept_name].append(row)
 
     # Sort departments and users alphabetically
     grouped_sorted = {
-        dept: sorted(users, key=lambda r: r["user"].first_name)
+        dept: sorted(users, key=lambda r: r.user.first_name)
         for dept, users in sorted(grouped.items())
     }
 
@@ -185,9 +172,9 @@ def get_users_for_assignment():
     """
     Fetch users for assignment dropdown (lightweight, no stats)
     Excludes Partners department and deleted users
-    Caches for 5 minutes
+    Cached until a user write commits, as UserOption DTOs
     """
-    cache_key = "users:for_assignment"
+    cache_key = versioned_key("users:for_assignment", LOOKUPS_NAMESPACE)
     cached = cache.get(cache_key)
     if cached:
         return cached
@@ -201,8 +188,9 @@ def get_users_for_assignment():
         .order_by(User.first_name, User.last_name)
         .all()
     )
+    users = [UserOption.from_model(user) for user in users]
 
-    cache.set(cache_key, users, timeout=300)
+    cache.set(cache_key, users, timeout=CACHE_TTL)
     return users
 
 
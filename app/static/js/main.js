@@ -5,6 +5,7 @@ document.addEventListener("DOMContentLoaded", function () {
     // --- Get the notifications URL from the script tag in base.html --//
     const mainScript = document.getElementById('main-js');
     const NOTIFICATIONS_URL = mainScript.dataset.notificationsUrl;
+    const UNREAD_COUNT_URL = mainScript.dataset.unreadCountUrl;
 
     // --- Socket.IO and Notifications ---
     window.socket = io.connect(window.location.protocol + "//" + document.domain + ":" + location.port);
@@ -12,7 +13,14 @@ document.addEventListener("DOMContentLoaded", function () {
 
     socket.on("connect", () => {});
 
-    socket.on("new_notification", (data) => {
+    socket.on("new_notification", (data) => showNotification(data));
+
+    // Several notifications for this user committed together
+    socket.on("new_notifications", (batch) => {
+        (batch.notifications || []).forEach((data) => showNotification(data));
+    });
+
+    function showNotification(data) {
         try {
             // Check if we are on the notifications page ---
             if (!document.getElementById('notifications-page-wrapper')) {
@@ -36,7 +44,7 @@ document.addEventListener("DOMContentLoaded", function () {
         } catch (error) {
             // Silent error handling
         }
-    });
+    }
 
     // --- All Helper Functions ---
     function showFlashToast(message, time, url) {
@@ -88,10 +96,9 @@ document.addEventListener("DOMContentLoaded", function () {
             return;
         }
         try {
-            // ✅ FIXED: Use the URL passed in from base.html
-            const response = await fetch(NOTIFICATIONS_URL);
-            const unread_notifications = await response.json();
-            const count = unread_notifications.length;
+            // The badge reads the per-user unread counter, not the feed
+            const response = await fetch(UNREAD_COUNT_URL);
+            const { count } = await response.json();
             const bell = document.getElementById("notification-count");
             if (bell) {
                 if (count > 0) {
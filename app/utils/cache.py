@@ -1,7 +1,107 @@
 # app/utils/cache.py
+import threading
+import time
+import uuid
+import weakref
 from flask_caching import Cache
 
 cache = Cache()
 
+# Per-key locks so threads of one worker collapse onto a single rebuild
+_local_locks = weakref.WeakValueDictionary()
+_local_locks_guard = threading.Lock()
+
 def init_cache(app):
     cache.init_app(app)
+
+    # Registers the commit hooks that bump versioned cache namespaces
+    from app.utils import cache_invalidation  # noqa: F401
+
+
+def release_lock(lock_key, token):
+    """
+    Delete `lock_key` only if it still holds `token`. On Redis this is one
+    compare-and-delete script, so a lock that expired and was taken by
+    another worker is never removed from under it. In-process caches are not
+    shared between workers, so reading before deleting is enough there.
+    """
+    from app.utils.cache_backends import redis_delete_if
+
+    backend = cache.cache
+    if hasattr(backend, "delete_if"):
+        return backend.delete_if(lock_key, token)
+    if getattr(backend, "_write_client", None) is not None:
+        return redis_delete_if(backend, lock_key, token)
+    if cache.get(lock_key) == token:
+        return cache.delete(lock_key)
+    return False
+
+
+def _local_lock(key):
+    with _local_locks_guard:
+        lock = _local_locks.get(key)
+        if lock is None:
+            lock = threading.Lock()
+            _local_locks[key] = lock
+        return lock
+
+
+def get_or_compute(key, builder, timeout=None, stale_key=None, stale_timeout=None,
+                   lock_timeout=30, wait_timeout=10, poll_interval=0.1):
+    """
+    Return the cached value for `key`, rebuilding it at most once at a time.
+
+    On a miss, one worker takes the `lock:<key>` entry (an atomic `add`) and
+    runs `builder()`; everyone else either serves the last good value kept
+    under `stale_key` or polls for the fresh value for up to `wait_timeout`
+    seconds before giving up and building it themselves.
+
+    Pass the unversioned base key as `stale_key` to keep serving the previous
+    value while a post-invalidation rebuild is in flight. Leave it unset for
+    data that must never be served stale.
+    """
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    lock = _local_lock(key)
+    with lock:
+        # Another thread in this worker may have finished while we waited
+        value = cache.get(key)
+        if value is not None:
+            return value
+
+        lock_key = f"lock:{key}"
+        token = uuid.uuid4().hex
+        if cache.add(lock_key, token, timeout=lock_timeout):
+            try:
+                value = builder()
+                cache.set(key, value, timeout=timeout)
+                if stale_key:
+                    cache.set(stale_key, value, timeout=stale_timeout or 0)
+                return value
+            finally:
+                release_lock(lock_key, token)
+
+        # Another worker is rebuilding
+        if stale_key:
+            stale = cache.get(stale_key)
+            if stale is not None:
+                return stale
+
+        deadline = time.monotonic() + wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(poll_interval)
+            value = cache.get(key)
+            if value is not None:
+                return value
+            if cache.get(lock_key) is None:
+                break
+
+        # The holder died or is too slow: build without caching over its result
+        value = cache.get(key)
+        if value is not None:
+            return value
+        value = builder()
+        cache.add(key, value, timeout=timeout)
+        return value
@@ -0,0 +1,218 @@
+# app/utils/cache_backends.py
+"""
+Two-tier cache backend for Flask-Caching.
+
+A small in-process LRU sits in front of a shared Redis-protocol store, so
+every gunicorn worker sees the same entries and the same invalidations
+while hot keys are still served without a network round-trip.
+
+Enable with:
+    CACHE_TYPE=app.utils.cache_backends.TwoTierCache
+    CACHE_REDIS_URL=redis://localhost:6379/0
+
+Any server speaking the Redis protocol works as the shared tier, so a
+throwaway local `redis-server` (or a compatible stand-in) is enough for
+development and testing.
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from flask_caching.backends.base import BaseCache
+from flask_caching.backends.rediscache import RedisCache
+
+# DEL the key only if it still holds ARGV[1], in one server-side step
+_COMPARE_AND_DELETE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def redis_delete_if(redis_cache, key, value):
+    """
+    Atomically delete `key` from a cachelib RedisCache if it still holds
+    `value`, e.g. release a lock only while we own it. Returns True if deleted.
+    """
+    name = f"{redis_cache._get_prefix()}{key}"
+    dump = redis_cache.serializer.dumps(value)
+    return bool(redis_cache._write_client.eval(_COMPARE_AND_DELETE, 1, name, dump))
+
+
+class LocalLRU:
+    """
+    Thread-safe, size-bounded LRU with per-entry expiry.
+    Values are stored pickled so callers never share mutable objects.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+        return pickle.loads(payload)
+
+    def set(self, key, value, timeout):
+        if timeout <= 0 or self.maxsize <= 0:
+            return
+        payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._data[key] = (time.monotonic() + timeout, payload)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class TwoTierCache(BaseCache):
+    """
+    In-process LRU (tier 1) in front of a shared RedisCache (tier 2).
+
+    - Writes go to both tiers; reads hit the LRU first.
+    - LRU entries live at most `local_timeout` seconds, which bounds how
+      long a worker can miss a plain `delete` issued by another worker.
+    - Keys starting with a bypass prefix (namespace versions, locks) are
+      always read from the shared tier, so versioned-key invalidation is
+      seen by every worker immediately.
+    """
+
+    def __init__(self, shared, default_timeout=300, local_maxsize=1024,
+                 local_timeout=30, bypass_prefixes=("ns:", "lock:")):
+        super().__init__(default_timeout=default_timeout)
+        self.shared = shared
+        self.local = LocalLRU(maxsize=local_maxsize)
+        self.local_timeout = local_timeout
+        self.bypass_prefixes = tuple(bypass_prefixes)
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        shared = RedisCache.factory(app, config, args, kwargs)
+        return cls(
+            shared,
+            default_timeout=config.get("CACHE_DEFAULT_TIMEOUT", 300),
+            local_maxsize=config.get("CACHE_LOCAL_MAXSIZE", 1024),
+            local_timeout=config.get("CACHE_LOCAL_TIMEOUT", 30),
+        )
+
+    def _is_local(self, key):
+        return not key.startswith(self.bypass_prefixes)
+
+    def _local_timeout(self, timeout):
+        timeout = self._normalize_timeout(timeout)
+        if timeout == 0:  # 0 means "never expires" in the shared tier
+            return self.local_timeout
+        return min(timeout, self.local_timeout)
+
+    # -----------------------------
+    # Reads
+    # -----------------------------
+    def get(self, key):
+        if self._is_local(key):
+            value = self.local.get(key)
+            if value is not None:
+                return value
+
+        value = self.shared.get(key)
+        if value is not None and self._is_local(key):
+            self.local.set(key, value, self.local_timeout)
+        return value
+
+    def get_many(self, *keys):
+        results = {}
+        missing = []
+        for key in keys:
+            value = self.local.get(key) if self._is_local(key) else None
+            if value is None:
+                missing.append(key)
+            else:
+                results[key] = value
+
+        if missing:
+            for key, value in zip(missing, self.shared.get_many(*missing)):
+                results[key] = value
+                if value is not None and self._is_local(key):
+                    self.local.set(key, value, self.local_timeout)
+
+        return [results.get(key) for key in keys]
+
+    def has(self, key):
+        if self._is_local(key) and self.local.get(key) is not None:
+            return True
+        return self.shared.has(key)
+
+    # -----------------------------
+    # Writes
+    # -----------------------------
+    def set(self, key, value, timeout=None):
+        result = self.shared.set(key, value, timeout=timeout)
+        if self._is_local(key):
+            self.local.set(key, value, self._local_timeout(timeout))
+        return result
+
+    def set_many(self, mapping, timeout=None):
+        result = self.shared.set_many(mapping, timeout=timeout)
+        for key, value in mapping.items():
+            if self._is_local(key):
+                self.local.set(key, value, self._local_timeout(timeout))
+            else:
+                self.local.delete(key)
+        return result
+
+    def add(self, key, value, timeout=None):
+        # Atomic in the shared tier; used for cross-worker locks. One SET NX EX,
+        # so a lock cannot be left without its expiry
+        timeout = self._normalize_timeout(timeout)
+        added = bool(self.shared._write_client.set(
+            f"{self.shared._get_prefix()}{key}",
+            self.shared.serializer.dumps(value),
+            nx=True,
+            ex=timeout or None,
+        ))
+        if added and self._is_local(key):
+            self.local.set(key, value, self._local_timeout(timeout))
+        return added
+
+    def delete(self, key):
+        self.local.delete(key)
+        return self.shared.delete(key)
+
+    def delete_if(self, key, value):
+        """Delete `key` only if it still holds `value` (see redis_delete_if)."""
+        self.local.delete(key)
+        return redis_delete_if(self.shared, key, value)
+
+    def delete_many(self, *keys):
+        for key in keys:
+            self.local.delete(key)
+        return self.shared.delete_many(*keys)
+
+    def clear(self):
+        self.local.clear()
+        return self.shared.clear()
+
+    def inc(self, key, delta=1):
+        self.local.delete(key)
+        return self.shared.inc(key, delta=delta)
+
+    def dec(self, key, delta=1):
+        self.local.delete(key)
+        return self.shared.dec(key, delta=delta)
@@ -0,0 +1,188 @@
+# app/utils/cache_invalidation.py
+"""
+Versioned cache namespaces.
+
+Cached entries embed the current version of every namespace they depend on
+in their key (see ``versioned_key``). When a write touching one of those
+namespaces commits, the namespace version is bumped and every dependent
+entry becomes unreachable at once, so entries can safely live for hours.
+
+Namespaces:
+- ``user:<id>``        data scoped to one user (their task counts, reviews)
+- ``department:<id>``  data scoped to a department (supervisor review queues)
+- ``firm``             firm-wide aggregates (director stats, user lists)
+- ``firm:lookups``     dropdown / form lookups (users, clients, jobs, templates)
+"""
+import time
+from itertools import chain
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from app.models import User, Task, TaskApproval, Client, Service, Job, TaskTemplate
+from app.utils.cache import cache
+
+NAMESPACE_KEY_PREFIX = "ns:"
+FIRM_NAMESPACE = "firm"
+LOOKUPS_NAMESPACE = "firm:lookups"
+
+# session.info key holding namespaces touched by the current transaction
+_PENDING_KEY = "cache_namespaces_pending"
+
+
+def user_namespace(user_id):
+    return f"user:{user_id}"
+
+
+def department_namespace(department_id):
+    return f"department:{department_id}"
+
+
+def _new_version():
+    # Time-based so a namespace key that was evicted never restarts at a
+    # version an older entry may still be stored under.
+    return time.time_ns()
+
+
+def get_namespace_versions(*namespaces):
+    """
+    Return the current version for each namespace, creating missing ones.
+    """
+    keys = [NAMESPACE_KEY_PREFIX + ns for ns in namespaces]
+    values = cache.get_many(*keys) if keys else []
+
+    versions = []
+    for key, value in zip(keys, values):
+        if value is None:
+            value = _new_version()
+            # add() keeps the first writer's version if another worker raced us
+            if not cache.add(key, value, timeout=0):
+                value = cache.get(key) or value
+        versions.append(value)
+    return versions
+
+
+def versioned_key(base_key: str, *namespaces) -> str:
+    """
+    Build a cache key that changes whenever any of `namespaces` is bumped.
+    """
+    versions = get_namespace_versions(*namespaces)
+    return f"{base_key}@" + ".".join(str(v) for v in versions)
+
+
+def bump_namespaces(namespaces):
+    """
+    Invalidate every cache entry built on top of `namespaces`.
+    """
+    namespaces = set(namespaces)
+    if not namespaces:
+        return
+    version = _new_version()
+    cache.set_many({NAMESPACE_KEY_PREFIX + ns: version for ns in namespaces}, timeout=0)
+
+
+def mark_namespaces_dirty(session, *namespaces):
+    """
+    Register namespaces to bump when `session` commits.
+
+    Used by writers that bypass the unit of work (bulk inserts / updates),
+    which the flush hooks below cannot see.
+    """
+    session.info.setdefault(_PENDING_KEY, set()).update(namespaces)
+
+
+# -----------------------------
+# Flush inspection
+# -----------------------------
+def _history_values(obj, attr):
+    """
+    Current value plus any value replaced during this flush.
+    """
+    history = inspect(obj).attrs[attr].history
+    values = set(history.added or ()) | set(history.deleted or ()) | set(history.unchanged or ())
+    return {v for v in values if v is not None}
+
+
+def _department_ids_for_users(session, user_ids):
+    if not user_ids:
+        return set()
+    rows = session.connection().execute(
+        select(User.__table__.c.department_id).where(User.__table__.c.id.in_(user_ids))
+    )
+    return {row.department_id for row in rows if row.department_id is not None}
+
+
+def _task_people(session, task_ids):
+    if not task_ids:
+        return set(), set()
+    tasks = Task.__table__.c
+    rows = session.connection().execute(
+        select(tasks.assigned_to_id, tasks.created_by_id).where(tasks.id.in_(task_ids))
+    )
+    assignees, creators = set(), set()
+    for row in rows:
+        assignees.add(row.assigned_to_id)
+        creators.add(row.created_by_id)
+    return assignees, creators
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_namespaces(session, flush_context):
+    namespaces = set()
+    user_ids = set()
+    creator_ids = set()
+    approval_task_ids = set()
+
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Task):
+            assignees = _history_values(obj, "assigned_to_id")
+            creators = _history_values(obj, "created_by_id")
+            user_ids |= assignees | creators
+            creator_ids |= creators
+            namespaces.add(FIRM_NAMESPACE)
+
+        elif isinstance(obj, TaskApproval):
+            approval_task_ids |= _history_values(obj, "task_id")
+            namespaces.add(FIRM_NAMESPACE)
+
+        elif isinstance(obj, User):
+            if obj.id is not None:
+                user_ids.add(obj.id)
+            for dept_id in _history_values(obj, "department_id"):
+                namespaces.add(department_namespace(dept_id))
+            namespaces.update((FIRM_NAMESPACE, LOOKUPS_NAMESPACE))
+
+        elif isinstance(obj, (Client, Service, Job, TaskTemplate)):
+            namespaces.update((FIRM_NAMESPACE, LOOKUPS_NAMESPACE))
+
+    if approval_task_ids:
+        assignees, creators = _task_people(session, approval_task_ids)
+        user_ids |= assignees | creators
+        creator_ids |= creators
+
+    # Supervisor review queues are keyed by the creator's department
+    for dept_id in _department_ids_for_users(session, creator_ids):
+        namespaces.add(department_namespace(dept_id))
+
+    namespaces.update(user_namespace(uid) for uid in user_ids)
+
+    if namespaces:
+        mark_namespaces_dirty(session, *namespaces)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_on_commit(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending or not has_app_context():
+        return
+    try:
+        bump_namespaces(pending)
+    except Exception as e:
+        # A cache outage must never fail a committed write
+        current_app.logger.error(f"Cache invalidation failed for {sorted(pending)}: {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
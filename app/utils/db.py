@@ -8,3 +8,6 @@ migrate = Migrate()
 def init_db(app):
     db.init_app(app)
     migrate.init_app(app, db)
+
+    # Flush hooks that keep the dashboard counters and task rollups in step with writes
+    from app.utils import firm_counters, task_stats  # noqa: F401
@@ -0,0 +1,330 @@
+# app/utils/email_outbox.py
+"""
+Persistent email outbox and the pooled SMTP sender that drains it.
+
+`enqueue_email` writes a row to `email_outbox`; nothing talks to SMTP on
+the request path. A small pool of sender threads (EMAIL_OUTBOX_WORKERS per
+process, started on first use) claims due rows with
+`SELECT ... FOR UPDATE SKIP LOCKED`, so any number of processes can drain
+the same table without sending a row twice at once. Each claimed batch goes
+out over a single `mail.connect()` connection.
+
+A failed send is retried with exponential backoff
+(EMAIL_OUTBOX_RETRY_BASE_SECONDS * 2**(attempt - 1), capped at
+EMAIL_OUTBOX_RETRY_MAX_SECONDS) until EMAIL_OUTBOX_MAX_ATTEMPTS, after which
+the row is marked FAILED. Rows left in SENDING by a crashed worker are
+reclaimed after EMAIL_OUTBOX_CLAIM_TIMEOUT_SECONDS, so delivery is
+at-least-once.
+
+`flask outbox run` drains the queue in a dedicated process (set
+EMAIL_OUTBOX_WORKERS=0 on the web workers to leave sending to it), and
+`flask outbox status` prints the queue depth.
+"""
+import threading
+from datetime import datetime, timedelta
+
+from flask import current_app
+from flask_mail import Message
+from sqlalchemy import or_, and_, func, event
+from sqlalchemy.orm import Session
+
+from app.models import EmailOutbox, EmailStatusEnum
+from app.utils.db import db
+
+DEFAULT_SETTINGS = {
+    "EMAIL_OUTBOX_WORKERS": 1,
+    "EMAIL_OUTBOX_BATCH_SIZE": 50,
+    "EMAIL_OUTBOX_POLL_SECONDS": 5,
+    "EMAIL_OUTBOX_MAX_ATTEMPTS": 8,
+    "EMAIL_OUTBOX_RETRY_BASE_SECONDS": 30,
+    "EMAIL_OUTBOX_RETRY_MAX_SECONDS": 60 * 60,
+    "EMAIL_OUTBOX_CLAIM_TIMEOUT_SECONDS": 10 * 60,
+}
+
+# Set whenever a row is queued in this process, so idle workers wake at once
+_wakeup = threading.Event()
+# session.info key: rows were queued in the current transaction
+_PENDING_WAKEUP_KEY = "email_outbox_wakeup"
+_workers_lock = threading.Lock()
+_workers = []
+
+
+def _setting(app, name):
+    return app.config.get(name, DEFAULT_SETTINGS[name])
+
+
+# -----------------------------
+# Enqueue
+# -----------------------------
+def enqueue_email(subject, body, recipients, sender=None, commit=True):
+    """
+    Queue one email. With `commit=False` the row joins the caller's
+    transaction and is only sent if that transaction commits.
+    """
+    if isinstance(recipients, str):
+        recipients = [recipients]
+
+    app = current_app._get_current_object()
+    row = EmailOutbox(
+        subject=subject[:255],
+        body=body,
+        recipients=list(recipients),
+        sender=sender or app.config.get("MAIL_DEFAULT_SENDER") or "administrator@3allp.com",
+        status=EmailStatusEnum.PENDING,
+        next_attempt_at=datetime.utcnow(),
+    )
+    db.session.add(row)
+    ensure_workers(app)
+    if commit:
+        db.session.commit()
+        _wakeup.set()
+    else:
+        # Workers would not see the row before the caller commits
+        db.session.info[_PENDING_WAKEUP_KEY] = True
+    return row
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_on_commit(session):
+    if session.info.pop(_PENDING_WAKEUP_KEY, False):
+        _wakeup.set()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop(_PENDING_WAKEUP_KEY, None)
+
+
+# -----------------------------
+# Claim / deliver
+# -----------------------------
+def _retry_delay(app, attempts):
+    base = _setting(app, "EMAIL_OUTBOX_RETRY_BASE_SECONDS")
+    cap = _setting(app, "EMAIL_OUTBOX_RETRY_MAX_SECONDS")
+    return timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), cap))
+
+
+def claim_batch(app, limit=None):
+    """
+    Lock up to `limit` due rows, flip them to SENDING and commit, so the
+    row locks are released before any SMTP traffic. Returns the claimed rows.
+    """
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=_setting(app, "EMAIL_OUTBOX_CLAIM_TIMEOUT_SECONDS"))
+    limit = limit or _setting(app, "EMAIL_OUTBOX_BATCH_SIZE")
+
+    rows = (
+        EmailOutbox.query
+        .filter(or_(
+            and_(EmailOutbox.status == EmailStatusEnum.PENDING, EmailOutbox.next_attempt_at <= now),
+            and_(EmailOutbox.status == EmailStatusEnum.SENDING, EmailOutbox.claimed_at < stale),
+        ))
+        .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    ids = [row.id for row in rows]
+    for row in rows:
+        row.status = EmailStatusEnum.SENDING
+        row.claimed_at = now
+    db.session.commit()
+
+    # Reload the committed (expired) rows in one query rather than one each
+    return EmailOutbox.query.filter(EmailOutbox.id.in_(ids)).order_by(EmailOutbox.id).all() if ids else []
+
+
+def _message(row):
+    msg = Message(row.subject, sender=row.sender, recipients=row.recipients)
+    msg.body = row.body
+    return msg
+
+
+def _record_failure(app, row, error):
+    row.attempts += 1
+    row.last_error = str(error)[:2000]
+    row.claimed_at = None
+    if row.attempts >= _setting(app, "EMAIL_OUTBOX_MAX_ATTEMPTS"):
+        row.status = EmailStatusEnum.FAILED
+        app.logger.error(f"Giving up on email {row.id} '{row.subject}' to {row.recipients}: {error}")
+    else:
+        row.status = EmailStatusEnum.PENDING
+        row.next_attempt_at = datetime.utcnow() + _retry_delay(app, row.attempts)
+        app.logger.warning(f"Email {row.id} failed (attempt {row.attempts}), will retry: {error}")
+
+
+def deliver_batch(app, rows):
+    """
+    Send `rows` over one SMTP connection and record each outcome.
+    Returns the number sent.
+    """
+    from app import mail
+
+    if not rows:
+        return 0
+
+    sent = 0
+    pending = list(rows)
+    connected = False
+    try:
+        with mail.connect() as connection:
+            connected = True
+            while pending:
+                row = pending[0]
+                try:
+                    connection.send(_message(row))
+                except Exception as e:
+                    # A refused recipient only fails this row; a dropped
+                    # connection fails it and ends the batch below
+                    _record_failure(app, row, e)
+                    pending.pop(0)
+                    if not _connection_alive(connection):
+                        break
+                    continue
+                row.status = EmailStatusEnum.SENT
+                row.attempts += 1
+                row.sent_at = datetime.utcnow()
+                row.claimed_at = None
+                row.last_error = None
+                sent += 1
+                pending.pop(0)
+    except Exception as e:
+        if connected:
+            # Closing a dropped connection; unsent rows are requeued below
+            app.logger.warning(f"SMTP connection closed uncleanly: {e}")
+        else:
+            app.logger.error(f"SMTP connection failed for a batch of {len(rows)} emails: {e}")
+            for row in pending:
+                _record_failure(app, row, e)
+            pending = []
+
+    # Rows not attempted because the connection dropped go straight back
+    for row in pending:
+        row.status = EmailStatusEnum.PENDING
+        row.claimed_at = None
+
+    db.session.commit()
+    if sent:
+        app.logger.info(f"Sent {sent} of {len(rows)} queued emails")
+    return sent
+
+
+def _connection_alive(connection):
+    host = getattr(connection, "host", None)
+    if host is None:
+        # Flask-Mail suppresses sending (TESTING / MAIL_SUPPRESS_SEND)
+        return True
+    try:
+        return host.noop()[0] == 250
+    except Exception:
+        return False
+
+
+def drain_once(app):
+    """
+    Claim and send one batch. Returns the number of rows claimed.
+    """
+    rows = claim_batch(app)
+    deliver_batch(app, rows)
+    return len(rows)
+
+
+# -----------------------------
+# Sender pool
+# -----------------------------
+def run_sender(app, stop_event=None):
+    """
+    Drain the outbox until `stop_event` is set, sleeping between empty polls.
+    """
+    poll = _setting(app, "EMAIL_OUTBOX_POLL_SECONDS")
+    while not (stop_event and stop_event.is_set()):
+        claimed = 0
+        with app.app_context():
+            try:
+                claimed = drain_once(app)
+            except Exception as e:
+                db.session.rollback()
+                app.logger.error(f"Email outbox worker error: {e}")
+        if not claimed:
+            _wakeup.wait(poll)
+            _wakeup.clear()
+
+
+def ensure_workers(app):
+    """
+    Start this process's sender threads once (EMAIL_OUTBOX_WORKERS of them).
+    """
+    if _workers:
+        return
+    with _workers_lock:
+        if _workers:
+            return
+        for i in range(_setting(app, "EMAIL_OUTBOX_WORKERS")):
+            thread = threading.Thread(
+                target=run_sender, args=(app,), name=f"email-outbox-{i}", daemon=True
+            )
+            thread.start()
+            _workers.append(thread)
+
+
+def init_email_outbox(app):
+    for name, value in DEFAULT_SETTINGS.items():
+        app.config.setdefault(name, value)
+
+    # Pick up mail queued before this process started (or by a crashed one)
+    @app.before_request
+    def _start_email_outbox_workers():
+        ensure_workers(app)
+
+
+# -----------------------------
+# Queue depth
+# -----------------------------
+def get_queue_depth():
+    """
+    {'pending', 'due', 'sending', 'failed', 'oldest_pending_at'} for monitoring.
+    """
+    counts = dict(
+        db.session.query(EmailOutbox.status, func.count(EmailOutbox.id))
+        .filter(EmailOutbox.status != EmailStatusEnum.SENT)
+        .group_by(EmailOutbox.status)
+        .all()
+    )
+    due = (
+        db.session.query(func.count(EmailOutbox.id))
+        .filter(
+            EmailOutbox.status == EmailStatusEnum.PENDING,
+            EmailOutbox.next_attempt_at <= datetime.utcnow(),
+        )
+        .scalar()
+    )
+    oldest = (
+        db.session.query(func.min(EmailOutbox.created_at))
+        .filter(EmailOutbox.status == EmailStatusEnum.PENDING)
+        .scalar()
+    )
+    return {
+        "pending": counts.get(EmailStatusEnum.PENDING, 0),
+        "due": due,
+        "sending": counts.get(EmailStatusEnum.SENDING, 0),
+        "failed": counts.get(EmailStatusEnum.FAILED, 0),
+        "oldest_pending_at": oldest,
+    }
+
+
+def retry_failed():
+    """
+    Put FAILED rows back in the queue with a fresh set of attempts.
+    Returns how many were requeued.
+    """
+    count = (
+        EmailOutbox.query
+        .filter(EmailOutbox.status == EmailStatusEnum.FAILED)
+        .update({
+            EmailOutbox.status: EmailStatusEnum.PENDING,
+            EmailOutbox.attempts: 0,
+            EmailOutbox.next_attempt_at: datetime.utcnow(),
+        }, synchronize_session=False)
+    )
+    db.session.commit()
+    return count
@@ -0,0 +1,280 @@
+# app/utils/firm_counters.py
+"""
+Firm-wide counters maintained in the writing transaction.
+
+The director / admin dashboards read a handful of totals from the
+`firm_counters` table instead of counting users, services, clients, jobs
+and tasks on every load. Flush hooks turn creates, soft-deletes, restores
+and status changes into `value = value + delta` updates issued on the
+session's own connection, so a counter moves if and only if the write that
+changed it commits.
+
+Counters:
+- ``active_users``         users not soft-deleted
+- ``active_services``      services not soft-deleted
+- ``active_clients``       clients not soft-deleted
+- ``ongoing_engagements``  jobs flagged `is_ongoing` (not deleted, with a task
+                           still in progress or under review)
+- ``actionable_reviews``   tasks not soft-deleted and waiting in a review stage
+
+Writers that bypass the unit of work (bulk inserts / Core updates) must call
+`sync_ongoing_jobs` / `apply_counter_deltas` themselves. Drift from anything
+else is repaired with `flask counters reconcile`.
+"""
+from collections import Counter
+from datetime import datetime
+from itertools import chain
+
+from sqlalchemy import event, inspect, select, update, func, exists, and_, case
+from sqlalchemy.orm import Session
+
+from app.models import User, Service, Client, Job, Task, TaskStatusEnum, FirmCounter
+from app.utils.db import db
+
+ACTIVE_USERS = "active_users"
+ACTIVE_SERVICES = "active_services"
+ACTIVE_CLIENTS = "active_clients"
+ONGOING_ENGAGEMENTS = "ongoing_engagements"
+ACTIONABLE_REVIEWS = "actionable_reviews"
+
+COUNTER_NAMES = (
+    ACTIVE_USERS, ACTIVE_SERVICES, ACTIVE_CLIENTS, ONGOING_ENGAGEMENTS, ACTIONABLE_REVIEWS,
+)
+
+ONGOING_STATUSES = (
+    TaskStatusEnum.ASSIGNED,
+    TaskStatusEnum.IN_PROGRESS,
+    TaskStatusEnum.PAUSED,
+    TaskStatusEnum.REVIEW,
+    TaskStatusEnum.MANAGER_REVIEW,
+    TaskStatusEnum.PARTNER_REVIEW,
+)
+
+REVIEW_STATUSES = (
+    TaskStatusEnum.REVIEW,
+    TaskStatusEnum.MANAGER_REVIEW,
+    TaskStatusEnum.PARTNER_REVIEW,
+)
+
+# session.info key: is_ongoing flags of jobs about to be hard-deleted
+_DELETED_JOBS_KEY = "firm_counters_deleted_jobs"
+
+
+def _not_deleted(values):
+    return values["deleted_at"] is None
+
+
+def _is_actionable_review(values):
+    return values["deleted_at"] is None and values["status"] in REVIEW_STATUSES
+
+
+# model -> (counter, attributes the predicate reads, predicate)
+_ROW_COUNTERS = {
+    User: (ACTIVE_USERS, ("deleted_at",), _not_deleted),
+    Service: (ACTIVE_SERVICES, ("deleted_at",), _not_deleted),
+    Client: (ACTIVE_CLIENTS, ("deleted_at",), _not_deleted),
+    Task: (ACTIONABLE_REVIEWS, ("deleted_at", "status"), _is_actionable_review),
+}
+
+
+# -----------------------------
+# Writes
+# -----------------------------
+def apply_counter_deltas(session, deltas):
+    """
+    Add `deltas` ({counter name: int}) to the counters inside `session`'s transaction.
+    """
+    table = FirmCounter.__table__
+    now = datetime.utcnow()
+    connection = session.connection()
+    # Always in name order, so concurrent writers lock these hot rows in the same order
+    for name, delta in sorted(deltas.items()):
+        if delta:
+            connection.execute(
+                update(table)
+                .where(table.c.name == name)
+                .values(value=table.c.value + delta, updated_at=now)
+            )
+
+
+def _ongoing_expression():
+    jobs, tasks = Job.__table__.c, Task.__table__.c
+    has_ongoing_task = exists().where(
+        tasks.job_id == jobs.id,
+        tasks.deleted_at.is_(None),
+        tasks.status.in_(ONGOING_STATUSES),
+    )
+    return case((and_(jobs.deleted_at.is_(None), has_ongoing_task), True), else_=False)
+
+
+def sync_ongoing_jobs(session, job_ids):
+    """
+    Recompute `Job.is_ongoing` for `job_ids` and return the resulting change
+    in the ongoing-engagements total.
+    """
+    job_ids = {j for j in job_ids if j is not None}
+    if not job_ids:
+        return 0
+
+    jobs = Job.__table__
+    connection = session.connection()
+    rows = connection.execute(
+        select(jobs.c.id, jobs.c.is_ongoing, _ongoing_expression().label("now_ongoing"))
+        .where(jobs.c.id.in_(job_ids))
+    )
+
+    started, stopped = [], []
+    for row in rows:
+        if bool(row.now_ongoing) != bool(row.is_ongoing):
+            (started if row.now_ongoing else stopped).append(row.id)
+
+    if started:
+        connection.execute(update(jobs).where(jobs.c.id.in_(started)).values(is_ongoing=True))
+    if stopped:
+        connection.execute(update(jobs).where(jobs.c.id.in_(stopped)).values(is_ongoing=False))
+    return len(started) - len(stopped)
+
+
+# -----------------------------
+# Flush hooks
+# -----------------------------
+def track_old_values(*attributes):
+    """
+    Load the value an assignment replaces even when the attribute was
+    expired, so its history always carries the old value for the hooks.
+    """
+    for attribute in attributes:
+        event.listen(attribute, "set", _keep_old_value, active_history=True)
+
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    return value
+
+
+track_old_values(*(
+    getattr(model, attr) for model, (_, attrs, _) in _ROW_COUNTERS.items() for attr in attrs
+))
+
+
+def old_and_new_values(obj, attrs):
+    """
+    Attribute values before and after this flush, or None if unknown.
+
+    Columns an INSERT left unset are absent from the instance and count as
+    None; unloaded columns of a stored row did not change in this flush and
+    are loaded. Only hard-deleted rows can be unknown (the row is gone).
+    """
+    state = inspect(obj)
+    session = state.session
+    inserted = session is not None and obj in session.new
+    deleted = session is not None and obj in session.deleted
+    old, new = {}, {}
+    for attr in attrs:
+        if attr in state.dict:
+            new[attr] = state.dict[attr]
+        elif inserted:
+            new[attr] = None
+        elif deleted:
+            return None
+        else:
+            new[attr] = getattr(obj, attr)
+        history = state.attrs[attr].history
+        old[attr] = history.deleted[0] if history.deleted else new[attr]
+    return old, new
+
+
+def _job_ids(obj):
+    history = inspect(obj).attrs["job_id"].history
+    return set(chain(history.added or (), history.deleted or (), history.unchanged or ()))
+
+
+@event.listens_for(Session, "before_flush")
+def _remember_deleted_jobs(session, flush_context, instances):
+    # Hard-deleted jobs are gone by after_flush, so read their flag now
+    job_ids = [obj.id for obj in session.deleted if isinstance(obj, Job) and obj.id is not None]
+    if not job_ids:
+        return
+    jobs = Job.__table__
+    rows = session.connection().execute(
+        select(jobs.c.id).where(jobs.c.id.in_(job_ids), jobs.c.is_ongoing.is_(True))
+    )
+    session.info.setdefault(_DELETED_JOBS_KEY, set()).update(row.id for row in rows)
+
+
+@event.listens_for(Session, "after_flush")
+def _update_counters(session, flush_context):
+    deltas = Counter()
+    job_ids = set()
+
+    for obj in chain(session.new, session.dirty, session.deleted):
+        spec = _ROW_COUNTERS.get(type(obj))
+        if spec:
+            counter, attrs, predicate = spec
+            values = old_and_new_values(obj, attrs)
+            if values:
+                old, new = values
+                was = obj not in session.new and predicate(old)
+                now = obj not in session.deleted and predicate(new)
+                deltas[counter] += int(now) - int(was)
+
+        if isinstance(obj, Task):
+            job_ids |= _job_ids(obj)
+        elif isinstance(obj, Job) and obj not in session.deleted:
+            job_ids.add(obj.id)
+
+    deleted_ongoing = session.info.pop(_DELETED_JOBS_KEY, set())
+    deltas[ONGOING_ENGAGEMENTS] -= len(deleted_ongoing)
+    deltas[ONGOING_ENGAGEMENTS] += sync_ongoing_jobs(session, job_ids - deleted_ongoing)
+
+    apply_counter_deltas(session, deltas)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop(_DELETED_JOBS_KEY, None)
+
+
+# -----------------------------
+# Reads / reconciliation
+# -----------------------------
+def _count_from_scratch(session):
+    """Every counter recounted from the source tables. Writes nothing."""
+    ongoing_jobs = select(func.count()).select_from(Job.__table__).where(_ongoing_expression())
+
+    # Separate scalar counts: never a join across these tables
+    return {
+        ACTIVE_USERS: session.query(func.count(User.id)).filter(User.deleted_at.is_(None)).scalar(),
+        ACTIVE_SERVICES: session.query(func.count(Service.id)).filter(Service.deleted_at.is_(None)).scalar(),
+        ACTIVE_CLIENTS: session.query(func.count(Client.id)).filter(Client.deleted_at.is_(None)).scalar(),
+        ONGOING_ENGAGEMENTS: session.execute(ongoing_jobs).scalar(),
+        ACTIONABLE_REVIEWS: session.query(func.count(Task.id)).filter(
+            Task.deleted_at.is_(None),
+            Task.status.in_(REVIEW_STATUSES),
+        ).scalar(),
+    }
+
+
+def reconcile_firm_counters():
+    """
+    Recompute every counter (and every job's `is_ongoing` flag) from the
+    source tables and commit. Returns {counter name: value}.
+    """
+    db.session.execute(update(Job.__table__).values(is_ongoing=_ongoing_expression()))
+    values = _count_from_scratch(db.session)
+    now = datetime.utcnow()
+    for name, value in values.items():
+        db.session.merge(FirmCounter(name=name, value=value, updated_at=now))
+    db.session.commit()
+    return values
+
+
+def get_firm_counters():
+    """
+    Return {counter name: value}. Until the table is seeded (by `flask
+    counters reconcile` or the deploy step), the missing values are counted
+    live and nothing is written.
+    """
+    values = dict(db.session.query(FirmCounter.name, FirmCounter.value).all())
+    if all(name in values for name in COUNTER_NAMES):
+        return values
+    return _count_from_scratch(db.session)
@@ -50,6 +50,39 @@ def get_next_reviewer_info(task):
     # For any other status, return nothing as it's not "action required"
     return ""
 
+def parse_local_deadline(deadline_str, tz_name='Africa/Nairobi'):
+    """
+    A `datetime-local` form value ('%Y-%m-%dT%H:%M' in `tz_name`) as an
+    aware UTC datetime, or None when blank.
+    """
+    if not deadline_str:
+        return None
+    local_tz = pytz.timezone(tz_name)
+    naive = datetime.strptime(deadline_str, '%Y-%m-%dT%H:%M')
+    local_dt = local_tz.localize(naive)
+    return local_dt.astimezone(pytz.utc)
+
+def estimated_minutes(estimated_value, estimated_unit='minutes'):
+    val = int(estimated_value)
+    if estimated_unit == 'days':
+        return val * 24 * 60
+    if estimated_unit == 'hours':
+        return val * 60
+    return val
+
+def priority_from_value(priority_str):
+    # Look up PriorityEnum member by its string value, not its name
+    for p_enum in PriorityEnum:
+        if p_enum.value == priority_str:
+            return p_enum
+    return PriorityEnum.MEDIUM # Default in case the string doesn't match any enum value
+
+def recurrence_from_name(recurrence_str):
+    try:
+        return RecurrenceEnum[(recurrence_str or 'NONE').upper()]
+    except KeyError:
+        return RecurrenceEnum.NONE  # fallback to NONE if invalid
+
 def make_task_from_data(
     title: str,
     description: str,
@@ -66,30 +99,12 @@ def make_task_from_data(
     recurrence_str: str = 'NONE'
 ) -> Task:
     # 1) Deadline conversion
-    utc_deadline = None
-    if deadline_str:
-        local_tz = pytz.timezone(tz_name)
-        naive = datetime.strptime(deadline_str, '%Y-%m-%dT%H:%M')
-        local_dt = local_tz.localize(naive)
-        utc_deadline = local_dt.astimezone(pytz.utc)
+    utc_deadline = parse_local_deadline(deadline_str, tz_name)
 
     # 2) Estimated time
-    val = int(estimated_value)
-    if estimated_unit == 'days':
-        minutes = val * 24 * 60
-    elif estimated_unit == 'hours':
-        minutes = val * 60
-    else:
-        minutes = val
+    minutes = estimated_minutes(estimated_value, estimated_unit)
 
-    # --- THIS IS THE CRITICAL FIX FOR PRIORITY ---
-    # Look up PriorityEnum member by its string value, not its name
-    priority_enum_member = PriorityEnum.MEDIUM # Default in case the string doesn't match any enum value
-    for p_enum in PriorityEnum:
-        if p_enum.value == priority_str:
-            priority_enum_member = p_enum
-            break
-    # --- END CRITICAL FIX ---
+    priority_enum_member = priority_from_value(priority_str)
 
     # Also ensure TaskStatusEnum is handled similarly if it's coming from a string
     status_str = 'Assigned' # Assuming a default or passed in some other way
@@ -99,13 +114,7 @@ def make_task_from_data(
             status_enum_member = s_enum
             break
 
-        # --- Recurrence handling ---
-    recurrence_enum_member = RecurrenceEnum.NONE
-    try:
-        recurrence_enum_member = RecurrenceEnum[recurrence_str.upper()]
-    except KeyError:
-        pass  # fallback to NONE if invalid
-    
+    recurrence_enum_member = recurrence_from_name(recurrence_str)
 
     task = Task(
         title=title,
@@ -130,24 +139,31 @@ def can_assign_task(assigned_to_id):
     if not assignee:
         return False  # Target user doesn't exist
 
+    return role_can_assign(current_user.role, assignee.role)
+
+def role_can_assign(assigner_role, assignee_role):
+    """
+    Whether a user with `assigner_role` may assign tasks to one with
+    `assignee_role`. Shared by `can_assign_task` and the bulk checks.
+    """
     # No one can assign tasks to a Director
-    if assignee.role == 'DIRECTOR':
+    if assignee_role == 'DIRECTOR':
         return False
 
     # Interns can assign tasks only to other Interns
-    if current_user.role == 'INTERN':
-        return assignee.role == ['INTERN', 'ADMIN']
+    if assigner_role == 'INTERN':
+        return assignee_role == ['INTERN', 'ADMIN']
 
     # Officers can only assign to Interns
-    if current_user.role == 'OFFICER':
-        return assignee.role in ['INTERN', 'OFFICER', 'SUPERVISOR', 'ADMIN']
+    if assigner_role == 'OFFICER':
+        return assignee_role in ['INTERN', 'OFFICER', 'SUPERVISOR', 'ADMIN']
 
     # Supervisors can assign to Interns and Officers
-    if current_user.role == 'SUPERVISOR':
-        return assignee.role in ['INTERN', 'OFFICER', 'SUPERVISOR', 'ADMIN']
+    if assigner_role == 'SUPERVISOR':
+        return assignee_role in ['INTERN', 'OFFICER', 'SUPERVISOR', 'ADMIN']
 
     # Directors can assign to anyone except other Directors (already checked above)
-    if current_user.role in ('ADMIN', 'DIRECTOR'):
+    if assigner_role in ('ADMIN', 'DIRECTOR'):
         return True
 
     return False  # fallback
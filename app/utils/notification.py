@@ -1,28 +1,29 @@
 from app.models import User, Task, DecisionEnum, RoleEnum
-from app import mail  # Remove celery import
-from flask_mail import Message
 from flask import current_app
 from app.models import Job, Department  # Added Department import
 from app.utils.db import db
+from app.utils.email_outbox import enqueue_email
+from concurrent.futures import ThreadPoolExecutor
 import asyncio
-import threading  # ADD THIS IMPORT
 
-# Helper function to run async functions in the background
+# Notification builders only run a few queries and queue rows in the email
+# outbox, so a small shared pool is enough; SMTP delivery happens in the
+# outbox sender pool (app.utils.email_outbox).
+_builder_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="email-builder")
+
+
 def run_async_in_background(async_func, *args):
     # Capture the real app object
     app = current_app._get_current_object()
 
-    def run_in_thread():
-        # Push the original app context
+    def run_in_pool():
         with app.app_context():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(async_func(*args))
-            loop.close()
+            try:
+                asyncio.run(async_func(*args))
+            except Exception as e:
+                app.logger.error(f"Error building email in {async_func.__name__}: {e}")
 
-    thread = threading.Thread(target=run_in_thread)
-    thread.daemon = True
-    thread.start()
+    _builder_pool.submit(run_in_pool)
 
 
 async def _send_email_message_async(subject, body, recipients):
@@ -33,26 +34,19 @@ async def _send_email_message_async(subject, body, recipients):
     if isinstance(recipients, str):
         recipients = [recipients]
 
-    msg = Message(subject, sender="administrator@3allp.com", recipients=recipients)
-    msg.body = body
-
     try:
-        # DO NOT use run_in_executor for Flask-Mail
-        mail.send(msg)
-        current_app.logger.info(f"Email sent successfully: '{subject}' to {recipients}")
+        enqueue_email(subject, body, recipients)
+        current_app.logger.info(f"Email queued: '{subject}' to {recipients}")
     except Exception as e:
-        current_app.logger.error(f"FATAL ERROR SENDING EMAIL: '{subject}' to {recipients}. Error: {e}")
-
-# --- Async Email Functions Start Here ---
-async def send_task_notification_async(task_id):
-    """Sends an email notification to the assigned user."""
-    task = Task.query.get(task_id)
-    if not task:
-        current_app.logger.warning(f"Task with ID {task_id} not found for notification.")
-        return
-
+        db.session.rollback()
+        current_app.logger.error(f"FATAL ERROR QUEUEING EMAIL: '{subject}' to {recipients}. Error: {e}")
+
+# --- Task emails ---
+# Queued in the calling route's transaction (commit=False), so the email
+# only goes out if the task is actually saved.
+def queue_task_assignment_email(task):
+    """Queue the new-task email to the assignee. Does not commit."""
     recipient = User.query.get(task.assigned_to_id)
-    
     if not recipient or not recipient.email:
         current_app.logger.warning(f"No email found for assigned user ID {task.assigned_to_id}.")
         return
@@ -70,65 +64,9 @@ async def send_task_notification_async(task_id):
     Best regards,
     3ALLP Admin Team
     """
-    await _send_email_message_async(subject, body, [recipient.email])
-
-async def send_task_submitted_notification_async(task_id):
-    """Notifies the task creator that the task has been submitted for review."""
-    task = Task.query.get(task_id)
-    if not task:
-        current_app.logger.warning(f"Task with ID {task_id} not found for submission notification.")
-        return
-        
-    if task.assigned_to_id == task.created_by_id:
-        current_app.logger.info("Creator and assignee are the same. No submission notification sent.")
-        return
-
-    creator = User.query.get(task.created_by_id)
-    assignee = User.query.get(task.assigned_to_id)
-
-    if not creator or not creator.email:
-        current_app.logger.warning("No email found for task creator.")
-        return
-
-    subject = f"Task Submitted for Review: {task.title}"
-    body = f"""
-    Dear {creator.first_name},
-    The following task assigned to {assignee.first_name} has been submitted for review:
-    Title: {task.title}
-    Description: {task.description}
-    Please log in to the system to review and take the appropriate action.
-    Regards,
-    3ALLP System
-    """
-    await _send_email_message_async(subject, body, [creator.email])
-
-async def send_task_review_decision_notification_async(task_id, decision_value, remarks=None):
-    """Notifies the assignee about the review decision on their task."""
-    task = Task.query.get(task_id)
-    if not task:
-        current_app.logger.warning(f"Task with ID {task_id} not found for review decision.")
-        return
-        
-    assignee = User.query.get(task.assigned_to_id)
-
-    if not assignee or not assignee.email:
-        current_app.logger.warning("No email found for assignee.")
-        return
-
-    decision_text = "approved ✅" if decision_value == DecisionEnum.APPROVED.value else "sent back for redo 🔁"
-    subject = f"Task Review Decision: {task.title} ({decision_text})"
-    body = f"""
-    Dear {assignee.first_name},
-    Your task has been reviewed. Below are the details:
-    Title: {task.title}
-    Decision: {decision_text}
-    Remarks: {remarks or 'No additional remarks provided.'}
-    Please log in to the system to follow up.
-    Regards,
-    3ALLP System
-    """
-    await _send_email_message_async(subject, body, [assignee.email])
+    enqueue_email(subject, body, [recipient.email], commit=False)
 
+# --- Async Email Functions Start Here ---
 async def send_department_reviewer_notification_async(appointer_id, appointee_id, department_id):
     """Sends notification to the new reviewer and all directors."""
     appointer = User.query.get(appointer_id)
@@ -207,6 +145,41 @@ async def send_new_engagement_notifications_async(job_id):
         """
         await _send_email_message_async(director_subject, director_body, director_emails)
 
+async def send_engagement_rollout_notifications_async(service_name, created, assignments, actor_id):
+    """
+    Coalesced emails for a batch rollout (see engagement_builder.roll_out_engagements):
+    one message per assignee with their engagement count, and one summary
+    to the directors, instead of one pair per engagement.
+    """
+    actor = User.query.get(actor_id)
+    assignments = {int(user_id): count for user_id, count in assignments.items()}
+    users = User.query.filter(User.id.in_(list(assignments))).all() if assignments else []
+
+    for user in users:
+        if not user.email:
+            continue
+        count = assignments[user.id]
+        subject = f"New Engagements: {count} {service_name} engagement(s) assigned to you"
+        body = f"""
+        Hello {user.first_name},
+        {count} new "{service_name}" engagement(s) have been created, and you have been assigned one or more tasks under each.
+        Please log in to the system to view your new tasks and their deadlines.
+        Regards,
+        3ALLP System
+        """
+        await _send_email_message_async(subject, body, [user.email])
+
+    director_emails = 'partners@3allp.com'
+    director_subject = f"Engagement Rollout: {service_name}"
+    director_body = f"""
+    Hello Directors,
+    {actor.full_name if actor else "A user"} created {created} "{service_name}" engagement(s), assigned to {len(assignments)} staff member(s).
+    You can view the engagements and their associated tasks in the system.
+    Regards,
+    3ALLP System
+    """
+    await _send_email_message_async(director_subject, director_body, director_emails)
+
 async def send_review_partner_set_notification_async(job_id):
     """
     Sends a notification to the newly assigned review partner for an engagement.
@@ -266,19 +239,3 @@ async def send_welcome_and_password_notification_async(user_id, raw_password):
     3ALLP System
     """
     await _send_email_message_async(subject, body, [user.email])
-
-
-    """Runs an async function in the background without waiting for completion."""
-    def run_in_thread():
-        try:
-            # Create a new event loop for this thread
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(async_func(*args))
-            loop.close()
-        except Exception as e:
-            print(f"Error in async background task: {e}")
-    
-    thread = threading.Thread(target=run_in_thread)
-    thread.daemon = True  # This allows the thread to exit when the main program exits
-    thread.start()
\ No newline at end of file
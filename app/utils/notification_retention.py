@@ -0,0 +1,137 @@
+# app/utils/notification_retention.py
+"""
+Retention for the `notifications` table.
+
+Read notifications older than NOTIFICATION_RETENTION_DAYS are either copied
+into `notifications_archive` and removed (mode "archive"), or just removed
+(mode "delete"). Unread rows are never touched, so the per-user unread
+counters stay correct.
+
+Work is done in chunks of NOTIFICATION_RETENTION_CHUNK_SIZE rows, each in
+its own short transaction, walking the primary key upwards from the
+oldest row to the newest id past the cutoff, so no run holds locks on
+more than one chunk at a time and every chunk starts where the last ended.
+
+Run it on a schedule with `flask notifications purge`.
+"""
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, insert, delete, func, literal
+
+from app.models import Notification, NotificationArchive
+from app.utils.db import db
+
+DEFAULT_SETTINGS = {
+    "NOTIFICATION_RETENTION_DAYS": 90,
+    "NOTIFICATION_RETENTION_MODE": "archive",
+    "NOTIFICATION_RETENTION_CHUNK_SIZE": 1000,
+}
+MODES = ("archive", "delete")
+
+# Columns copied into notifications_archive, in order
+_ARCHIVED_COLUMNS = ("id", "user_id", "actor_id", "message", "url", "type", "created_at")
+
+
+def _setting(app, name):
+    return app.config.get(name, DEFAULT_SETTINGS[name])
+
+
+def _expired(cutoff):
+    return (
+        db.session.query(Notification.id)
+        .filter(Notification.created_at < cutoff)
+        .filter_by(read=True)
+    )
+
+
+# -----------------------------
+# Chunks
+# -----------------------------
+def _next_chunk(cutoff, after_id, max_id, limit):
+    rows = (
+        _expired(cutoff)
+        .filter(Notification.id > after_id, Notification.id <= max_id)
+        .order_by(Notification.id)
+        .limit(limit)
+        .all()
+    )
+    return [row.id for row in rows]
+
+
+def _move_chunk(ids, mode):
+    """
+    Archive (or just delete) `ids` and commit. Returns the rows removed.
+    """
+    table = Notification.__table__
+    if mode == "archive":
+        copied = select(*(table.c[name] for name in _ARCHIVED_COLUMNS), literal(datetime.utcnow()))
+        db.session.execute(
+            insert(NotificationArchive.__table__).from_select(
+                _ARCHIVED_COLUMNS + ("archived_at",), copied.where(table.c.id.in_(ids))
+            )
+        )
+    removed = db.session.execute(delete(table).where(table.c.id.in_(ids))).rowcount
+    db.session.commit()
+    return removed
+
+
+# -----------------------------
+# Runs
+# -----------------------------
+def count_expired_notifications(app, days=None):
+    """
+    How many rows a purge with `days` would remove right now.
+    """
+    days = days if days is not None else _setting(app, "NOTIFICATION_RETENTION_DAYS")
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    return _expired(cutoff).count()
+
+
+def purge_notifications(app, days=None, mode=None, chunk_size=None, max_chunks=None,
+                        pause=0, on_chunk=None):
+    """
+    Archive or delete read notifications older than `days`, one chunk per
+    transaction, sleeping `pause` seconds between chunks. Stops early after
+    `max_chunks`. `on_chunk(chunk_number, rows)` is called after each
+    commit. Returns {'mode', 'cutoff', 'chunks', 'moved'}.
+    """
+    days = days if days is not None else _setting(app, "NOTIFICATION_RETENTION_DAYS")
+    mode = mode or _setting(app, "NOTIFICATION_RETENTION_MODE")
+    chunk_size = chunk_size or _setting(app, "NOTIFICATION_RETENTION_CHUNK_SIZE")
+    if mode not in MODES:
+        raise ValueError(f"Unknown notification retention mode: {mode}")
+
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    report = {"mode": mode, "cutoff": cutoff, "chunks": 0, "moved": 0}
+
+    # Newest id old enough to expire, found on idx_notifications_created_at;
+    # rows past it are never looked at
+    max_id = (
+        db.session.query(func.max(Notification.id))
+        .filter(Notification.created_at < cutoff)
+        .scalar()
+    )
+    after_id = 0
+    while max_id is not None:
+        ids = _next_chunk(cutoff, after_id, max_id, chunk_size)
+        if not ids:
+            break
+
+        moved = _move_chunk(ids, mode)
+        after_id = ids[-1]
+        report["chunks"] += 1
+        report["moved"] += moved
+        if on_chunk:
+            on_chunk(report["chunks"], moved)
+
+        if len(ids) < chunk_size or (max_chunks and report["chunks"] >= max_chunks):
+            break
+        if pause:
+            time.sleep(pause)
+
+    app.logger.info(
+        f"Notification retention ({mode}): {report['moved']} rows older than "
+        f"{cutoff:%Y-%m-%d %H:%M} in {report['chunks']} chunks"
+    )
+    return report
@@ -2,19 +2,40 @@ from flask_socketio import SocketIO, emit, join_room
 from flask import current_app, session
 import os
 from flask_login import current_user
-from app.models import User, Task, DecisionEnum, Notification
+from app.models import (
+    User, Task, DecisionEnum, Notification, BroadcastNotification, BroadcastNotificationRead,
+    UserNotificationCounter
+)
 from app.utils.db import db
+from app.utils.pagination import keyset_paginate
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import event, insert, update, delete, exists, case, func, select
+from sqlalchemy.orm import Session
 import logging
 
 logger = logging.getLogger(__name__)
 
-socketio = SocketIO(cors_allowed_origins="*",
-                    logger=False, 
-                    async_mode="threading",
-                    engineio_logger=False)  
+# Configured in init_notifications from SOCKETIO_ASYNC_MODE / SOCKETIO_MESSAGE_QUEUE
+socketio = SocketIO()
 
 def init_notifications(app):
-    socketio.init_app(app)
+    """
+    With SOCKETIO_MESSAGE_QUEUE set (e.g. a Redis URL) every emit is
+    published through the queue, so clients connected to any worker process
+    receive it, and processes without websockets (CLI, email workers) can
+    emit too. SOCKETIO_ASYNC_MODE picks the worker model: "threading" for
+    local development, "gevent" for cooperative production workers.
+    """
+    socketio.init_app(
+        app,
+        async_mode=app.config.get("SOCKETIO_ASYNC_MODE", "threading"),
+        message_queue=app.config.get("SOCKETIO_MESSAGE_QUEUE"),
+        channel=app.config.get("SOCKETIO_CHANNEL", "flask-socketio"),
+        cors_allowed_origins="*",
+        logger=False,
+        engineio_logger=False,
+    )
 
 @socketio.on('connect')
 def handle_connect():
@@ -22,24 +43,344 @@ def handle_connect():
         emit('error', {'reason': 'unauthorized'})
         return False
 
-    user_id = current_user.get_id()
-    join_room(f"user_{user_id}")
+    # Group rooms are derived at connect time; role or department changes
+    # take effect on the next connection
+    for room in rooms_for_user(current_user):
+        join_room(room)
     emit('connected', {'status': 'connected'})
 
 
-def create_and_emit_notification(user_id, message, url=None, actor_id=None):
-    notification = Notification(
-        user_id=user_id, 
-        message=message, 
-        url=url, 
-        actor_id=actor_id
+# -----------------------------
+# Rooms
+# -----------------------------
+def user_room(user_id):
+    return f"user_{user_id}"
+
+
+def role_room(role):
+    return f"role_{role}"
+
+
+def department_room(department_id):
+    return f"department_{department_id}"
+
+
+def reviewers_room(department_id):
+    return f"reviewers_{department_id}"
+
+
+def rooms_for_user(user):
+    """
+    Every room `user` belongs to: their own, one per role (primary and
+    secondary), their department and each department they review.
+    """
+    rooms = [user_room(user.id)]
+    rooms.extend(role_room(role) for role in user.get_all_roles())
+    if user.department_id:
+        rooms.append(department_room(user.department_id))
+    rooms.extend(reviewers_room(d.id) for d in user.reviewing_departments)
+    return rooms
+
+
+# session.info key: {room: [payload, ...]} waiting for the transaction to commit
+_PENDING_EMITS_KEY = "pending_notification_emits"
+
+
+def notify_users(user_ids, message, url=None, actor_id=None, type='info'):
+    """
+    Create one notification per recipient with a single multi-row INSERT in
+    the caller's transaction. Socket.IO emits are queued on the session and
+    sent after it commits (one event per room), and dropped on rollback.
+    Does not commit.
+    """
+    user_ids = list(dict.fromkeys(uid for uid in user_ids if uid is not None))
+    if not user_ids:
+        return 0
+
+    created_at = datetime.utcnow()
+    db.session.execute(insert(Notification.__table__).values([
+        {
+            'user_id': user_id,
+            'actor_id': actor_id,
+            'message': message,
+            'url': url,
+            'read': False,
+            'created_at': created_at,
+            'type': type,
+        }
+        for user_id in user_ids
+    ]))
+
+    payload = {
+        'message': message,
+        'url': url,
+        'created_at': created_at.isoformat() + 'Z',
+        'type': type,
+    }
+    adjust_unread_counts({user_id: 1 for user_id in user_ids})
+
+    pending = db.session.info.setdefault(_PENDING_EMITS_KEY, {})
+    for user_id in user_ids:
+        pending.setdefault(user_room(user_id), []).append(payload)
+    return len(user_ids)
+
+
+def broadcast_notification(room, message, url=None, actor_id=None, type='info'):
+    """
+    Record one shared notification for everyone in `room` (see role_room,
+    department_room, reviewers_room) and emit it once to that room after
+    the caller's transaction commits. Read state is tracked per user in
+    broadcast_notification_reads. Does not commit.
+    """
+    notification = BroadcastNotification(
+        audience=room,
+        actor_id=actor_id,
+        message=message,
+        url=url,
+        type=type,
+        created_at=datetime.utcnow(),
     )
     db.session.add(notification)
-    db.session.commit()
 
-    # Emit via socket
-    socketio.emit('new_notification', {
+    pending = db.session.info.setdefault(_PENDING_EMITS_KEY, {})
+    pending.setdefault(room, []).append({
         'message': message,
         'url': url,
-        'created_at': notification.created_at.isoformat() + 'Z'
-    }, room=f"user_{user_id}")
+        'created_at': notification.created_at.isoformat() + 'Z',
+        'type': type,
+        'broadcast': True,
+    })
+    return notification
+
+
+def unread_broadcasts_query(user):
+    """
+    Broadcasts addressed to any of `user`'s rooms since their account was
+    created that they have not read.
+    """
+    read = exists().where(
+        BroadcastNotificationRead.broadcast_id == BroadcastNotification.id,
+        BroadcastNotificationRead.user_id == user.id,
+    )
+    query = BroadcastNotification.query.filter(
+        BroadcastNotification.audience.in_(rooms_for_user(user)),
+        ~read,
+    )
+    if user.created_at is not None:
+        # A range on idx_broadcast_notifications_audience_created, so a new
+        # user does not inherit a room's whole history as unread
+        query = query.filter(BroadcastNotification.created_at >= user.created_at)
+    return query
+
+
+def mark_broadcasts_read(user, broadcast_ids=None):
+    """
+    Mark `broadcast_ids` (or every unread broadcast) read for `user`.
+    Returns how many were marked. Does not commit.
+    """
+    query = unread_broadcasts_query(user)
+    if broadcast_ids is not None:
+        query = query.filter(BroadcastNotification.id.in_(broadcast_ids))
+    ids = [row.id for row in query.with_entities(BroadcastNotification.id)]
+    if ids:
+        now = datetime.utcnow()
+        # IGNORE: a concurrent request may have marked some of them already
+        stmt = insert(BroadcastNotificationRead.__table__).prefix_with("IGNORE", dialect="mysql")
+        db.session.execute(stmt.values([
+            {'broadcast_id': broadcast_id, 'user_id': user.id, 'read_at': now}
+            for broadcast_id in ids
+        ]))
+    return len(ids)
+
+
+# -----------------------------
+# Unread counters
+# -----------------------------
+# Unread broadcasts counted towards the badge at most; the badge shows this
+# many and the feed lists the rest
+BROADCAST_UNREAD_CAP = 99
+
+
+def _count_unread(user_ids):
+    """{user_id: unread notifications} straight from `notifications`."""
+    counts = dict(
+        db.session.query(Notification.user_id, func.count(Notification.id))
+        .filter(Notification.user_id.in_(user_ids), Notification.read.is_(False))
+        .group_by(Notification.user_id)
+    )
+    return {user_id: counts.get(user_id, 0) for user_id in user_ids}
+
+
+def _insert_ignore(table):
+    # IGNORE: a concurrent writer may have created the row already
+    return insert(table).prefix_with("IGNORE", dialect="mysql").prefix_with("OR IGNORE", dialect="sqlite")
+
+
+def adjust_unread_counts(deltas):
+    """
+    Apply {user_id: +/-n} to user_notification_counters in the caller's
+    transaction, never going below zero. A user without a counter row yet
+    gets one seeded from `notifications` (which already holds the caller's
+    new rows). Does not commit.
+    """
+    table = UserNotificationCounter.__table__
+    connection = db.session.connection()
+    added = {user_id: delta for user_id, delta in deltas.items() if delta > 0}
+    removed = {user_id: -delta for user_id, delta in deltas.items() if delta < 0}
+
+    if added:
+        existing = {
+            user_id for (user_id,) in
+            connection.execute(select(table.c.user_id).where(table.c.user_id.in_(added)))
+        }
+        seeds = _count_unread([user_id for user_id in added if user_id not in existing])
+
+        by_delta = defaultdict(list)
+        for user_id, delta in added.items():
+            by_delta[delta].append(user_id)
+
+        if connection.dialect.name == "mysql":
+            from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+            # Rows created since the SELECT above already count these notifications
+            # apart from this delta, so a duplicate key adds just the delta
+            for delta, user_ids in by_delta.items():
+                stmt = mysql_insert(table).values([
+                    {"user_id": user_id, "unread_count": seeds.get(user_id, delta)} for user_id in user_ids
+                ])
+                connection.execute(stmt.on_duplicate_key_update(unread_count=table.c.unread_count + delta))
+        else:
+            for delta, user_ids in by_delta.items():
+                connection.execute(
+                    update(table).where(table.c.user_id.in_([uid for uid in user_ids if uid in existing]))
+                    .values(unread_count=table.c.unread_count + delta)
+                )
+            if seeds:
+                connection.execute(insert(table), [
+                    {"user_id": user_id, "unread_count": count} for user_id, count in seeds.items()
+                ])
+
+    for user_id, delta in removed.items():
+        connection.execute(
+            update(table).where(table.c.user_id == user_id).values(
+                unread_count=case((table.c.unread_count > delta, table.c.unread_count - delta), else_=0)
+            )
+        )
+
+
+def mark_user_notifications_read(user_id, notification_ids=None):
+    """
+    Mark `user_id`'s unread notifications (or only `notification_ids`) read
+    and lower their counter by the rows actually changed. Does not commit.
+    """
+    query = Notification.query.filter_by(user_id=user_id, read=False)
+    if notification_ids is not None:
+        query = query.filter(Notification.id.in_(notification_ids))
+    changed = query.update({'read': True}, synchronize_session=False)
+    adjust_unread_counts({user_id: -changed})
+    return changed
+
+
+def get_unread_count(user):
+    """
+    Badge count: the stored counter (one primary-key read) plus the user's
+    unread broadcasts, capped at BROADCAST_UNREAD_CAP. A user without a
+    counter row yet has it seeded here, which commits.
+    """
+    direct = (
+        db.session.query(UserNotificationCounter.unread_count)
+        .filter(UserNotificationCounter.user_id == user.id)
+        .scalar()
+    )
+    if direct is None:
+        direct = _count_unread([user.id])[user.id]
+        db.session.execute(
+            _insert_ignore(UserNotificationCounter.__table__).values(user_id=user.id, unread_count=direct)
+        )
+        db.session.commit()
+
+    unread_broadcasts = (
+        unread_broadcasts_query(user)
+        .with_entities(BroadcastNotification.id)
+        .limit(BROADCAST_UNREAD_CAP)
+        .subquery()
+    )
+    return direct + db.session.query(func.count()).select_from(unread_broadcasts).scalar()
+
+
+def rebuild_unread_counts(user_ids=None):
+    """
+    Recompute user_notification_counters from `notifications` (for
+    `user_ids`, or everyone) and commit. Returns the number of rows written.
+    """
+    query = (
+        db.session.query(Notification.user_id, func.count(Notification.id))
+        .filter_by(read=False)
+        .group_by(Notification.user_id)
+    )
+    table = UserNotificationCounter.__table__
+    stmt = delete(table)
+    if user_ids:
+        query = query.filter(Notification.user_id.in_(user_ids))
+        stmt = stmt.where(table.c.user_id.in_(user_ids))
+
+    counts = query.all()
+    db.session.execute(stmt)
+    if counts:
+        db.session.execute(insert(table), [
+            {"user_id": user_id, "unread_count": count} for user_id, count in counts
+        ])
+    db.session.commit()
+    return len(counts)
+
+
+# -----------------------------
+# Feed
+# -----------------------------
+FEED_PAGE_SIZE = 15
+# Upper bound on a client-requested page size
+FEED_MAX_PAGE_SIZE = 50
+
+
+def get_notification_page(user_id, cursor=None, per_page=FEED_PAGE_SIZE, unread_only=False):
+    """
+    One keyset page of a user's notifications, newest first, on
+    (created_at, id). The unread feed walks
+    idx_notifications_user_read_created, the full feed
+    idx_notifications_user_created. `per_page` is capped at
+    FEED_MAX_PAGE_SIZE.
+    """
+    per_page = max(1, min(per_page or FEED_PAGE_SIZE, FEED_MAX_PAGE_SIZE))
+    query = Notification.query.filter_by(user_id=user_id)
+    if unread_only:
+        query = query.filter_by(read=False)
+    return keyset_paginate(
+        query, Notification.created_at, Notification.id,
+        cursor=cursor, per_page=per_page, descending=True,
+    )
+
+
+def create_and_emit_notification(user_id, message, url=None, actor_id=None):
+    """Notify a single user and commit straight away."""
+    notify_users([user_id], message, url=url, actor_id=actor_id)
+    db.session.commit()
+
+
+@event.listens_for(Session, "after_commit")
+def _emit_pending_notifications(session):
+    pending = session.info.pop(_PENDING_EMITS_KEY, None)
+    if not pending:
+        return
+    for room, payloads in pending.items():
+        try:
+            if len(payloads) == 1:
+                socketio.emit('new_notification', payloads[0], room=room)
+            else:
+                socketio.emit('new_notifications', {'notifications': payloads}, room=room)
+        except Exception as e:
+            logger.error(f"Failed to emit notifications to {room}: {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_notifications(session):
+    session.info.pop(_PENDING_EMITS_KEY, None)
@@ -0,0 +1,181 @@
+# app/utils/pagination.py
+"""
+Keyset (cursor) pagination.
+
+Pages are fetched with `WHERE (sort_col, id) > (:last_value, :last_id)
+ORDER BY sort_col, id LIMIT n + 1` instead of OFFSET, so page 50 costs the
+same as page 1, and no COUNT(*) is issued: callers pass an exact total from
+a cached count source if they want one displayed.
+
+Cursors are opaque URL-safe tokens; clients only ever echo back the
+`next_cursor` / `prev_cursor` of a page they were given.
+
+NULLs in the sort column sort before every value (MySQL's ordering), so
+nullable columns such as `Task.deadline` page correctly.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+_NEXT, _PREV = "n", "p"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+# -----------------------------
+# Cursor encoding
+# -----------------------------
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(direction, value, row_id):
+    payload = json.dumps([direction, _encode_value(value), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """
+    Return (direction, value, row_id); raise InvalidCursor on anything else.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        direction, value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if direction not in (_NEXT, _PREV) or not isinstance(row_id, int):
+            raise InvalidCursor(token)
+        return direction, _decode_value(value), row_id
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise InvalidCursor(token) from e
+
+
+# -----------------------------
+# Keyset predicates
+# -----------------------------
+def _greater(column, id_column, value, row_id):
+    """Rows strictly after (value, row_id) in ascending order, NULLs first."""
+    if value is None:
+        return or_(column.isnot(None), and_(column.is_(None), id_column > row_id))
+    return and_(column.isnot(None), or_(column > value, and_(column == value, id_column > row_id)))
+
+
+def _less(column, id_column, value, row_id):
+    """Rows strictly before (value, row_id) in ascending order, NULLs first."""
+    if value is None:
+        return and_(column.is_(None), id_column < row_id)
+    return or_(column.is_(None), column < value, and_(column == value, id_column < row_id))
+
+
+class KeysetPage:
+    """
+    One page of a keyset-paginated query.
+    Exposes `items`, `has_next` / `has_prev`, `next_cursor` / `prev_cursor`
+    and the optional exact `total` supplied by the caller.
+    """
+
+    def __init__(self, items, per_page, total=None, has_next=False, has_prev=False,
+                 next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.per_page = per_page
+        self.total = total
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+
+def _scan(cursor, descending):
+    """
+    (cursor, backwards, scan_descending, value, row_id) for `cursor`; an
+    invalid cursor comes back as None (the first page).
+    """
+    direction, value, row_id = _NEXT, None, None
+    if cursor:
+        try:
+            direction, value, row_id = decode_cursor(cursor)
+        except InvalidCursor:
+            cursor = None
+
+    backwards = direction == _PREV
+    # Walking backwards over a descending list is an ascending scan, and vice versa
+    scan_descending = descending != backwards
+    return cursor, backwards, scan_descending, value, row_id
+
+
+def _window(query, sort_column, id_column, cursor, scan_descending, value, row_id, per_page,
+            order_id_column=None):
+    """`query` past the cursor, in scan order, limited to one page plus one row."""
+    if cursor:
+        past_cursor = _less if scan_descending else _greater
+        query = query.filter(past_cursor(sort_column, id_column, value, row_id))
+
+    order_id_column = id_column if order_id_column is None else order_id_column
+    if scan_descending:
+        query = query.order_by(sort_column.desc(), order_id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), order_id_column.asc())
+    return query.limit(per_page + 1)
+
+
+def keyset_window(stmt, sort_column, id_column, cursor=None, per_page=15, descending=False,
+                  order_id_column=None):
+    """
+    `stmt` (a Select) cut down to the rows `keyset_paginate` can need for
+    the page at `cursor`. Applied to every branch of a UNION ALL before
+    the union is paginated, so each branch is one short index range scan.
+
+    `order_id_column` sorts ties instead of a computed `id_column` that
+    orders the same way (e.g. its primary key), so the index order is used.
+    """
+    cursor, _backwards, scan_descending, value, row_id = _scan(cursor, descending)
+    return _window(stmt, sort_column, id_column, cursor, scan_descending, value, row_id, per_page,
+                   order_id_column)
+
+
+def keyset_paginate(query, sort_column, id_column, cursor=None, per_page=15,
+                    descending=False, total=None):
+    """
+    Paginate `query` on (sort_column, id_column).
+
+    `query` must not be ordered already. An invalid or stale cursor falls
+    back to the first page rather than erroring.
+    """
+    attr, id_attr = sort_column.key, id_column.key
+    cursor, backwards, scan_descending, value, row_id = _scan(cursor, descending)
+
+    query = _window(query, sort_column, id_column, cursor, scan_descending, value, row_id, per_page)
+    rows = query.all()
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    if backwards:
+        has_prev, has_next = more, True
+    else:
+        has_prev, has_next = bool(cursor), more
+
+    def key(row):
+        return getattr(row, attr), getattr(row, id_attr)
+
+    return KeysetPage(
+        rows,
+        per_page,
+        total=total,
+        has_next=has_next and bool(rows),
+        has_prev=has_prev and bool(rows),
+        next_cursor=encode_cursor(_NEXT, *key(rows[-1])) if rows and has_next else None,
+        prev_cursor=encode_cursor(_PREV, *key(rows[0])) if rows and has_prev else None,
+    )
@@ -0,0 +1,98 @@
+# app/utils/storage_gc.py
+"""
+Garbage collection for the object storage bucket.
+
+Objects are written by the upload paths (task documents, applicant CVs,
+profile pictures) but nothing removes them when a task or job is purged,
+and single-document deletes can fail silently. The collector lists each
+managed prefix, compares it with the keys still referenced by
+`TaskDocument.file_path`, `Biodata.resume_path` and
+`User.profile_image_file`, and removes the rest with batched
+`delete_objects` calls (up to 1000 keys each).
+
+Objects younger than `min_age` are never touched: a direct upload lands in
+the bucket before its confirm request records the row, and a server upload
+before its transaction commits.
+
+Run it with `flask storage gc` (add `--dry-run` to only report).
+"""
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.models import TaskDocument, Biodata, User
+from app.utils.db import db
+from app.utils.storage_service import storage_service
+
+# Folders the upload paths write to; anything else in the bucket is left alone
+MANAGED_PREFIXES = ("task_documents/", "applicants_cv/", "profile_pictures/")
+
+DEFAULT_MIN_AGE = timedelta(hours=24)
+
+
+def referenced_keys():
+    """Every object key the database still points at."""
+    keys = set()
+    for column in (TaskDocument.file_path, Biodata.resume_path, User.profile_image_file):
+        keys.update(
+            key for (key,) in db.session.query(column).filter(column.isnot(None)).distinct()
+        )
+    return keys
+
+
+def find_orphans(prefixes=MANAGED_PREFIXES, min_age=DEFAULT_MIN_AGE):
+    """
+    Yield (key, size) for every unreferenced object under `prefixes` older
+    than `min_age`.
+    """
+    referenced = referenced_keys()
+    cutoff = datetime.now(timezone.utc) - min_age
+    for prefix in prefixes:
+        for key, last_modified, size in storage_service.iter_objects(prefix):
+            if key in referenced or last_modified > cutoff:
+                continue
+            yield key, size
+
+
+def collect_garbage(prefixes=MANAGED_PREFIXES, min_age=DEFAULT_MIN_AGE, dry_run=False,
+                    batch_size=storage_service.MAX_DELETE_BATCH, pause=0, limit=None,
+                    on_batch=None):
+    """
+    Delete orphaned objects in batches of `batch_size`, sleeping `pause`
+    seconds between batches and stopping after `limit` orphans. With
+    `dry_run` nothing is deleted. `on_batch(deleted, errors)` is called
+    after each delete request.
+
+    Returns {'orphans', 'bytes', 'deleted', 'errors'}, where `errors` is a
+    list of (key, message).
+    """
+    batch_size = max(1, min(batch_size, storage_service.MAX_DELETE_BATCH))
+    report = {"orphans": 0, "bytes": 0, "deleted": 0, "errors": []}
+    batch = []
+    requests_sent = [0]
+
+    def flush():
+        # Rate limit: at most one delete request per `pause` seconds
+        if pause and requests_sent[0]:
+            time.sleep(pause)
+        requests_sent[0] += 1
+        deleted, errors = storage_service.delete_files(batch)
+        report["deleted"] += len(deleted)
+        report["errors"].extend(errors)
+        if on_batch:
+            on_batch(deleted, errors)
+        batch.clear()
+
+    for key, size in find_orphans(prefixes, min_age):
+        if limit is not None and report["orphans"] >= limit:
+            break
+        report["orphans"] += 1
+        report["bytes"] += size
+        if dry_run:
+            continue
+        batch.append(key)
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+    return report
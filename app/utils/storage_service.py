@@ -1,10 +1,17 @@
 # app/services/storage_service.py
 import boto3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config as BotoConfig
 from botocore.exceptions import ClientError
 from flask import current_app
+import mimetypes
+import time
 import uuid
 import os
 from werkzeug.utils import secure_filename
+from app.utils.cache import cache
 
 
 class DigitalOceanStorage:
@@ -12,6 +19,7 @@ class DigitalOceanStorage:
     
     def __init__(self, app=None):
         self.s3_client = None
+        self.transfer_config = None
         self.app = None
         if app:
             self.init_app(app)
@@ -20,68 +28,205 @@ class DigitalOceanStorage:
         """Initialize S3 client with DigitalOcean Spaces credentials"""
         self.app = app
         try:
+            # Path-style addressing lets a local S3 stand-in (MinIO, moto)
+            # serve the bucket without wildcard DNS
             self.s3_client = boto3.client(
                 's3',
                 endpoint_url=app.config['S3_ENDPOINT_URL'],
                 aws_access_key_id=app.config['S3_ACCESS_KEY'],
                 aws_secret_access_key=app.config['S3_SECRET_KEY'],
-                region_name=app.config['S3_REGION']
+                region_name=app.config['S3_REGION'],
+                config=BotoConfig(
+                    signature_version='s3v4',
+                    s3={'addressing_style': app.config.get('S3_ADDRESSING_STYLE', 'auto')},
+                    # Shared by every upload thread; see upload_files
+                    max_pool_connections=app.config.get('S3_MAX_POOL_CONNECTIONS', 20),
+                ),
+            )
+            mb = 1024 * 1024
+            self.transfer_config = TransferConfig(
+                multipart_threshold=app.config.get('S3_MULTIPART_THRESHOLD', 8 * mb),
+                multipart_chunksize=app.config.get('S3_MULTIPART_CHUNKSIZE', 8 * mb),
+                max_concurrency=app.config.get('S3_MULTIPART_CONCURRENCY', 4),
             )
             print(f"✅ DigitalOcean Spaces client initialized")
         except Exception as e:
             print(f"❌ Failed to initialize DigitalOcean Spaces: {e}")
             raise
     
+    @staticmethod
+    def new_key(filename, folder='documents'):
+        """
+        (safe original filename, unique object key) for a file about to be stored.
+        """
+        original_filename = secure_filename(filename or 'uploaded_file')
+        file_extension = original_filename.rsplit('.', 1)[1].lower() if '.' in original_filename else ''
+        unique_id = uuid.uuid4().hex
+        unique_filename = f"{unique_id}.{file_extension}" if file_extension else unique_id
+        return original_filename, f"{folder}/{unique_filename}"
+
+    @staticmethod
+    def guess_mimetype(filename):
+        return mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
     def upload_file(self, file, folder='documents', filename=None):
         if not self.s3_client:
             raise Exception("Storage service not initialized")
             
-        # 1. Get filename and extension safely
-        original_filename = filename or getattr(file, 'filename', 'uploaded_file.png')
-        original_filename = secure_filename(original_filename)
-        file_extension = original_filename.rsplit('.', 1)[1].lower() if '.' in original_filename else ''
+        # 1. Get filename and key safely
+        original_filename, s3_key = self.new_key(
+            filename or getattr(file, 'filename', 'uploaded_file.png'), folder
+        )
         
         # 2. Determine Mimetype safely (FIXES THE BYTESIO ERROR)
-        mimetype = getattr(file, 'mimetype', None)
-        if not mimetype:
-            # Map common extensions if mimetype is missing from the object
-            if file_extension in ['jpg', 'jpeg']: mimetype = 'image/jpeg'
-            elif file_extension == 'png': mimetype = 'image/png'
-            else: mimetype = 'application/octet-stream'
-
-        unique_id = uuid.uuid4().hex
-        unique_filename = f"{unique_id}.{file_extension}" if file_extension else unique_id
-        s3_key = f"{folder}/{unique_filename}"
+        mimetype = getattr(file, 'mimetype', None) or self.guess_mimetype(original_filename)
         
-        try:
-            current_position = file.tell()
-            file.seek(0, 2)
-            file_size = file.tell()
-            file.seek(current_position)
+        # Size is counted from the bytes actually sent (parts may report
+        # from several threads) instead of seeking to the end of the stream
+        sent = [0]
+        sent_lock = threading.Lock()
+
+        def count_bytes(n):
+            with sent_lock:
+                sent[0] += n
 
+        try:
             # 3. Use our local 'mimetype' variable here
             self.s3_client.upload_fileobj(
                 file,
                 self.app.config['S3_BUCKET'],  
                 s3_key, 
-                ExtraArgs={'ContentType': mimetype} # Corrected
+                ExtraArgs={'ContentType': mimetype}, # Corrected
+                Config=self.transfer_config,
+                Callback=count_bytes,
             )
             
             return {
                 'key': s3_key,
                 'original_filename': original_filename,
                 'mimetype': mimetype,
-                'size': file_size
+                'size': sent[0]
             }
         except Exception as e:
             print(f"❌ Failed to upload file to Spaces: {e}")
             raise
 
-    def get_file_url(self, file_key, expires_in=3600):
-        if not file_key:
-            return None
+    def upload_files(self, files, folder='documents', max_workers=None):
+        """
+        Upload several files at once on a bounded thread pool sharing this
+        client's connection pool, so the whole batch takes about as long as
+        its slowest file. Large files are also split into parallel parts
+        (S3_MULTIPART_*). Returns one result per file, in order:
+        {'ok': True, **upload_file result} or
+        {'ok': False, 'original_filename', 'error'}.
+        """
+        if not files:
+            return []
+        max_workers = max_workers or self.app.config.get('S3_UPLOAD_WORKERS', 4)
+
+        def upload(file):
+            try:
+                return {'ok': True, **self.upload_file(file, folder=folder)}
+            except Exception as e:
+                return {
+                    'ok': False,
+                    'original_filename': secure_filename(getattr(file, 'filename', '') or 'uploaded_file'),
+                    'error': str(e),
+                }
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(files))) as pool:
+            return list(pool.map(upload, files))
+
+    def create_presigned_post(self, filename, folder='documents', content_type=None,
+                              max_size=None, expires_in=600):
+        """
+        Signed policy that lets a browser POST one file straight to the bucket.
+
+        The object key is chosen here, and the policy pins the Content-Type
+        and caps the size (1 byte to `max_size`), so the client can only
+        upload what it asked for. Returns {'url', 'fields', 'key',
+        'original_filename', 'mimetype'}; the browser sends `fields` plus a
+        final `file` part to `url`.
+        """
+        if not self.s3_client:
+            raise Exception("Storage service not initialized")
+
+        original_filename, s3_key = self.new_key(filename, folder)
+        mimetype = content_type or self.guess_mimetype(original_filename)
+        max_size = max_size or self.app.config['MAX_CONTENT_LENGTH']
+
+        post = self.s3_client.generate_presigned_post(
+            Bucket=self.app.config['S3_BUCKET'],
+            Key=s3_key,
+            Fields={'Content-Type': mimetype},
+            Conditions=[
+                {'Content-Type': mimetype},
+                ['content-length-range', 1, max_size],
+            ],
+            ExpiresIn=expires_in,
+        )
+        return {
+            'url': post['url'],
+            'fields': post['fields'],
+            'key': s3_key,
+            'original_filename': original_filename,
+            'mimetype': mimetype,
+        }
+
+    def head_file(self, file_key):
+        """
+        {'size', 'mimetype'} of a stored object, or None if it does not exist.
+        """
+        try:
+            response = self.s3_client.head_object(
+                Bucket=self.app.config['S3_BUCKET'],
+                Key=file_key
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+        return {
+            'size': response['ContentLength'],
+            'mimetype': response.get('ContentType'),
+        }
+
+    def configure_cors(self, origins, max_age=3600):
+        """
+        Allow browsers on `origins` to POST uploads to the bucket and read
+        objects from it (needed for direct-to-storage uploads).
+        """
+        self.s3_client.put_bucket_cors(
+            Bucket=self.app.config['S3_BUCKET'],
+            CORSConfiguration={'CORSRules': [{
+                'AllowedOrigins': list(origins),
+                'AllowedMethods': ['GET', 'HEAD', 'POST'],
+                'AllowedHeaders': ['*'],
+                'ExposeHeaders': ['ETag', 'Location'],
+                'MaxAgeSeconds': max_age,
+            }]},
+        )
+
+    # Signed GET URLs are cached per (key, expiry bucket): everyone asking
+    # for a file within the same bucket gets the identical URL, so browsers
+    # can cache the response and pages stop re-signing on every render.
+    # The bucket is half the URL lifetime (or S3_URL_CACHE_WINDOW, if
+    # shorter), so a cached URL always has at least half its life left.
+    _URL_CACHE_PREFIX = 'presigned_url:'
+
+    def _url_bucket(self, expires_in):
+        window = max(1, min(
+            self.app.config.get('S3_URL_CACHE_WINDOW') or expires_in // 2,
+            expires_in // 2,
+        ))
+        now = time.time()
+        bucket = int(now // window)
+        # Cache until the bucket closes
+        return bucket, int((bucket + 1) * window - now) + 1
+
+    def _sign_url(self, file_key, expires_in):
         try:
-            url = self.s3_client.generate_presigned_url(
+            return self.s3_client.generate_presigned_url(
                 'get_object',
                 Params={
                     'Bucket': self.app.config['S3_BUCKET'],  
@@ -89,11 +234,42 @@ class DigitalOceanStorage:
                 },
                 ExpiresIn=expires_in
             )
-            return url
         except ClientError as e:
             print(f"❌ Failed to generate presigned URL: {e}")  
             return None
 
+    def get_file_urls(self, file_keys, expires_in=3600):
+        """
+        {key: signed URL} for a list of object keys (avatars on a page,
+        documents on a task), read from the URL cache in one round trip and
+        signing only the misses.
+        """
+        keys = list(dict.fromkeys(key for key in file_keys if key))
+        if not keys:
+            return {}
+
+        bucket, ttl = self._url_bucket(expires_in)
+        cache_keys = [f"{self._URL_CACHE_PREFIX}{expires_in}:{bucket}:{key}" for key in keys]
+        cached = cache.get_many(*cache_keys)
+
+        urls, signed = {}, {}
+        for key, cache_key, url in zip(keys, cache_keys, cached):
+            if not url:
+                url = self._sign_url(key, expires_in)
+                if not url:
+                    continue
+                signed[cache_key] = url
+            urls[key] = url
+
+        if signed:
+            cache.set_many(signed, timeout=ttl)
+        return urls
+
+    def get_file_url(self, file_key, expires_in=3600):
+        if not file_key:
+            return None
+        return self.get_file_urls([file_key], expires_in).get(file_key)
+
     # app/services/storage_service.py (Updated delete_file method)
     def delete_file(self, file_key):
         if not self.s3_client:
@@ -122,6 +298,38 @@ class DigitalOceanStorage:
                 current_app.logger.error(f"❌ Unknown error deleting {file_key}: {e}")
              return 
         
+    # delete_objects accepts at most this many keys per request
+    MAX_DELETE_BATCH = 1000
+
+    def delete_files(self, file_keys):
+        """
+        Delete up to MAX_DELETE_BATCH objects in one request.
+        Returns (deleted keys, [(key, error message), ...]).
+        """
+        file_keys = list(file_keys)
+        if not file_keys:
+            return [], []
+        if len(file_keys) > self.MAX_DELETE_BATCH:
+            raise ValueError(f"delete_files takes at most {self.MAX_DELETE_BATCH} keys")
+
+        response = self.s3_client.delete_objects(
+            Bucket=self.app.config['S3_BUCKET'],
+            Delete={'Objects': [{'Key': key} for key in file_keys], 'Quiet': True},
+        )
+        errors = [(e['Key'], e.get('Message') or e.get('Code')) for e in response.get('Errors', [])]
+        failed = {key for key, _message in errors}
+        return [key for key in file_keys if key not in failed], errors
+
+    def iter_objects(self, prefix=''):
+        """
+        Yield (key, last_modified, size) for every object under `prefix`,
+        one listing page (up to 1000 keys) at a time.
+        """
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.app.config['S3_BUCKET'], Prefix=prefix):
+            for obj in page.get('Contents', []):
+                yield obj['Key'], obj['LastModified'], obj['Size']
+
     def file_exists(self, file_key):
         try:
             self.s3_client.head_object(
@@ -0,0 +1,297 @@
+# app/utils/task_recurrence.py
+"""
+Materializes upcoming instances of recurring tasks.
+
+A series is every task of one engagement created from one template (or,
+for ad-hoc tasks without a template, every task of one engagement and
+client with the same title). Tasks outside any engagement are further
+split by client and assignee, so one template used for many clients is
+many series. Its newest live task is the series head: while
+the head's recurrence is not NONE, instances are created every
+DAILY / WEEKLY / MONTHLY / YEARLY step after the head's deadline until
+RECURRENCE_HORIZON_DAYS ahead. Instances due more than
+RECURRENCE_CATCH_UP_DAYS ago are skipped rather than backfilled, and a
+series stops as soon as its newest task is set to not recur.
+
+Each instance copies the head (title, description, assignee, estimate,
+priority, recurrence); VAT Returns instances also get their filing month.
+
+Runs are idempotent. Deadlines a series already has (soft-deleted tasks
+included, so a deleted instance is not recreated) are skipped, and the
+unique key on (job_id, task_template_id, deadline) rejects anything a
+concurrent writer slipped in, in which case that chunk is rolled back and
+picked up by the next run. Series are processed RECURRENCE_CHUNK_SIZE at a
+time, one bulk INSERT per table and one transaction per chunk, under a
+cross-worker lock held in the shared cache (per process when no shared
+cache is configured).
+
+Run it on a schedule with `flask tasks materialize`.
+"""
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import tuple_, and_, or_
+from sqlalchemy.exc import IntegrityError
+
+from app.models import Task, TaskTemplate, Service, Job, Client, VatFilingMonth, RecurrenceEnum, TaskStatusEnum
+from app.services.jobs.engagement_builder import (
+    insert_tasks, insert_vat_months, vat_month_for, VAT_SERVICE_NAME, VAT_TEMPLATE_TITLE,
+)
+from app.utils.cache import cache, release_lock
+from app.utils.db import db
+
+DEFAULT_SETTINGS = {
+    "RECURRENCE_HORIZON_DAYS": 35,
+    "RECURRENCE_CATCH_UP_DAYS": 7,
+    "RECURRENCE_CHUNK_SIZE": 200,
+}
+
+STEPS = {
+    RecurrenceEnum.DAILY: relativedelta(days=1),
+    RecurrenceEnum.WEEKLY: relativedelta(weeks=1),
+    RecurrenceEnum.MONTHLY: relativedelta(months=1),
+    RecurrenceEnum.YEARLY: relativedelta(years=1),
+}
+# Heads older than the longest step plus the catch-up window have nothing due
+_LONGEST_STEP = timedelta(days=366)
+
+LOCK_KEY = "lock:task_recurrence"
+LOCK_TIMEOUT = 30 * 60
+
+# Columns read for every task of a series
+_COLUMNS = (
+    Task.id, Task.title, Task.description, Task.assigned_to_id, Task.created_by_id,
+    Task.client_id, Task.task_template_id, Task.job_id, Task.deadline,
+    Task.estimated_minutes, Task.priority, Task.recurrence, Task.deleted_at,
+)
+
+
+class RecurrenceLocked(RuntimeError):
+    """Another worker is materializing recurring tasks right now."""
+
+
+def _setting(app, name):
+    return app.config.get(name, DEFAULT_SETTINGS[name])
+
+
+# Series kind -> the task columns that identify one series of that kind
+_KEY_COLUMNS = {
+    "template": (Task.job_id, Task.task_template_id),
+    "title": (Task.job_id, Task.client_id, Task.title),
+    # Outside an engagement nothing else ties tasks together
+    "standalone_template": (Task.job_id, Task.task_template_id, Task.client_id, Task.assigned_to_id),
+    "standalone_title": (Task.job_id, Task.client_id, Task.title, Task.assigned_to_id),
+}
+
+
+def _series_kind(row):
+    kind = "template" if row.task_template_id is not None else "title"
+    return kind if row.job_id is not None else f"standalone_{kind}"
+
+
+def _series_key(row):
+    kind = _series_kind(row)
+    return (kind,) + tuple(getattr(row, column.key) for column in _KEY_COLUMNS[kind])
+
+
+def upcoming_deadlines(head_deadline, recurrence, start, end):
+    """Deadlines after `head_deadline` every `recurrence` step, within [start, end]."""
+    step = STEPS.get(recurrence)
+    if step is None:
+        return []
+    deadlines = []
+    n = 1
+    # Counted from the head so month ends do not drift (Jan 31 -> Feb 28 -> Mar 31)
+    while (deadline := head_deadline + step * n) <= end:
+        if deadline >= start:
+            deadlines.append(deadline)
+        n += 1
+    return deadlines
+
+
+# -----------------------------
+# Series
+# -----------------------------
+def _series_keys(window_start):
+    """Keys of every series with a live recurring task due since `window_start`."""
+    rows = (
+        db.session.query(
+            Task.job_id, Task.task_template_id, Task.client_id, Task.title, Task.assigned_to_id,
+        )
+        .outerjoin(Job, Job.id == Task.job_id)
+        .filter(
+            Task.deleted_at.is_(None),
+            Task.recurrence != RecurrenceEnum.NONE,
+            Task.deadline >= window_start,
+            Job.deleted_at.is_(None),  # also true for tasks outside any engagement
+        )
+        .distinct()
+    )
+    return sorted({_series_key(row) for row in rows}, key=str)
+
+
+def _in_keys(columns, keys):
+    """`columns` matches one of `keys`; None components compare with IS NULL."""
+    exact = [key for key in keys if None not in key]
+    conditions = [tuple_(*columns).in_(exact)] if exact else []
+    for key in keys:
+        if None in key:
+            conditions.append(and_(*(
+                column.is_(None) if value is None else column == value
+                for column, value in zip(columns, key)
+            )))
+    return or_(*conditions)
+
+
+def _load_series(keys, window_start):
+    """{key: [task rows]} for `keys` (soft-deleted tasks included), one query per kind."""
+    by_kind = defaultdict(list)
+    for key in keys:
+        by_kind[key[0]].append(key[1:])
+
+    series = defaultdict(list)
+    for kind, values in by_kind.items():
+        condition = _in_keys(_KEY_COLUMNS[kind], values)
+        # Template and title series must not pick up each other's tasks
+        if kind.endswith("template"):
+            condition = and_(Task.task_template_id.isnot(None), condition)
+        else:
+            condition = and_(Task.task_template_id.is_(None), condition)
+
+        rows = db.session.query(*_COLUMNS).filter(condition, Task.deadline >= window_start)
+        for row in rows:
+            key = _series_key(row)
+            if key[0] == kind:
+                series[key].append(row)
+    return series
+
+
+def _vat_template_ids():
+    return {
+        template_id for (template_id,) in
+        db.session.query(TaskTemplate.id)
+        .join(Service, Service.id == TaskTemplate.service_id)
+        .filter(Service.name == VAT_SERVICE_NAME, TaskTemplate.title == VAT_TEMPLATE_TITLE)
+    }
+
+
+# -----------------------------
+# Chunks
+# -----------------------------
+def _plan_chunk(keys, window_start, start, end, now):
+    """New task rows for the series in `keys`."""
+    rows = []
+    for tasks in _load_series(keys, window_start).values():
+        live = [t for t in tasks if t.deleted_at is None and t.deadline is not None]
+        if not live:
+            continue
+        head = max(live, key=lambda t: (t.deadline, t.id))
+        taken = {t.deadline for t in tasks}
+        for deadline in upcoming_deadlines(head.deadline, head.recurrence, start, end):
+            if deadline in taken:
+                continue
+            rows.append({
+                'title': head.title,
+                'description': head.description,
+                'status': TaskStatusEnum.ASSIGNED,
+                'recurrence': head.recurrence,
+                'deadline': deadline,
+                'estimated_minutes': head.estimated_minutes,
+                'priority': head.priority,
+                'created_at': now,
+                'updated_at': now,
+                'assigned_to_id': head.assigned_to_id,
+                'created_by_id': head.created_by_id,
+                'client_id': head.client_id,
+                'task_template_id': head.task_template_id,
+                'job_id': head.job_id,
+                'requires_vat_form': False,
+            })
+    return rows
+
+
+def _vat_rows(task_rows, vat_template_ids):
+    """Filing months the new VAT Returns instances need and their engagement lacks."""
+    wanted = {
+        (row['job_id'], vat_month_for(row['deadline']))
+        for row in task_rows
+        if row['job_id'] is not None and row['task_template_id'] in vat_template_ids
+    }
+    if not wanted:
+        return []
+    job_ids = {job_id for job_id, _ in wanted}
+    existing = set(
+        db.session.query(VatFilingMonth.job_id, VatFilingMonth.month)
+        .filter(VatFilingMonth.job_id.in_(job_ids))
+    )
+    client_names = dict(
+        db.session.query(Job.id, Client.name)
+        .join(Client, Client.id == Job.client_id)
+        .filter(Job.id.in_(job_ids))
+    )
+    return [
+        {'job_id': job_id, 'month': month, 'nature_of_business': client_names.get(job_id)}
+        for job_id, month in sorted(wanted - existing)
+    ]
+
+
+# -----------------------------
+# Runs
+# -----------------------------
+def materialize_recurring_tasks(app, horizon_days=None, catch_up_days=None, chunk_size=None,
+                                on_chunk=None):
+    """
+    Create every recurring-task instance due within the horizon, one chunk
+    of series per transaction. `on_chunk(chunk_number, tasks_created)` is
+    called after each commit. Raises RecurrenceLocked if another run holds
+    the lock. Returns {'series', 'chunks', 'created', 'vat_forms', 'conflicts'}.
+    """
+    horizon_days = horizon_days if horizon_days is not None else _setting(app, "RECURRENCE_HORIZON_DAYS")
+    catch_up_days = catch_up_days if catch_up_days is not None else _setting(app, "RECURRENCE_CATCH_UP_DAYS")
+    chunk_size = chunk_size or _setting(app, "RECURRENCE_CHUNK_SIZE")
+
+    token = uuid.uuid4().hex
+    if not cache.add(LOCK_KEY, token, timeout=LOCK_TIMEOUT):
+        raise RecurrenceLocked("Recurring tasks are already being materialized by another worker.")
+
+    try:
+        now = datetime.utcnow()
+        start = now - timedelta(days=catch_up_days)
+        end = now + timedelta(days=horizon_days)
+        window_start = start - _LONGEST_STEP
+
+        keys = _series_keys(window_start)
+        vat_template_ids = _vat_template_ids()
+        report = {"series": len(keys), "chunks": 0, "created": 0, "vat_forms": 0, "conflicts": 0}
+
+        for offset in range(0, len(keys), chunk_size):
+            task_rows = _plan_chunk(keys[offset:offset + chunk_size], window_start, start, end, now)
+            if not task_rows:
+                continue
+            vat_rows = _vat_rows(task_rows, vat_template_ids)
+            try:
+                insert_tasks(db.session, task_rows)
+                insert_vat_months(db.session, vat_rows)
+                db.session.commit()
+            except IntegrityError as e:
+                # Someone created one of these instances since we read the series
+                db.session.rollback()
+                report["conflicts"] += 1
+                app.logger.warning(f"Recurring tasks: chunk at series {offset} skipped: {e.orig}")
+                continue
+
+            report["chunks"] += 1
+            report["created"] += len(task_rows)
+            report["vat_forms"] += len(vat_rows)
+            if on_chunk:
+                on_chunk(report["chunks"], len(task_rows))
+    finally:
+        release_lock(LOCK_KEY, token)
+
+    app.logger.info(
+        f"Recurring tasks: {report['created']} instances and {report['vat_forms']} VAT forms "
+        f"due by {end:%Y-%m-%d} for {report['series']} series"
+    )
+    return report
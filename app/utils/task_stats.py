@@ -0,0 +1,244 @@
+# app/utils/task_stats.py
+"""
+Per-user task status rollups maintained in the writing transaction.
+
+Two tables are kept in step with `tasks` by the flush hooks below:
+
+- ``user_task_stats``        (user_id, status) -> live task count
+- ``user_task_daily_stats``  (user_id, day, status) -> live task count, where
+                             `day` is the UTC date of the task's last update
+
+A task sits in exactly one bucket of each table while it is not soft-deleted.
+Every insert, update, soft-delete, restore or hard delete of a task moves it
+out of its old bucket and into its new one with `task_count +/- 1`
+statements issued on the session's own connection, so the rollups commit or
+roll back with the write that changed them.
+
+Writers that bypass the unit of work must call `apply_task_stat_deltas`
+themselves; `flask task-stats check` reports drift and
+`flask task-stats rebuild` recomputes everything from `tasks`.
+"""
+from collections import Counter
+from datetime import datetime
+from itertools import chain
+
+from sqlalchemy import event, inspect, select, update, delete, insert, func
+from sqlalchemy.orm import Session
+
+from app.models import Task, UserTaskStat, UserTaskDailyStat
+from app.utils.db import db
+from app.utils.firm_counters import old_and_new_values, track_old_values
+
+# Task attributes that decide which bucket a task lives in
+_BUCKET_ATTRS = ("assigned_to_id", "status", "deleted_at", "updated_at")
+track_old_values(*(getattr(Task, attr) for attr in _BUCKET_ATTRS))
+
+
+def _bucket(values):
+    """
+    (user_id, day, status) for a live task, None for a soft-deleted one.
+    """
+    if values["deleted_at"] is not None or values["assigned_to_id"] is None:
+        return None
+    updated_at = values["updated_at"]
+    return values["assigned_to_id"], updated_at.date() if updated_at else None, values["status"]
+
+
+# -----------------------------
+# Writes
+# -----------------------------
+def _increment(connection, table, key_columns, deltas):
+    """
+    Add each delta to `table.task_count`, creating missing rows.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    if connection.dialect.name == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+        for key, delta in deltas.items():
+            stmt = mysql_insert(table).values(**dict(zip(key_columns, key)), task_count=delta)
+            connection.execute(
+                stmt.on_duplicate_key_update(task_count=table.c.task_count + delta)
+            )
+        return
+
+    for key, delta in deltas.items():
+        match = [table.c[col] == value for col, value in zip(key_columns, key)]
+        result = connection.execute(
+            update(table).where(*match).values(task_count=table.c.task_count + delta)
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(table).values(**dict(zip(key_columns, key)), task_count=delta))
+
+
+def apply_task_stat_deltas(session, deltas):
+    """
+    Apply {(user_id, day, status): +/-n} bucket moves to both rollup tables
+    inside `session`'s transaction.
+    """
+    totals = Counter()
+    for (user_id, _day, status), delta in deltas.items():
+        totals[(user_id, status)] += delta
+
+    connection = session.connection()
+    _increment(connection, UserTaskStat.__table__, ("user_id", "status"), totals)
+    _increment(
+        connection, UserTaskDailyStat.__table__, ("user_id", "day", "status"),
+        {key: delta for key, delta in deltas.items() if key[1] is not None},
+    )
+
+
+# -----------------------------
+# Flush hooks
+# -----------------------------
+@event.listens_for(Session, "before_flush")
+def _stamp_updated_tasks(session, flush_context, instances):
+    # Set updated_at ourselves rather than through the column's onupdate so
+    # the previous value stays in the attribute history for after_flush.
+    now = datetime.utcnow()
+    for obj in session.dirty:
+        if (
+            isinstance(obj, Task)
+            and session.is_modified(obj, include_collections=False)
+            and not inspect(obj).attrs["updated_at"].history.added
+        ):
+            obj.updated_at = now
+
+
+@event.listens_for(Session, "after_flush")
+def _move_task_buckets(session, flush_context):
+    deltas = Counter()
+
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if not isinstance(obj, Task):
+            continue
+        values = old_and_new_values(obj, _BUCKET_ATTRS)
+        if values is None:
+            continue
+        old, new = values
+
+        was = None if obj in session.new else _bucket(old)
+        now = None if obj in session.deleted else _bucket(new)
+        if was == now:
+            continue
+        if was:
+            deltas[was] -= 1
+        if now:
+            deltas[now] += 1
+
+    if deltas:
+        apply_task_stat_deltas(session, deltas)
+
+
+# -----------------------------
+# Rebuild / consistency check
+# -----------------------------
+def _expected_daily_counts(session, user_ids=None):
+    day = func.date(Task.updated_at)
+    query = (
+        session.query(Task.assigned_to_id, day, Task.status, func.count(Task.id))
+        .filter(Task.deleted_at.is_(None))
+        .group_by(Task.assigned_to_id, day, Task.status)
+    )
+    if user_ids:
+        query = query.filter(Task.assigned_to_id.in_(user_ids))
+    return {
+        (user_id, _as_date(bucket_day), status): count
+        for user_id, bucket_day, status, count in query
+    }
+
+
+def _as_date(value):
+    # DATE() comes back as a string on some drivers
+    if isinstance(value, str):
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    return value
+
+
+def _totals(daily):
+    totals = Counter()
+    for (user_id, _day, status), count in daily.items():
+        totals[(user_id, status)] += count
+    return totals
+
+
+def rebuild_task_stats(user_ids=None):
+    """
+    Recompute both rollup tables from `tasks` (for `user_ids`, or everyone)
+    and commit. Returns the number of (user, status) rows written.
+    """
+    daily = _expected_daily_counts(db.session, user_ids)
+    totals = _totals(daily)
+
+    for model in (UserTaskStat, UserTaskDailyStat):
+        stmt = delete(model.__table__)
+        if user_ids:
+            stmt = stmt.where(model.__table__.c.user_id.in_(user_ids))
+        db.session.execute(stmt)
+
+    if totals:
+        db.session.execute(insert(UserTaskStat.__table__), [
+            {"user_id": user_id, "status": status, "task_count": count}
+            for (user_id, status), count in totals.items()
+        ])
+    daily_rows = [
+        {"user_id": user_id, "day": day, "status": status, "task_count": count}
+        for (user_id, day, status), count in daily.items() if day is not None
+    ]
+    if daily_rows:
+        db.session.execute(insert(UserTaskDailyStat.__table__), daily_rows)
+
+    db.session.commit()
+    return len(totals)
+
+
+def check_task_stats(user_ids=None):
+    """
+    Compare the rollups with a fresh count from `tasks`.
+    Returns a list of (table, key, stored, expected) for every mismatch.
+    """
+    daily = _expected_daily_counts(db.session, user_ids)
+    expected = {
+        UserTaskStat: _totals(daily),
+        UserTaskDailyStat: Counter({k: v for k, v in daily.items() if k[1] is not None}),
+    }
+
+    mismatches = []
+    for model, expected_counts in expected.items():
+        table = model.__table__
+        key_columns = [table.c.user_id, table.c.status] if model is UserTaskStat \
+            else [table.c.user_id, table.c.day, table.c.status]
+        query = select(*key_columns, table.c.task_count)
+        if user_ids:
+            query = query.where(table.c.user_id.in_(user_ids))
+
+        stored = {tuple(row[:-1]): row[-1] for row in db.session.execute(query)}
+        for key in set(stored) | set(expected_counts):
+            have, want = stored.get(key, 0), expected_counts.get(key, 0)
+            if have != want:
+                mismatches.append((table.name, key, have, want))
+    return mismatches
+
+
+# -----------------------------
+# Reads
+# -----------------------------
+def get_status_counts(user_ids):
+    """
+    {user_id: {TaskStatusEnum: count}} for live tasks assigned to `user_ids`.
+    """
+    user_ids = list(user_ids)
+    result = {user_id: Counter() for user_id in user_ids}
+    if not user_ids:
+        return result
+
+    rows = (
+        db.session.query(UserTaskStat.user_id, UserTaskStat.status, UserTaskStat.task_count)
+        .filter(UserTaskStat.user_id.in_(user_ids))
+    )
+    for user_id, status, count in rows:
+        result[user_id][status] += count
+    return result
@@ -1,10 +1,17 @@
-from app import create_app
-from app.utils.notifications import socketio
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Cooperative workers: patch the standard library before anything else
+# imports sockets, threads or PyMySQL.
+if os.getenv('SOCKETIO_ASYNC_MODE') == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
+from app import create_app
+from app.utils.notifications import socketio
+
 app = create_app()
 
 if __name__ == '__main__':
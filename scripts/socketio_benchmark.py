@@ -0,0 +1,96 @@
+"""
+Socket.IO connection benchmark.
+
+Opens N concurrent authenticated websocket clients against a running server,
+holds them open, and reports how many connected, connect latency, and how
+many `new_notification` / `new_notifications` events arrived while holding.
+Run it once per worker model (threading vs gevent, one or several processes
+behind the load balancer) to compare concurrent connections per worker.
+
+The server only accepts logged-in users, so pass the `session` cookie of a
+logged-in browser session:
+
+    pip install "python-socketio[asyncio_client]"
+    python scripts/socketio_benchmark.py http://localhost:5000 \
+        --cookie "session=<value>" --clients 500 --hold 60
+
+While it holds, trigger notifications for that user (e.g. add a note to one
+of their tasks from another process or worker) to check cross-worker fan-out.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import socketio
+
+
+async def _client(url, cookie, hold, results, events):
+    sio = socketio.AsyncClient(reconnection=False)
+
+    @sio.on("new_notification")
+    async def _one(data):
+        events["new_notification"] += 1
+
+    @sio.on("new_notifications")
+    async def _many(data):
+        events["new_notifications"] += len(data.get("notifications", []))
+
+    started = time.perf_counter()
+    try:
+        await sio.connect(url, headers={"Cookie": cookie}, transports=["websocket"], wait_timeout=30)
+    except Exception as e:
+        results["errors"].append(str(e))
+        return
+    results["latencies"].append(time.perf_counter() - started)
+
+    await asyncio.sleep(hold)
+    await sio.disconnect()
+
+
+async def run(url, cookie, clients, hold, ramp):
+    results = {"latencies": [], "errors": []}
+    events = {"new_notification": 0, "new_notifications": 0}
+    tasks = []
+    for _ in range(clients):
+        tasks.append(asyncio.create_task(_client(url, cookie, hold, results, events)))
+        if ramp:
+            await asyncio.sleep(ramp)
+    await asyncio.gather(*tasks)
+    return results, events
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("url", help="Server base URL, e.g. http://localhost:5000")
+    parser.add_argument("--cookie", required=True, help='Cookie header of a logged-in session, e.g. "session=..."')
+    parser.add_argument("--clients", type=int, default=200, help="Concurrent connections to open")
+    parser.add_argument("--hold", type=float, default=30, help="Seconds to keep every connection open")
+    parser.add_argument("--ramp", type=float, default=0.01, help="Delay between opening connections")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    results, events = asyncio.run(run(args.url, args.cookie, args.clients, args.hold, args.ramp))
+    elapsed = time.perf_counter() - started
+
+    latencies = results["latencies"]
+    print(f"connected: {len(latencies)}/{args.clients} in {elapsed:.1f}s")
+    if latencies:
+        print(
+            "connect latency: "
+            f"median {statistics.median(latencies) * 1000:.0f} ms, "
+            f"p95 {_percentile(latencies, 95) * 1000:.0f} ms, "
+            f"max {max(latencies) * 1000:.0f} ms"
+        )
+    print(f"notifications received: {events['new_notification'] + events['new_notifications']}")
+    if results["errors"]:
+        print(f"errors: {len(results['errors'])} (first: {results['errors'][0]})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+# Config reads these at import time
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("MAIL_PORT", "1025")
+os.environ.setdefault("APP_ENV", "testing")
+os.environ.setdefault("EMAIL_OUTBOX_WORKERS", "0")
+
+from app import create_app  # noqa: E402
+from app.models import User  # noqa: E402
+from app.utils.db import db as _db  # noqa: E402
+from app.utils.firm_counters import reconcile_firm_counters  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.config.update(TESTING=True, SQLALCHEMY_ECHO=False)
+    with app.app_context():
+        _db.create_all()
+        reconcile_firm_counters()
+        yield app
+        _db.session.remove()
+        _db.drop_all()
+
+
+@pytest.fixture
+def db(app):
+    return _db
+
+
+@pytest.fixture
+def make_user(db):
+    def make_user(n, role="OFFICER", **kwargs):
+        user = User(
+            first_name=f"First{n}", middle_name="M", last_name=f"Last{n}",
+            email=f"user{n}@example.com", password_hash="x", role=role,
+            phone_number="0700000000", **kwargs,
+        )
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return make_user
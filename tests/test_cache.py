@@ -0,0 +1,96 @@
+import pytest
+
+from app.utils.cache import cache, get_or_compute, release_lock
+
+
+def test_release_lock_leaves_another_holders_lock(app):
+    assert cache.add("lock:report", "ours", timeout=30)
+    cache.set("lock:report", "theirs", timeout=30)  # ours expired and was taken over
+
+    assert not release_lock("lock:report", "ours")
+    assert cache.get("lock:report") == "theirs"
+    assert release_lock("lock:report", "theirs")
+    assert cache.get("lock:report") is None
+
+
+def test_get_or_compute_releases_its_lock(app):
+    assert get_or_compute("report", lambda: 42, timeout=60) == 42
+    assert cache.get("lock:report") is None
+
+
+# -----------------------------
+# TwoTierCache over a shared fake Redis
+# -----------------------------
+@pytest.fixture
+def two_tier():
+    """Build TwoTierCache instances (one per "worker") sharing one Redis."""
+    fakeredis = pytest.importorskip("fakeredis")
+    from flask_caching.backends.rediscache import RedisCache
+    from app.utils.cache_backends import TwoTierCache
+
+    server = fakeredis.FakeServer()
+
+    def make():
+        shared = RedisCache(host=fakeredis.FakeStrictRedis(server=server), key_prefix="rdms:")
+        return TwoTierCache(shared, local_timeout=30)
+    return make
+
+
+def test_delete_if_only_deletes_the_matching_value(two_tier):
+    worker = two_tier()
+    assert worker.add("lock:report", "ours", timeout=30)
+    worker.set("lock:report", "theirs", timeout=30)
+
+    assert not worker.delete_if("lock:report", "ours")
+    assert worker.get("lock:report") == "theirs"
+    assert worker.delete_if("lock:report", "theirs")
+    assert worker.get("lock:report") is None
+    assert worker.shared._write_client.keys() == []
+
+
+def test_add_is_shared_between_workers(two_tier):
+    first, second = two_tier(), two_tier()
+
+    assert first.add("report", 1, timeout=30)
+    assert not second.add("report", 2, timeout=30)
+    assert second.get("report") == 1
+    assert 0 < first.shared._write_client.ttl("rdms:report") <= 30
+
+
+def test_many_reads_and_writes_fill_the_local_tier(two_tier):
+    first, second = two_tier(), two_tier()
+    first.set_many({"a": 1, "b": 2}, timeout=60)
+    first.shared.delete("a")  # gone from Redis, still in first's LRU
+
+    assert first.get_many("a", "b", "c") == [1, 2, None]
+    assert second.get_many("a", "b", "c") == [None, 2, None]
+    assert second.local.get("b") == 2
+    assert second.local.get("c") is None
+
+
+def test_namespace_and_lock_keys_bypass_the_local_tier(two_tier):
+    first, second = two_tier(), two_tier()
+    for key in ("ns:tasks", "lock:report", "plain"):
+        first.set(key, 1, timeout=60)
+        assert first.get(key) == 1
+        second.set(key, 2, timeout=60)
+
+    assert first.get("ns:tasks") == 2
+    assert first.get("lock:report") == 2
+    assert first.get("plain") == 1  # served from first's LRU until local_timeout
+    first.set_many({"ns:tasks": 3}, timeout=60)
+    assert first.local.get("ns:tasks") is None
+    assert first.local.get("lock:report") is None
+
+
+def test_a_lock_taken_by_one_worker_is_seen_by_another(two_tier):
+    first, second = two_tier(), two_tier()
+
+    assert first.add("lock:report", "first", timeout=30)
+    assert second.has("lock:report")
+    assert second.get("lock:report") == "first"
+    assert not second.add("lock:report", "second", timeout=30)
+    assert not second.delete_if("lock:report", "second")
+
+    assert first.delete_if("lock:report", "first")
+    assert second.add("lock:report", "second", timeout=30)
@@ -0,0 +1,143 @@
+import socket
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import mail
+from app.models import EmailOutbox, EmailStatusEnum, Task
+from app.utils import email_outbox
+from app.utils.email_outbox import enqueue_email
+from app.utils.notification import queue_task_assignment_email
+
+
+def test_task_email_is_queued_with_the_callers_transaction(db, make_user):
+    user = make_user(1)
+
+    task = Task(title="Audit", assigned_to_id=user.id, created_by_id=user.id)
+    db.session.add(task)
+    db.session.flush()
+    queue_task_assignment_email(task)
+    db.session.rollback()
+    assert EmailOutbox.query.count() == 0
+
+    email_outbox._wakeup.clear()
+    task = Task(title="Audit", assigned_to_id=user.id, created_by_id=user.id)
+    db.session.add(task)
+    db.session.flush()
+    queue_task_assignment_email(task)
+    assert not email_outbox._wakeup.is_set()
+    db.session.commit()
+
+    assert [row.recipients for row in EmailOutbox.query] == [[user.email]]
+    assert email_outbox._wakeup.is_set()
+
+
+# -----------------------------
+# Delivery against a local SMTP sink
+# -----------------------------
+class _Sink:
+    """aiosmtpd handler: records sessions and messages, refuses one address."""
+    refused = "refused@example.com"
+
+    def __init__(self):
+        self.sessions = 0
+        self.messages = []
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address == self.refused:
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope.rcpt_tos)
+        return "250 Message accepted"
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_sink(app, monkeypatch):
+    controller_module = pytest.importorskip("aiosmtpd.controller")
+    sink = _Sink()
+    controller = controller_module.Controller(sink, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+
+    state = app.extensions["mail"]
+    for name, value in dict(server="127.0.0.1", port=controller.port, use_tls=False, use_ssl=False,
+                            username=None, password=None, suppress=False).items():
+        monkeypatch.setattr(state, name, value)
+    yield sink
+    controller.stop()
+
+
+def _queue(*recipients):
+    for recipient in recipients:
+        enqueue_email("Hello", "Body", [recipient])
+    return EmailOutbox.query.order_by(EmailOutbox.id).all()
+
+
+def test_a_batch_goes_out_over_one_connection(app, db, smtp_sink):
+    _queue("a@example.com", "b@example.com", "c@example.com")
+
+    with mail.record_messages() as outbox:
+        assert email_outbox.drain_once(app) == 3
+
+    assert smtp_sink.sessions == 1
+    assert smtp_sink.messages == [["a@example.com"], ["b@example.com"], ["c@example.com"]]
+    assert [message.recipients for message in outbox] == [["a@example.com"], ["b@example.com"], ["c@example.com"]]
+    assert {row.status for row in EmailOutbox.query} == {EmailStatusEnum.SENT}
+
+
+def test_a_refused_recipient_is_retried_with_backoff(app, db, smtp_sink):
+    app.config.update(EMAIL_OUTBOX_RETRY_BASE_SECONDS=30, EMAIL_OUTBOX_RETRY_MAX_SECONDS=100)
+    _queue("a@example.com", _Sink.refused, "c@example.com")
+
+    before = datetime.utcnow()
+    email_outbox.drain_once(app)
+
+    # The refusal fails only its own row; the rest of the batch still goes out
+    assert smtp_sink.sessions == 1
+    assert smtp_sink.messages == [["a@example.com"], ["c@example.com"]]
+    refused = EmailOutbox.query.filter(EmailOutbox.status != EmailStatusEnum.SENT).one()
+    assert refused.recipients == [_Sink.refused]
+    assert refused.status == EmailStatusEnum.PENDING
+    assert refused.attempts == 1 and "No such user" in refused.last_error
+    assert timedelta(seconds=29) < refused.next_attempt_at - before < timedelta(seconds=32)
+
+    # Not due yet, so nothing is claimed; then each failure doubles the wait up to the cap
+    assert email_outbox.drain_once(app) == 0
+    delays = []
+    for _ in range(3):
+        refused.next_attempt_at = datetime.utcnow()
+        db.session.commit()
+        before = datetime.utcnow()
+        email_outbox.drain_once(app)
+        delays.append(round((refused.next_attempt_at - before).total_seconds()))
+    assert delays == [60, 100, 100]
+
+
+def test_an_unreachable_server_fails_the_batch_until_attempts_run_out(app, db, smtp_sink, monkeypatch):
+    app.config.update(EMAIL_OUTBOX_MAX_ATTEMPTS=2)
+    monkeypatch.setattr(app.extensions["mail"], "port", _free_port())  # nothing listens there
+    rows = _queue("a@example.com", "b@example.com")
+
+    assert email_outbox.drain_once(app) == 2
+    assert [(row.status, row.attempts) for row in rows] == [(EmailStatusEnum.PENDING, 1)] * 2
+    assert all(row.last_error for row in rows)
+
+    for row in rows:
+        row.next_attempt_at = datetime.utcnow()
+    db.session.commit()
+    email_outbox.drain_once(app)
+    assert [(row.status, row.attempts) for row in rows] == [(EmailStatusEnum.FAILED, 2)] * 2
+    assert smtp_sink.messages == []
@@ -0,0 +1,51 @@
+from datetime import datetime
+
+from app.models import Client, Job, Service, Task, TaskTemplate
+from app.services.jobs.engagement_builder import _insert_jobs, roll_out_engagements, task_spec
+
+
+def _service_with_template(db):
+    service = Service(name="Audit")
+    db.session.add(service)
+    db.session.flush()
+    template = TaskTemplate(title="Fieldwork", service_id=service.id)
+    db.session.add(template)
+    db.session.flush()
+    return service, template
+
+
+def test_jobs_inserted_in_the_same_second_are_told_apart(db, make_user):
+    user = make_user(1)
+    service, _ = _service_with_template(db)
+    client = Client(name="Acme")
+    db.session.add(client)
+    db.session.flush()
+
+    now = datetime.utcnow().replace(microsecond=0)
+    first = _insert_jobs(db.session, user, service.id, {client.id: "Audit A"}, now)
+    second = _insert_jobs(db.session, user, service.id, {client.id: "Audit B"}, now)
+    db.session.commit()
+
+    assert first[client.id] != second[client.id]
+    assert db.session.get(Job, first[client.id]).name == "Audit A"
+    assert db.session.get(Job, second[client.id]).name == "Audit B"
+
+
+def test_rerun_without_skipping_links_tasks_to_the_new_jobs(db, make_user):
+    user = make_user(1)
+    service, template = _service_with_template(db)
+    clients = [Client(name="Acme"), Client(name="Globex")]
+    db.session.add_all(clients)
+    db.session.commit()
+
+    specs = [task_spec(template.id, user.id)]
+    client_ids = [client.id for client in clients]
+    reports = [
+        roll_out_engagements(user, service.id, client_ids, "{client} audit", specs, skip_existing=False)
+        for _ in range(2)
+    ]
+
+    job_ids = reports[0]['job_ids'] + reports[1]['job_ids']
+    assert len(set(job_ids)) == 4
+    for job_id in job_ids:
+        assert Task.query.filter_by(job_id=job_id).count() == 1
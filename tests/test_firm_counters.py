@@ -0,0 +1,46 @@
+from datetime import datetime
+
+from app.models import Client, FirmCounter, Job, Service, Task
+from app.utils.firm_counters import (
+    get_firm_counters, ACTIVE_USERS, ACTIVE_SERVICES, ACTIVE_CLIENTS, ONGOING_ENGAGEMENTS,
+)
+
+
+def test_orm_creates_and_soft_deletes_move_the_counters(db, make_user):
+    user = make_user(1)
+    service = Service(name="Audit")
+    client = Client(name="Acme Ltd")
+    db.session.add_all([service, client])
+    db.session.commit()
+
+    counters = get_firm_counters()
+    assert (counters[ACTIVE_USERS], counters[ACTIVE_SERVICES], counters[ACTIVE_CLIENTS]) == (1, 1, 1)
+
+    # Expired after commit: the old deleted_at has to be loaded on set
+    user.deleted_at = datetime.utcnow()
+    client.deleted_at = datetime.utcnow()
+    db.session.commit()
+
+    counters = get_firm_counters()
+    assert (counters[ACTIVE_USERS], counters[ACTIVE_SERVICES], counters[ACTIVE_CLIENTS]) == (0, 1, 0)
+
+
+def test_unseeded_counters_are_counted_without_writing(db, make_user):
+    user = make_user(1)
+    client = Client(name="Acme Ltd")
+    db.session.add(client)
+    db.session.flush()
+    job = Job(name="Audit", client_id=client.id, created_by_id=user.id)
+    db.session.add(job)
+    db.session.flush()
+    db.session.add(Task(title="Fieldwork", job_id=job.id, assigned_to_id=user.id, created_by_id=user.id))
+    db.session.commit()
+    FirmCounter.query.delete()
+    db.session.execute(Job.__table__.update().values(is_ongoing=False))
+    db.session.commit()
+
+    counters = get_firm_counters()
+
+    assert (counters[ACTIVE_USERS], counters[ACTIVE_CLIENTS], counters[ONGOING_ENGAGEMENTS]) == (1, 1, 1)
+    assert FirmCounter.query.count() == 0
+    assert db.session.query(Job.is_ongoing).scalar() is False
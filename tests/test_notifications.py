@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+from app.models import BroadcastNotification, Notification, UserNotificationCounter
+from app.utils import notifications
+from app.utils.notifications import (
+    broadcast_notification, get_unread_count, mark_user_notifications_read, notify_users, user_room,
+)
+
+
+def _counter(db, user_id):
+    return db.session.get(UserNotificationCounter, user_id)
+
+
+def test_counter_is_seeded_from_existing_notifications(db, make_user):
+    user = make_user(1)
+    # Rows written before the counter existed, e.g. before the table was added
+    db.session.add_all([Notification(user_id=user.id, message=f"n{i}", read=False) for i in range(3)])
+    db.session.commit()
+    assert _counter(db, user.id) is None
+
+    # The first notify seeds the row from notifications, including its own
+    notify_users([user.id], "hello")
+    db.session.commit()
+    assert _counter(db, user.id).unread_count == 4
+
+    mark_user_notifications_read(user.id)
+    db.session.commit()
+    assert get_unread_count(user) == 0
+
+
+def test_first_read_seeds_the_counter(db, make_user):
+    user = make_user(1)
+    db.session.add_all([Notification(user_id=user.id, message=f"n{i}", read=False) for i in range(2)])
+    db.session.commit()
+
+    assert get_unread_count(user) == 2
+    assert _counter(db, user.id).unread_count == 2
+
+
+def test_broadcasts_add_to_the_badge_up_to_the_cap(db, make_user, monkeypatch):
+    monkeypatch.setattr(notifications, "BROADCAST_UNREAD_CAP", 2)
+    user = make_user(1)
+    for i in range(3):
+        broadcast_notification(user_room(user.id), f"b{i}")
+    db.session.commit()
+    assert BroadcastNotification.query.count() == 3
+
+    assert get_unread_count(user) == 2
+
+
+def test_broadcasts_before_the_user_joined_are_not_unread(db, make_user):
+    now = datetime.utcnow()
+    veteran = make_user(1, created_at=now - timedelta(days=2))
+    newcomer = make_user(2, created_at=now - timedelta(days=1))
+    old = broadcast_notification("role_OFFICER", "old")
+    old.created_at = now - timedelta(hours=36)
+    broadcast_notification("role_OFFICER", "new")
+    db.session.commit()
+
+    assert get_unread_count(veteran) == 2
+    assert get_unread_count(newcomer) == 1
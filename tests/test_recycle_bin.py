@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+
+from app.models import Client, Job, Task
+from app.services.recycle_bin import recycle_bin_query_service as service
+from app.services.recycle_bin.recycle_bin_query_service import get_deleted_items_page
+
+
+def test_pages_walk_the_merged_trash_both_ways(db, make_user, monkeypatch):
+    monkeypatch.setattr(service, "PER_PAGE", 3)
+    user = make_user(1)
+    client = Client(name="Acme")
+    db.session.add(client)
+    db.session.flush()
+
+    base = datetime(2026, 1, 1)
+    expected = []
+    for i in range(5):
+        # Ties on deleted_at across tables are broken by row_key
+        deleted_at = base + timedelta(minutes=i // 2)
+        task = Task(title=f"t{i}", created_by_id=user.id, assigned_to_id=user.id,
+                    deleted_at=deleted_at, deleted_by_id=user.id)
+        job = Job(name=f"j{i}", client_id=client.id, created_by_id=user.id,
+                  deleted_at=deleted_at, deleted_by_id=user.id)
+        db.session.add_all([task, job])
+        db.session.flush()
+        expected += [(deleted_at, task.id * 8 + 0, "Task"), (deleted_at, job.id * 8 + 1, "Engagement")]
+    db.session.add(Task(title="live", created_by_id=user.id, assigned_to_id=user.id))
+    db.session.commit()
+    expected = [(kind, key // 8) for _at, key, kind in sorted(expected, reverse=True)]
+
+    pages, cursor = [], None
+    while True:
+        page = get_deleted_items_page(("tasks", "jobs"), cursor=cursor)
+        pages.append(page)
+        if not page.has_next:
+            break
+        cursor = page.next_cursor
+    assert [(row.type, row.id) for page in pages for row in page.items] == expected
+
+    back = get_deleted_items_page(("tasks", "jobs"), cursor=pages[-1].prev_cursor)
+    assert [(row.type, row.id) for row in back.items] == [(row.type, row.id) for row in pages[-2].items]
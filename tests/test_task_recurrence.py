@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import Client, Job, RecurrenceEnum, Service, Task, TaskTemplate
+from app.services.jobs.engagement_builder import EngagementError, create_engagement, task_spec
+from app.services.tasks.task_factory import task_deadline_taken
+from app.utils.helpers import parse_local_deadline
+from app.utils.task_recurrence import materialize_recurring_tasks
+
+
+def test_standalone_template_tasks_recur_per_client(app, db, make_user):
+    user = make_user(1)
+    service = Service(name="Bookkeeping")
+    db.session.add(service)
+    db.session.flush()
+    template = TaskTemplate(title="Monthly books", service_id=service.id)
+    clients = [Client(name="Acme"), Client(name="Globex")]
+    db.session.add_all([template, *clients])
+    db.session.flush()
+
+    deadline = datetime.utcnow().replace(microsecond=0) - timedelta(days=1)
+    for client in clients:
+        db.session.add(Task(
+            title="Monthly books", assigned_to_id=user.id, created_by_id=user.id,
+            client_id=client.id, task_template_id=template.id, deadline=deadline,
+            recurrence=RecurrenceEnum.MONTHLY,
+        ))
+    db.session.commit()
+
+    report = materialize_recurring_tasks(app, horizon_days=35, catch_up_days=7)
+    assert report["series"] == 2
+    assert report["created"] == 2
+    for client in clients:
+        deadlines = sorted(t.deadline for t in Task.query.filter_by(client_id=client.id))
+        assert len(deadlines) == 2 and deadlines[1].month != deadlines[0].month
+
+    # A second run finds nothing new
+    assert materialize_recurring_tasks(app, horizon_days=35, catch_up_days=7)["created"] == 0
+
+
+def test_duplicate_template_deadline_is_rejected_before_writing(db, make_user):
+    user = make_user(1)
+    service = Service(name="Audit")
+    client = Client(name="Acme")
+    db.session.add_all([service, client])
+    db.session.flush()
+    template = TaskTemplate(title="Fieldwork", service_id=service.id)
+    db.session.add(template)
+    db.session.commit()
+
+    spec = task_spec(template.id, user.id, deadline="2026-03-01T09:00")
+    with pytest.raises(EngagementError, match="listed twice"):
+        create_engagement(user, client.id, service.id, "Audit 2026", [spec, dict(spec)])
+    assert Job.query.count() == 0
+
+    job = create_engagement(user, client.id, service.id, "Audit 2026", [spec])
+    assert task_deadline_taken(job.id, template.id, parse_local_deadline("2026-03-01T09:00"))
+    assert not task_deadline_taken(job.id, template.id, parse_local_deadline("2026-03-02T09:00"))
@@ -0,0 +1,45 @@
+from datetime import datetime
+
+from app.models import Task, TaskStatusEnum, UserTaskStat
+from app.utils.task_stats import check_task_stats
+
+
+def _counts(db, user_id):
+    return {
+        row.status: row.task_count
+        for row in db.session.query(UserTaskStat).filter_by(user_id=user_id)
+    }
+
+
+def test_insert_change_and_soft_delete_keep_rollups_in_step(db, make_user):
+    user = make_user(1)
+
+    task = Task(title="Audit", assigned_to_id=user.id, created_by_id=user.id)
+    db.session.add(task)
+    db.session.commit()
+    assert _counts(db, user.id) == {TaskStatusEnum.ASSIGNED: 1}
+    assert check_task_stats() == []
+
+    # The task is expired after commit, so the old status has to be loaded
+    task.status = TaskStatusEnum.REVIEW
+    db.session.commit()
+    assert _counts(db, user.id) == {TaskStatusEnum.ASSIGNED: 0, TaskStatusEnum.REVIEW: 1}
+    assert check_task_stats() == []
+
+    task.deleted_at = datetime.utcnow()
+    db.session.commit()
+    assert _counts(db, user.id) == {TaskStatusEnum.ASSIGNED: 0, TaskStatusEnum.REVIEW: 0}
+    assert check_task_stats() == []
+
+
+def test_reassignment_moves_the_task_between_users(db, make_user):
+    first, second = make_user(1), make_user(2)
+    task = Task(title="Audit", assigned_to_id=first.id, created_by_id=first.id)
+    db.session.add(task)
+    db.session.commit()
+
+    task.assigned_to_id = second.id
+    db.session.commit()
+    assert _counts(db, first.id) == {TaskStatusEnum.ASSIGNED: 0}
+    assert _counts(db, second.id) == {TaskStatusEnum.ASSIGNED: 1}
+    assert check_task_stats() == []
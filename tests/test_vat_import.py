@@ -0,0 +1,36 @@
+import io
+
+from app.models import Client, Job, VatMonthlySummary
+from app.services.jobs.vat_import_service import import_vat_summaries
+
+
+def _csv(*rows):
+    lines = ["job_id,Month,sales_zero_rated,sales_exempt,sales_vatable_16,paid"]
+    lines += [f"{job_id},{month},1,2,3,4" for job_id, month in rows]
+    return io.BytesIO("\n".join(lines).encode())
+
+
+def test_rows_for_another_clients_engagement_are_rejected(db, make_user):
+    user = make_user(1)
+    acme, globex = Client(name="Acme"), Client(name="Globex")
+    db.session.add_all([acme, globex])
+    db.session.flush()
+    upload, sibling, foreign = (
+        Job(name=name, client_id=client.id, created_by_id=user.id)
+        for name, client in (("VAT", acme), ("VAT 2", acme), ("VAT", globex))
+    )
+    db.session.add_all([upload, sibling, foreign])
+    db.session.commit()
+
+    result = import_vat_summaries(
+        _csv(("", "Jan-2026"), (sibling.id, "Jan-2026"), (foreign.id, "Jan-2026"), (9999, "Jan-2026")),
+        upload.id,
+    )
+
+    # Jobs start with a summary row per month, so these are updates
+    assert result["created"] + result["updated"] == 2
+    assert [line for line, _message in result["errors"]] == [4, 5]
+    assert "another client" in result["errors"][0][1]
+    paid = {row.job_id: row.paid for row in VatMonthlySummary.query.filter_by(month="Jan-2026")}
+    assert paid[upload.id] == paid[sibling.id] == 4
+    assert paid.get(foreign.id, 0) == 0